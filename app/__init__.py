@@ -78,6 +78,42 @@ def create_app(config_class=Config):
             logger.info("Successfully initialized database schemas")
         except Exception as e:
             logger.error(f"Error initializing database schemas: {str(e)}")
+        
+        from app.models.indexes import ensure_indexes
+        failed_indexes = ensure_indexes(app.logger)
+        # Submissions insert optimistically and would accept duplicates without this index
+        if 'create_application_unique_index' in failed_indexes:
+            raise RuntimeError(
+                "The unique (company_id, student_id) index on applications is missing; "
+                "refusing to start because application submissions rely on it"
+            )
+        
+        # Read notifications and broadcasts expire after the configured retention
+        from app.utils.notification_retention import ensure_broadcast_ttl, ensure_read_notification_ttl
+        try:
+            ensure_read_notification_ttl(app.config['NOTIFICATION_READ_RETENTION_DAYS'])
+            ensure_broadcast_ttl(app.config['NOTIFICATION_ARCHIVE_DAYS'])
+        except Exception as e:
+            logger.error(f"Error creating notification TTL index: {str(e)}")
+        
+        # Expire postings at their deadline
+        if app.config['BACKGROUND_THREADS'] and app.config['DEADLINE_SCHEDULER']:
+            from app.utils.deadlines import start_deadline_scheduler
+            start_deadline_scheduler()
+        
+        # Drain queued applications in the background when intake mode is on
+        if app.config['BACKGROUND_THREADS'] and app.config['APPLICATION_INTAKE_MODE']:
+            from app.utils.application_intake import start_intake_drainer
+            start_intake_drainer(app.config['INTAKE_BATCH_SIZE'], app.config['INTAKE_POLL_SECONDS'])
+        
+        # Push writes from every worker to this worker's notification streams
+        if app.config['BACKGROUND_THREADS'] and app.config['NOTIFICATION_CHANGE_STREAM']:
+            from app.utils.notification_stream import start_change_stream_feed
+            start_change_stream_feed(app.config['NOTIFICATION_POLL_SECONDS'])
+    
+    # Composite endpoints run their queries on a pool sized with the request threads
+    from app.utils.concurrency import configure_fan_out
+    configure_fan_out(app.config['FANOUT_WORKERS'])
     
     # Register blueprints
     from app.auth.routes import auth_bp
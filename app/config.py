@@ -12,4 +12,21 @@ class Config:
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'default-dev-key')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', 'app/uploads')
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16 MB max file size for uploads
\ No newline at end of file
+    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16 MB max file size for uploads
+    FANOUT_WORKERS = int(os.environ.get('FANOUT_WORKERS', 16))  # Threads per worker running dashboard queries concurrently; size with gunicorn threads
+    SEARCH_MAX_TIME_MS = int(os.environ.get('SEARCH_MAX_TIME_MS', 2000))  # Server-side time limit for search queries
+    APPLICATION_TRANSACTIONS = os.environ.get('APPLICATION_TRANSACTIONS', 'false').lower() == 'true'  # Wrap application writes in a transaction (replica set only)
+    APPLICATION_INTAKE_MODE = os.environ.get('APPLICATION_INTAKE_MODE', 'false').lower() == 'true'  # Queue applications and return 202 with a ticket
+    INTAKE_BATCH_SIZE = int(os.environ.get('INTAKE_BATCH_SIZE', 200))  # Queued applications written per batch
+    INTAKE_POLL_SECONDS = float(os.environ.get('INTAKE_POLL_SECONDS', 1.0))  # Drainer wait when the queue is empty
+    BACKGROUND_THREADS = os.environ.get('BACKGROUND_THREADS', 'true').lower() == 'true'  # Start the scheduler, intake drainer and change stream threads; scripts turn this off
+    DEADLINE_SCHEDULER = os.environ.get('DEADLINE_SCHEDULER', 'true').lower() == 'true'  # Deactivate postings when their deadline passes
+    NOTIFICATION_FANOUT_ON_READ = os.environ.get('NOTIFICATION_FANOUT_ON_READ', 'false').lower() == 'true'  # Store broadcasts once and merge them per student at read time
+    NOTIFICATION_CHANGE_STREAM = os.environ.get('NOTIFICATION_CHANGE_STREAM', 'true').lower() == 'true'  # Feed notification streams from a change stream (polling on standalone servers) so every worker sees every write
+    NOTIFICATION_POLL_SECONDS = float(os.environ.get('NOTIFICATION_POLL_SECONDS', 2.0))  # Poll interval of the stream feed where change streams are unsupported
+    STREAM_TICKET_SECONDS = int(os.environ.get('STREAM_TICKET_SECONDS', 60))  # Lifetime of the single-use tickets that open notification streams
+    STREAM_MAX_CONNECTIONS = int(os.environ.get('STREAM_MAX_CONNECTIONS', 40))  # Open notification streams per worker; keep below the worker's threads
+    STREAM_HEARTBEAT_SECONDS = float(os.environ.get('STREAM_HEARTBEAT_SECONDS', 15))  # Idle interval between keep-alive comments
+    STREAM_MAX_SECONDS = float(os.environ.get('STREAM_MAX_SECONDS', 300))  # Streams are closed after this long and the client reconnects
+    NOTIFICATION_READ_RETENTION_DAYS = float(os.environ.get('NOTIFICATION_READ_RETENTION_DAYS', 30))  # Read notifications expire this long after creation
+    NOTIFICATION_ARCHIVE_DAYS = float(os.environ.get('NOTIFICATION_ARCHIVE_DAYS', 90))  # Unread notifications older than this are archived and broadcasts expire
@@ -0,0 +1,248 @@
+from datetime import datetime
+
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError, BulkWriteError
+
+from app import db
+from app.utils.student_counters import increment_counters
+
+# Reasons an application can be rejected
+COMPANY_NOT_FOUND = 'company_not_found'
+STUDENT_NOT_FOUND = 'student_not_found'
+ALREADY_APPLIED = 'already_applied'
+
+# Statuses an admin can set
+STATUSES = ('pending', 'approved', 'rejected')
+
+# Maximum number of applications changed by one bulk status update
+MAX_BULK_UPDATES = 1000
+
+# Company fields shown with an application
+COMPANY_SUMMARY_FIELDS = {'name': 1, 'logo': 1, 'job_title': 1}
+
+def company_summary(company):
+    """Build the company snapshot embedded in an application."""
+    return {
+        'name': company.get('name', ''),
+        'logo': company.get('logo', ''),
+        'job_title': company.get('job_title', '')
+    }
+
+class _StudentNotFound(Exception):
+    """Raised inside the submission writes to abort them."""
+
+class Application:
+    @staticmethod
+    def submit(company_id, student_id, details, use_transaction=False):
+        """
+        Submit an application with as few round trips as possible.
+
+        The application is inserted optimistically; the unique
+        (company_id, student_id) index rejects duplicates, including
+        concurrent ones, so no separate duplicate check is needed. The
+        student's applied list is then updated with $addToSet, which also
+        creates the companies field on first use. A snapshot of the company
+        summary is embedded so application lists need no join.
+
+        Args:
+            company_id (ObjectId): The company applied to
+            student_id (str): The student's registration number
+            details (dict): Optional application fields (coverLetter, portfolio, ...)
+            use_transaction (bool): Run both writes in a multi-document
+                transaction (requires a replica set)
+
+        Returns:
+            tuple: (success, application document or one of the rejection reasons)
+        """
+        company = db.companies.find_one({'_id': company_id}, COMPANY_SUMMARY_FIELDS)
+        if not company:
+            return False, COMPANY_NOT_FOUND
+
+        application = {
+            'company_id': company_id,
+            'company': company_summary(company),
+            'student_id': student_id,
+            'status': 'pending',
+            'applied_date': datetime.now(),
+            'coverLetter': details.get('coverLetter', ''),
+            'portfolio': details.get('portfolio', ''),
+            'availability': details.get('availability', ''),
+            'noticePeriod': details.get('noticePeriod', '')
+        }
+
+        def write(session=None):
+            db.applications.insert_one(application, session=session)
+            result = db.students.update_one(
+                {'registration_no': student_id},
+                {'$addToSet': {'companies.applied': company_id}},
+                session=session
+            )
+            if not result.matched_count:
+                raise _StudentNotFound()
+            return result.modified_count
+
+        try:
+            if use_transaction:
+                # Aborting the transaction discards the application as well
+                with db.client.start_session() as session:
+                    added = session.with_transaction(write)
+            else:
+                try:
+                    added = write()
+                except _StudentNotFound:
+                    db.applications.delete_one({'_id': application['_id']})
+                    raise
+        except DuplicateKeyError:
+            return False, ALREADY_APPLIED
+        except _StudentNotFound:
+            return False, STUDENT_NOT_FOUND
+
+        if added:
+            increment_counters(student_id, applied=1)
+        return True, application
+
+    @staticmethod
+    def remove_duplicates():
+        """
+        Delete all but the earliest application of each student and company.
+
+        Duplicates can only exist in data written before the unique
+        (company_id, student_id) index, which cannot be built while they remain.
+
+        Returns:
+            int: The number of applications deleted
+        """
+        seen = set()
+        duplicates = []
+        cursor = db.applications.find({}, {'company_id': 1, 'student_id': 1}).sort([('applied_date', 1), ('_id', 1)])
+        for application in cursor:
+            key = (application.get('company_id'), application.get('student_id'))
+            if key in seen:
+                duplicates.append(application['_id'])
+            else:
+                seen.add(key)
+
+        deleted = 0
+        for start in range(0, len(duplicates), MAX_BULK_UPDATES):
+            chunk = duplicates[start:start + MAX_BULK_UPDATES]
+            deleted += db.applications.delete_many({'_id': {'$in': chunk}}).deleted_count
+        return deleted
+
+    @staticmethod
+    def attach_company_summaries(applications):
+        """
+        Add the company summary to applications created before snapshots were embedded.
+
+        Applications that already carry a snapshot are left alone; the rest
+        are hydrated with a single $in query.
+        """
+        company_ids = list({
+            application['company_id'] for application in applications
+            if application.get('company_id') and 'company' not in application
+        })
+        if not company_ids:
+            return applications
+        companies = {
+            company['_id']: company
+            for company in db.companies.find({'_id': {'$in': company_ids}}, COMPANY_SUMMARY_FIELDS)
+        }
+        for application in applications:
+            company = companies.get(application.get('company_id'))
+            if company and 'company' not in application:
+                application['company'] = company_summary(company)
+        return applications
+
+    @staticmethod
+    def refresh_company_snapshots(company_id):
+        """
+        Propagate a company's current summary to all of its applications.
+
+        Returns:
+            int: The number of applications updated
+        """
+        company = db.companies.find_one({'_id': company_id}, COMPANY_SUMMARY_FIELDS)
+        if not company:
+            return 0
+        result = db.applications.update_many(
+            {'company_id': company_id},
+            {'$set': {'company': company_summary(company)}}
+        )
+        return result.modified_count
+
+    @staticmethod
+    def backfill_company_snapshots():
+        """
+        Embed company snapshots in applications created before they existed.
+
+        Returns:
+            int: The number of applications updated
+        """
+        updated = 0
+        for company_id in db.applications.distinct('company_id', {'company': {'$exists': False}}):
+            updated += Application.refresh_company_snapshots(company_id)
+        return updated
+
+    @staticmethod
+    def update_statuses(updates):
+        """
+        Set the status of many applications with one unordered bulk write.
+
+        Every changed application is stamped with status_updated_date.
+
+        Args:
+            updates (list): (application_id, status) pairs, ids as strings
+
+        Returns:
+            tuple: (per-item results in input order, changed application documents)
+        """
+        results = [{'application_id': application_id, 'status': status} for application_id, status in updates]
+        valid = []
+        for result in results:
+            if result['status'] not in STATUSES:
+                result['result'] = 'invalid_status'
+            elif not ObjectId.is_valid(result['application_id']):
+                result['result'] = 'invalid_id'
+            else:
+                valid.append(result)
+
+        # One read finds which applications exist and which already have the status
+        existing = {
+            application['_id']: application
+            for application in db.applications.find(
+                {'_id': {'$in': [ObjectId(result['application_id']) for result in valid]}},
+                {'student_id': 1, 'company_id': 1, 'status': 1}
+            )
+        }
+
+        now = datetime.now()
+        operations = []
+        pending = []
+        for result in valid:
+            application = existing.get(ObjectId(result['application_id']))
+            if application is None:
+                result['result'] = 'not_found'
+            elif application.get('status') == result['status']:
+                result['result'] = 'unchanged'
+            else:
+                operations.append(UpdateOne(
+                    {'_id': application['_id']},
+                    {'$set': {'status': result['status'], 'status_updated_date': now}}
+                ))
+                pending.append((result, application))
+
+        failed = set()
+        if operations:
+            try:
+                db.applications.bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                failed = {error['index'] for error in e.details.get('writeErrors', [])}
+
+        changed = []
+        for index, (result, application) in enumerate(pending):
+            if index in failed:
+                result['result'] = 'error'
+            else:
+                result['result'] = 'updated'
+                changed.append({**application, 'status': result['status'], 'status_updated_date': now})
+        return results, changed
@@ -0,0 +1,161 @@
+"""
+Index definitions for MongoDB collections.
+"""
+import logging
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+def create_search_indexes():
+    """Create indexes used by the search endpoints."""
+    # Anchored prefix lookups on identifiers use these for range scans
+    db.students.create_index([('registration_no', ASCENDING)])
+    db.students.create_index([('email_id', ASCENDING)])
+    # Most company searches are restricted to active postings
+    db.companies.create_index([('active', ASCENDING), ('posted_date', DESCENDING)])
+    # Small partial indexes over active postings only, for listings and the deadline scheduler
+    db.companies.create_index(
+        [('posted_date', DESCENDING)],
+        name='active_posted_date',
+        partialFilterExpression={'active': True}
+    )
+    db.companies.create_index(
+        [('deadline', ASCENDING)],
+        name='active_deadline',
+        partialFilterExpression={'active': True}
+    )
+    db.announcements.create_index([('date', DESCENDING)])
+
+def create_trigram_indexes():
+    """Create indexes on the student trigram side collection."""
+    db.student_trigrams.create_index([('registration_no', ASCENDING)], unique=True)
+    db.student_trigrams.create_index([('trigrams', ASCENDING)])
+    # Workers refresh their in-memory posting lists by modification time
+    db.student_trigrams.create_index([('updated_at', ASCENDING)])
+
+def create_similarity_indexes():
+    """Create indexes on the precomputed similar companies table."""
+    db.similar_companies.create_index([('company_id', ASCENDING)], unique=True)
+    # Incremental updates find the lists that reference a changed posting
+    db.similar_companies.create_index([('neighbours.company_id', ASCENDING)])
+
+def create_trending_indexes():
+    """Create indexes on the trending leaderboard."""
+    db.trending_companies.create_index([('company_id', ASCENDING)], unique=True)
+    db.trending_companies.create_index([('log_weight', DESCENDING)])
+
+def create_recommendation_indexes():
+    """Create indexes on the precomputed student recommendations."""
+    db.student_recommendations.create_index([('registration_no', ASCENDING)], unique=True)
+    db.student_recommendations.create_index([('version', ASCENDING)])
+
+def create_coapplication_indexes():
+    """Create indexes on the co-application related companies table."""
+    db.related_companies.create_index([('company_id', ASCENDING)], unique=True)
+    # Company co-occurrence is built from the student x company application pairs
+    db.applications.create_index([('student_id', ASCENDING), ('company_id', ASCENDING)])
+
+def create_application_unique_index():
+    """
+    Create the unique (company_id, student_id) index on applications.
+
+    Application.submit inserts optimistically and relies on this index to
+    reject duplicates. Duplicates written before the index existed are
+    removed first, keeping each student's earliest application.
+    """
+    keys = [('company_id', ASCENDING), ('student_id', ASCENDING)]
+    try:
+        db.applications.create_index(keys, unique=True)
+    except DuplicateKeyError:
+        # Local import: the application model imports the student counters
+        from app.models.application import Application
+        removed = Application.remove_duplicates()
+        logger.warning(f"Removed {removed} duplicate applications before building the unique index")
+        db.applications.create_index(keys, unique=True)
+
+def create_application_indexes():
+    """Create indexes on applications."""
+    # Application lists are paginated newest first, per student and by status for admins
+    db.applications.create_index([('student_id', ASCENDING), ('applied_date', DESCENDING)])
+    db.applications.create_index([('status', ASCENDING), ('applied_date', DESCENDING)])
+
+def create_intake_indexes():
+    """Create indexes on the application intake queue."""
+    # Drainers claim the oldest open tickets first
+    db.application_intake.create_index([('status', ASCENDING), ('created_at', ASCENDING)])
+    # One open ticket per student and company
+    db.application_intake.create_index(
+        [('company_id', ASCENDING), ('student_id', ASCENDING)],
+        unique=True,
+        partialFilterExpression={'status': {'$in': ['queued', 'processing']}}
+    )
+
+def create_skill_indexes():
+    """Create indexes on the skill registry and the skill ID arrays."""
+    db.skills.create_index([('key', ASCENDING)], unique=True)
+    db.skills.create_index([('aliases', ASCENDING)])
+    # Multikey indexes for "who has / which postings require skill X" lookups
+    db.students.create_index([('skill_ids', ASCENDING)])
+    db.companies.create_index([('requirement_ids', ASCENDING)])
+
+def create_notification_indexes():
+    """Create indexes on notifications and broadcasts."""
+    # Notification lists are per recipient, newest first, optionally by read state
+    db.notifications.create_index([('recipient_id', ASCENDING), ('timestamp', DESCENDING)])
+    db.notifications.create_index([('recipient_id', ASCENDING), ('read', ASCENDING), ('timestamp', DESCENDING)])
+    # Broadcasts are merged newest first and split by each student's read watermark,
+    # which their TTL index on timestamp serves (see notification_retention)
+    # The archive job scans old unread notifications; archives are looked up per student
+    db.notifications.create_index([('read', ASCENDING), ('timestamp', ASCENDING)])
+    db.notification_archive.create_index([('recipient_id', ASCENDING), ('archived_at', DESCENDING)])
+    # Without change streams, notification streams poll for recently changed counters
+    db.student_counters.create_index([('updated_at', ASCENDING)])
+    # Stream tickets are single-use and expire shortly after they are issued
+    db.stream_tickets.create_index([('expires_at', ASCENDING)], expireAfterSeconds=0)
+
+def create_cache_indexes():
+    """Create indexes on the shared cache collection."""
+    # Entries and leases are removed once they expire
+    db.cache.create_index([('expires_at', ASCENDING)], expireAfterSeconds=0)
+
+def ensure_indexes(log=None):
+    """
+    Create all indexes used by the application's queries.
+
+    A failing builder is logged and skipped so the others still run.
+
+    Args:
+        log (logging.Logger, optional): Logger to report to, such as the
+            Flask app's logger (defaults to this module's logger)
+
+    Returns:
+        list: The names of the builders that failed
+    """
+    log = log or logger
+    index_builders = [
+        create_search_indexes,
+        create_trigram_indexes,
+        create_similarity_indexes,
+        create_trending_indexes,
+        create_recommendation_indexes,
+        create_skill_indexes,
+        create_coapplication_indexes,
+        create_application_unique_index,
+        create_application_indexes,
+        create_intake_indexes,
+        create_notification_indexes,
+        create_cache_indexes
+    ]
+    failed = []
+    for build in index_builders:
+        try:
+            build()
+        except Exception as e:
+            log.error(f"Error creating indexes in {build.__name__}: {str(e)}")
+            failed.append(build.__name__)
+    log.info("Database index initialization complete")
+    return failed
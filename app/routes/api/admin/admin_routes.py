@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt
 from functools import wraps
 import hmac
@@ -9,10 +9,25 @@ from datetime import datetime  # Added for application status updates
 
 from app import db
 from app.models.admin import Admin
+from app.models.application import Application, STATUSES, MAX_BULK_UPDATES, COMPANY_SUMMARY_FIELDS
 from app.auth.utils import hash_password, check_password
+from app.utils.pagination import get_page_params, get_count_mode, paginate_query
+from app.utils.recommender import company_recommender
+from app.utils.skills import resolve_requirements
+from app.utils.similarity import update_similar_companies
+from app.utils.background import submit_background
+from app.utils.catalogue import bump_catalogue_version, ANNOUNCEMENTS
+from app.utils.deadlines import parse_deadline, schedule_deadline
+from app.utils import metrics
+from app.utils.concurrency import fan_out
+from app.utils.singleflight import coalescing_ratios
+from app.utils.notifications import build_notification, create_notifications, broadcast, notify_all_students
 
 admin_bp = Blueprint('admin', __name__)
 
+# Stands in for a field a company document does not have
+_MISSING = object()
+
 def require_admin_key(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -104,21 +119,29 @@ def admin_required(f):
 @admin_required
 def admin_dashboard():
     """Protected admin dashboard route."""
-    # Get counts for dashboard stats
-    students_count = db.students.count_documents({})
-    companies_count = db.companies.count_documents({})
-    applications_count = db.applications.count_documents({})
-    pending_applications = db.applications.count_documents({'status': 'pending'})
+    # Get counts for dashboard stats; a count that times out is reported as None
+    stats, degraded = fan_out({
+        'students_count': lambda: db.students.count_documents({}),
+        'companies_count': lambda: db.companies.count_documents({}),
+        'applications_count': lambda: db.applications.count_documents({}),
+        'pending_applications': lambda: db.applications.count_documents({'status': 'pending'})
+    })
     
     return jsonify({
         'message': 'Welcome to admin dashboard',
         'status': 'success',
-        'stats': {
-            'students_count': students_count,
-            'companies_count': companies_count,
-            'applications_count': applications_count,
-            'pending_applications': pending_applications
-        }
+        'stats': stats,
+        'degraded': degraded
+    }), 200
+
+@admin_bp.route('/metrics', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_metrics():
+    """Operational counters of the worker serving the request (protected admin route)."""
+    return jsonify({
+        'metrics': metrics.snapshot(),
+        'coalescing': coalescing_ratios()
     }), 200
 
 @admin_bp.route('/users', methods=['GET'])
@@ -127,19 +150,14 @@ def admin_dashboard():
 def list_users():
     """List all users (protected admin route)."""
     # Get pagination parameters
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 20))
-    skip = (page - 1) * per_page
-    
-    # Get total count
-    total = db.students.count_documents({})
+    page, per_page = get_page_params(default_per_page=20)
     
     # Get paginated users
-    users = list(db.students.find({}, {
+    users, pagination = paginate_query(db.students, {}, page, per_page, get_count_mode(), projection={
         'password': 0,  # Exclude password field
         'aadhar_no': 0,  # Exclude sensitive information
         'parivar_pehchan_patra_id': 0
-    }).skip(skip).limit(per_page))
+    })
     
     # Convert ObjectId to string for JSON serialization
     for user in users:
@@ -147,10 +165,7 @@ def list_users():
     
     return jsonify({
         'users': users,
-        'total': total,
-        'page': page,
-        'per_page': per_page,
-        'pages': (total + per_page - 1) // per_page
+        **pagination
     }), 200
 
 @admin_bp.route('/users/<user_id>', methods=['GET'])
@@ -180,15 +195,10 @@ def get_user(user_id):
 def list_companies():
     """List all companies (protected admin route)."""
     # Get pagination parameters
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 20))
-    skip = (page - 1) * per_page
-    
-    # Get total count
-    total = db.companies.count_documents({})
+    page, per_page = get_page_params(default_per_page=20)
     
     # Get paginated companies
-    companies = list(db.companies.find({}).skip(skip).limit(per_page))
+    companies, pagination = paginate_query(db.companies, {}, page, per_page, get_count_mode())
     
     # Convert ObjectId to string for JSON serialization
     for company in companies:
@@ -196,10 +206,7 @@ def list_companies():
     
     return jsonify({
         'companies': companies,
-        'total': total,
-        'page': page,
-        'per_page': per_page,
-        'pages': (total + per_page - 1) // per_page
+        **pagination
     }), 200
 
 @admin_bp.route('/companies', methods=['POST'])
@@ -217,13 +224,31 @@ def create_company():
         'name': data.get('name'),
         'job_title': data.get('job_title'),
         'active': True,
-        'posted_date': datetime.now()
+        'posted_date': datetime.now(),
+        'updated_at': datetime.now(),
+        'version': 1
     }
     
+    # Deadlines are stored as dates so the lifecycle scheduler can expire the posting
+    if data.get('deadline') is not None:
+        company['deadline'] = parse_deadline(data['deadline'])
+        if company['deadline'] is None:
+            return jsonify({'error': 'Invalid deadline format'}), 400
+    
+    # Requirements are kept as entered and resolved to canonical skill IDs
+    if data.get('requirements'):
+        company['requirements'] = data['requirements']
+        company['requirement_ids'], company['requirement_keys'] = resolve_requirements(data['requirements'])
+    
     # Insert the company
     result = db.companies.insert_one(company)
     
     if result.inserted_id:
+        # Add the posting to this worker's recommendation index
+        company_recommender.upsert_company(company, bump_catalogue_version())
+        schedule_deadline(result.inserted_id, company.get('deadline'))
+        submit_background(update_similar_companies, result.inserted_id)
+        
         company['_id'] = str(result.inserted_id)
         return jsonify({
             'message': 'Company created successfully',
@@ -254,16 +279,41 @@ def update_company(company_id):
     # Update company fields
     update_data = {}
     for key, value in data.items():
-        if key != '_id':  # Prevent updating the ID
+        if key not in ('_id', 'requirement_ids', 'requirement_keys', 'version', 'updated_at'):  # Prevent updating the ID and derived fields
             update_data[key] = value
     
+    if 'requirements' in update_data:
+        update_data['requirement_ids'], update_data['requirement_keys'] = resolve_requirements(update_data['requirements'])
+    
+    if update_data.get('deadline') is not None:
+        update_data['deadline'] = parse_deadline(update_data['deadline'])
+        if update_data['deadline'] is None:
+            return jsonify({'error': 'Invalid deadline format'}), 400
+    
+    # Only fields whose value differs count as a change; resubmitting the stored
+    # posting must not invalidate cached copies, ETags or the catalogue version
+    update_data = {key: value for key, value in update_data.items() if company.get(key, _MISSING) != value}
+    if not update_data:
+        return jsonify({'message': 'No changes made to company'}), 200
+    
     # Update the company
+    # Bump the version so cached copies and ETags are invalidated
     result = db.companies.update_one(
         {'_id': ObjectId(company_id)},
-        {'$set': update_data}
+        {'$set': {**update_data, 'updated_at': datetime.now()}, '$inc': {'version': 1}}
     )
     
     if result.modified_count:
+        # Refresh the posting in this worker's recommendation index; this also
+        # covers deactivation, which is an update of the active flag
+        company_recommender.refresh_company(ObjectId(company_id), bump_catalogue_version())
+        schedule_deadline(ObjectId(company_id), update_data.get('deadline'))
+        submit_background(update_similar_companies, ObjectId(company_id))
+        
+        # Applications embed a snapshot of the company summary
+        if any(field in update_data for field in COMPANY_SUMMARY_FIELDS):
+            submit_background(Application.refresh_company_snapshots, ObjectId(company_id))
+        
         return jsonify({
             'message': 'Company updated successfully'
         }), 200
@@ -294,6 +344,16 @@ def create_announcement():
     result = db.announcements.insert_one(announcement)
     
     if result.inserted_id:
+        # Invalidate cached announcement lists and their ETags
+        bump_catalogue_version(ANNOUNCEMENTS)
+        
+        # Notify every student, either once for all or with batched per-student writes
+        notification_args = ('New announcement', announcement['title'], 'announcement', str(result.inserted_id))
+        if current_app.config['NOTIFICATION_FANOUT_ON_READ']:
+            broadcast(*notification_args)
+        else:
+            notify_all_students(*notification_args)
+        
         announcement['_id'] = str(result.inserted_id)
         return jsonify({
             'message': 'Announcement created successfully',
@@ -307,17 +367,20 @@ def create_announcement():
 @admin_required
 def list_applications():
     """List all applications (protected admin route)."""
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 20))
-    skip = (page - 1) * per_page
+    page, per_page = get_page_params(default_per_page=20)
 
     status = request.args.get('status')
     query = {}
     if status:
         query['status'] = status
 
-    total = db.applications.count_documents(query)
-    applications = list(db.applications.find(query).skip(skip).limit(per_page))
+    applications, pagination = paginate_query(
+        db.applications, query, page, per_page, get_count_mode(),
+        sort=[('applied_date', -1)]
+    )
+
+    # Older applications without a company snapshot are hydrated with one query
+    Application.attach_company_summaries(applications)
 
     for application in applications:
         application['_id'] = str(application['_id'])
@@ -326,10 +389,7 @@ def list_applications():
 
     return jsonify({
         'applications': applications,
-        'total': total,
-        'page': page,
-        'per_page': per_page,
-        'pages': (total + per_page - 1) // per_page
+        **pagination
     }), 200
 
 @admin_bp.route('/applications/<application_id>/status', methods=['PUT'])
@@ -342,7 +402,7 @@ def update_application_status(application_id):
         return jsonify({'error': 'New status is required'}), 400
 
     status_val = data.get('status')
-    if status_val not in ['pending', 'approved', 'rejected']:
+    if status_val not in STATUSES:
         return jsonify({'error': 'Invalid status value'}), 400
 
     if not ObjectId.is_valid(application_id):
@@ -351,7 +411,7 @@ def update_application_status(application_id):
     # Update the application status
     result = db.applications.update_one(
         {'_id': ObjectId(application_id)},
-        {'$set': {'status': status_val}}
+        {'$set': {'status': status_val, 'status_updated_date': datetime.now()}}
     )
 
     if result.modified_count:
@@ -359,4 +419,83 @@ def update_application_status(application_id):
             'message': 'Application status updated successfully'
         }), 200
     else:
-        return jsonify({'message': 'No changes made to application status'}), 200
\ No newline at end of file
+        return jsonify({'message': 'No changes made to application status'}), 200
+
+def notify_status_changes(applications):
+    """Notify students about changed application statuses with batched inserts."""
+    companies = {
+        company['_id']: company.get('name', '')
+        for company in db.companies.find(
+            {'_id': {'$in': list({application['company_id'] for application in applications})}},
+            {'name': 1}
+        )
+    }
+    notifications = [
+        build_notification(
+            application['student_id'],
+            'Application status updated',
+            f"Your application to {companies.get(application['company_id'], 'a company')} is now {application['status']}.",
+            'application',
+            str(application['_id'])
+        )
+        for application in applications
+    ]
+    return create_notifications(notifications)
+
+@admin_bp.route('/applications/status', methods=['PUT'])
+@jwt_required()
+@admin_required
+def bulk_update_application_status():
+    """
+    Update the status of many applications at once (protected admin route).
+
+    The body holds either a list of updates,
+    {"updates": [{"application_id": "...", "status": "approved"}, ...]},
+    or a filter and the status to set,
+    {"filter": {"company_id": "...", "status": "pending"}, "status": "approved"}.
+    """
+    data = request.get_json()
+    if not data or ('updates' not in data and 'filter' not in data):
+        return jsonify({'error': 'Either updates or filter is required'}), 400
+
+    if 'updates' in data:
+        if not isinstance(data['updates'], list) or not all(isinstance(item, dict) for item in data['updates']):
+            return jsonify({'error': 'updates must be a list of objects'}), 400
+        updates = [(str(item.get('application_id', '')), item.get('status')) for item in data['updates']]
+    else:
+        status_val = data.get('status')
+        if status_val not in STATUSES:
+            return jsonify({'error': 'Invalid status value'}), 400
+
+        # Only company and current status can be filtered on
+        filter_data = data['filter'] if isinstance(data['filter'], dict) else {}
+        query = {}
+        if filter_data.get('company_id'):
+            if not ObjectId.is_valid(filter_data['company_id']):
+                return jsonify({'error': 'Invalid company ID format'}), 400
+            query['company_id'] = ObjectId(filter_data['company_id'])
+        if filter_data.get('status'):
+            query['status'] = filter_data['status']
+        if not query:
+            return jsonify({'error': 'filter must contain company_id or status'}), 400
+
+        matching = db.applications.find(query, {'_id': 1}).limit(MAX_BULK_UPDATES + 1)
+        updates = [(str(application['_id']), status_val) for application in matching]
+
+    if len(updates) > MAX_BULK_UPDATES:
+        return jsonify({'error': f'At most {MAX_BULK_UPDATES} applications can be updated at once'}), 400
+
+    results, changed = Application.update_statuses(updates)
+
+    # Students are notified in batches off the request path
+    if changed:
+        submit_background(notify_status_changes, changed)
+
+    summary = {}
+    for result in results:
+        summary[result['result']] = summary.get(result['result'], 0) + 1
+
+    return jsonify({
+        'results': results,
+        'summary': summary
+    }), 200
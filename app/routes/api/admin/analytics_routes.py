@@ -6,6 +6,7 @@ import calendar
 
 from app import db
 from app.routes.api.admin.admin_routes import admin_required
+from app.utils.concurrency import fan_out
 
 analytics_bp = Blueprint('analytics', __name__)
 
@@ -14,41 +15,40 @@ analytics_bp = Blueprint('analytics', __name__)
 @admin_required
 def get_analytics_overview():
     """Get overview analytics for the admin dashboard."""
-    try:
-        # Get total counts
-        total_students = db.students.count_documents({})
-        total_companies = db.companies.count_documents({})
-        total_applications = db.applications.count_documents({})
-        
-        # Get active counts
-        active_companies = db.companies.count_documents({'active': True})
-        
-        # Get application statistics
-        pending_applications = db.applications.count_documents({'status': 'pending'})
-        approved_applications = db.applications.count_documents({'status': 'approved'})
-        rejected_applications = db.applications.count_documents({'status': 'rejected'})
-        
-        # Calculate application success rate
-        if total_applications > 0:
-            success_rate = (approved_applications / total_applications) * 100
-        else:
-            success_rate = 0
-        
-        return jsonify({
-            'total_students': total_students,
-            'total_companies': total_companies,
-            'total_applications': total_applications,
-            'active_companies': active_companies,
-            'application_stats': {
-                'pending': pending_applications,
-                'approved': approved_applications,
-                'rejected': rejected_applications,
-                'success_rate': round(success_rate, 2)
-            }
-        }), 200
+    # The counts are independent, so they run concurrently
+    counts, degraded = fan_out({
+        'total_students': lambda: db.students.count_documents({}),
+        'total_companies': lambda: db.companies.count_documents({}),
+        'total_applications': lambda: db.applications.count_documents({}),
+        'active_companies': lambda: db.companies.count_documents({'active': True}),
+        'pending': lambda: db.applications.count_documents({'status': 'pending'}),
+        'approved': lambda: db.applications.count_documents({'status': 'approved'}),
+        'rejected': lambda: db.applications.count_documents({'status': 'rejected'})
+    })
+    if len(degraded) == len(counts):
+        return jsonify({'error': 'Analytics are temporarily unavailable'}), 503
     
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    # Calculate application success rate
+    total_applications = counts['total_applications']
+    approved_applications = counts['approved']
+    if total_applications and approved_applications is not None:
+        success_rate = (approved_applications / total_applications) * 100
+    else:
+        success_rate = 0
+    
+    return jsonify({
+        'total_students': counts['total_students'],
+        'total_companies': counts['total_companies'],
+        'total_applications': total_applications,
+        'active_companies': counts['active_companies'],
+        'application_stats': {
+            'pending': counts['pending'],
+            'approved': approved_applications,
+            'rejected': counts['rejected'],
+            'success_rate': round(success_rate, 2)
+        },
+        'degraded': degraded
+    }), 200
 
 @analytics_bp.route('/applications/timeline', methods=['GET'])
 @jwt_required()
@@ -156,29 +156,30 @@ def get_student_activity():
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
         
-        # Get new student registrations
-        new_students = db.students.count_documents({
-            'registration_date': {'$gte': start_date, '$lte': end_date}
-        })
+        window = {'$gte': start_date, '$lte': end_date}
         
-        # Get active students (those who have applied to at least one company)
-        active_students = db.applications.distinct('student_id', {
-            'applied_date': {'$gte': start_date, '$lte': end_date}
+        # The queries are independent, so they run concurrently; any failure is an error here
+        results, degraded = fan_out({
+            # New student registrations
+            'new_students': lambda: db.students.count_documents({'registration_date': window}),
+            # Active students (those who have applied to at least one company)
+            'active_students': lambda: db.applications.distinct('student_id', {'applied_date': window}),
+            'total_students': lambda: db.students.count_documents({}),
+            'total_applications': lambda: db.applications.count_documents({'applied_date': window})
         })
-        active_count = len(active_students)
+        if degraded:
+            return jsonify({'error': 'Student activity is temporarily unavailable'}), 503
         
-        # Get total students
-        total_students = db.students.count_documents({})
+        new_students = results['new_students']
+        active_count = len(results['active_students'])
+        total_students = results['total_students']
         
         # Calculate engagement rate
         engagement_rate = (active_count / total_students) * 100 if total_students > 0 else 0
         
         # Get average applications per active student
         if active_count > 0:
-            total_applications = db.applications.count_documents({
-                'applied_date': {'$gte': start_date, '$lte': end_date}
-            })
-            avg_applications = total_applications / active_count
+            avg_applications = results['total_applications'] / active_count
         else:
             avg_applications = 0
         
@@ -5,6 +5,8 @@ from datetime import datetime
 
 from app import db
 from app.auth.utils import hash_password, check_password, validate_registration_number, validate_email
+from app.utils.trigram_index import index_student
+from app.utils.notifications import advance_read_watermark
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -105,6 +107,12 @@ def signup():
     result = db.students.insert_one(new_student)
     
     if result.inserted_id:
+        # Make the new student findable by fuzzy search
+        index_student(new_student)
+        
+        # Broadcasts sent before signing up do not count as unread
+        advance_read_watermark(registration_no)
+        
         # Generate access token
         access_token = create_access_token(identity=registration_no)
         return jsonify({
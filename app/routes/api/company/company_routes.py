@@ -1,16 +1,35 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, timedelta
 from bson.objectid import ObjectId
 
 from app import db
+from app.models.application import Application, ALREADY_APPLIED, COMPANY_NOT_FOUND
+from app.utils.application_intake import enqueue_application, get_ticket
+from app.utils.pagination import get_page_params, get_count_mode, paginate_query
+from app.utils.trending import record_application
+from app.utils.catalogue import catalogue_version
+from app.utils.http_cache import conditional, check_not_modified, make_etag
 
 company_bp = Blueprint('company', __name__)
 
 @company_bp.route('/', methods=['GET'])
 @jwt_required()
+@conditional()
 def get_companies():
     """Get list of companies with active job postings."""
+    # The postedTime window moves with the clock; it is rounded down to the minute
+    # so the ETag below can name the exact window the list was built for
+    window_start = datetime.now().replace(second=0, microsecond=0)
+    
+    # The list only changes with the catalogue and the window, so unchanged clients get a 304 without a query
+    etag_parts = ['companies', catalogue_version(), request.full_path]
+    if request.args.get('postedTime'):
+        etag_parts.append(window_start.isoformat())
+    not_modified = check_not_modified(make_etag(*etag_parts))
+    if not_modified:
+        return not_modified
+    
     # Get query parameters for filtering
     job_type = request.args.get('jobType')
     work_place = request.args.get('workPlace')
@@ -36,20 +55,16 @@ def get_companies():
         # Convert posted_time filter to datetime
         try:
             days = int(posted_time)
-            cutoff_date = datetime.now() - timedelta(days=days)
+            cutoff_date = window_start - timedelta(days=days)
             query['posted_date'] = {'$gte': cutoff_date}
         except ValueError:
             pass
     
     # Get pagination parameters
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 10))
-    
-    # Get total count for pagination
-    total = db.companies.count_documents(query)
+    page, per_page = get_page_params()
     
-    # Apply pagination
-    companies = list(db.companies.find(query).skip((page-1)*per_page).limit(per_page))
+    # Fetch the page and its total according to the requested count mode
+    companies, pagination = paginate_query(db.companies, query, page, per_page, get_count_mode())
     
     # Convert ObjectId to string for JSON serialization
     for company in companies:
@@ -57,14 +72,12 @@ def get_companies():
     
     return jsonify({
         'companies': companies,
-        'total': total,
-        'page': page,
-        'per_page': per_page,
-        'pages': (total + per_page - 1) // per_page
+        **pagination
     }), 200
 
 @company_bp.route('/<company_id>', methods=['GET'])
 @jwt_required()
+@conditional()
 def get_company(company_id):
     """Get detailed information about a specific company."""
     try:
@@ -76,6 +89,15 @@ def get_company(company_id):
         if not company:
             return jsonify({'error': 'Company not found'}), 404
         
+        # Versioned postings are tagged without serializing them; others fall back to a body hash
+        if company.get('version'):
+            not_modified = check_not_modified(
+                make_etag('company', company['_id'], company['version']),
+                company.get('updated_at')
+            )
+            if not_modified:
+                return not_modified
+        
         # Convert ObjectId to string for JSON serialization
         company['_id'] = str(company['_id'])
         
@@ -100,58 +122,45 @@ def apply_to_company(company_id):
         if not ObjectId.is_valid(company_id):
             return jsonify({'error': 'Invalid company ID format'}), 400
             
-        # Check if company exists
-        company = db.companies.find_one({'_id': ObjectId(company_id)})
-        if not company:
-            return jsonify({'error': 'Company not found'}), 404
-        
-        # Check if user exists and initialize companies field if needed
-        user = db.students.find_one({'registration_no': current_user})
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
-        if 'companies' not in user:
-            db.students.update_one(
-                {'registration_no': current_user},
-                {'$set': {'companies': {'applied': [], 'rejected': [], 'interviews_attended': [], 'interviews_not_attended': []}}}
-            )
+        # In intake mode the application is queued and written by a background drainer
+        if current_app.config['APPLICATION_INTAKE_MODE']:
+            if not db.companies.find_one({'_id': ObjectId(company_id)}, {'_id': 1}):
+                return jsonify({'error': 'Company not found'}), 404
+            if db.applications.find_one({'company_id': ObjectId(company_id), 'student_id': current_user}, {'_id': 1}):
+                return jsonify({'error': 'Already applied to this company'}), 409
+            
+            success, ticket = enqueue_application(ObjectId(company_id), current_user, data)
+            if not success:
+                return jsonify({'error': ticket}), 409
+            
+            return jsonify({
+                'message': 'Application received and queued for processing',
+                'ticket_id': str(ticket['_id']),
+                'status': ticket['status']
+            }), 202
         
-        # Check if user has already applied
-        existing_application = db.applications.find_one({
-            'company_id': ObjectId(company_id),
-            'student_id': current_user
-        })
-        if existing_application:
-            return jsonify({'error': 'Already applied to this company'}), 409
+        # Insert optimistically; the unique (company_id, student_id) index rejects duplicates
+        success, result = Application.submit(
+            ObjectId(company_id),
+            current_user,
+            data,
+            use_transaction=current_app.config['APPLICATION_TRANSACTIONS']
+        )
         
-        # Create application with required fields from test
-        application = {
-            'company_id': ObjectId(company_id),
-            'student_id': current_user,
-            'status': 'pending',
-            'applied_date': datetime.now(),
-            'coverLetter': data.get('coverLetter', ''),
-            'portfolio': data.get('portfolio', ''),
-            'availability': data.get('availability', ''),
-            'noticePeriod': data.get('noticePeriod', '')
-        }
+        if not success:
+            if result == ALREADY_APPLIED:
+                return jsonify({'error': 'Already applied to this company'}), 409
+            if result == COMPANY_NOT_FOUND:
+                return jsonify({'error': 'Company not found'}), 404
+            return jsonify({'error': 'User not found'}), 404
         
-        # Save application
-        result = db.applications.insert_one(application)
+        # Count the application towards the company's trending score
+        record_application(ObjectId(company_id), result['applied_date'])
         
-        if result.inserted_id:
-            # Update student's applied companies
-            db.students.update_one(
-                {'registration_no': current_user},
-                {'$push': {'companies.applied': ObjectId(company_id)}}
-            )
-            
-            return jsonify({
-                'message': 'Application submitted successfully',
-                'application_id': str(result.inserted_id)
-            }), 201
-        else:
-            return jsonify({'error': 'Failed to submit application'}), 500
+        return jsonify({
+            'message': 'Application submitted successfully',
+            'application_id': str(result['_id'])
+        }), 201
     except Exception as e:
         print(f"Error in apply_to_company: {str(e)}")  # Add logging
         return jsonify({'error': str(e)}), 500
@@ -162,27 +171,52 @@ def get_applications():
     """Get all applications for the current user."""
     current_user = get_jwt_identity()
     
-    # Get all applications for the user
-    applications = list(db.applications.find({'student_id': current_user}))
+    # Get the requested page of the user's applications, newest first
+    page, per_page = get_page_params(default_per_page=20)
+    applications, pagination = paginate_query(
+        db.applications, {'student_id': current_user}, page, per_page, get_count_mode(),
+        sort=[('applied_date', -1)]
+    )
     
-    # Convert ObjectId to string for JSON serialization and add company details
+    # Older applications without a company snapshot are hydrated with one query
+    Application.attach_company_summaries(applications)
+    
+    # Convert ObjectId to string for JSON serialization
     for application in applications:
         application['_id'] = str(application['_id'])
         application['company_id'] = str(application['company_id'])
-        
-        # Get company details
-        company = db.companies.find_one({'_id': ObjectId(application['company_id'])})
-        if company:
-            application['company'] = {
-                'name': company.get('name', ''),
-                'logo': company.get('logo', ''),
-                'job_title': company.get('job_title', '')
-            }
     
     return jsonify({
-        'applications': applications
+        'applications': applications,
+        **pagination
     }), 200
 
+@company_bp.route('/applications/intake/<ticket_id>', methods=['GET'])
+@jwt_required()
+def get_intake_ticket(ticket_id):
+    """Get the processing status of a queued application."""
+    current_user = get_jwt_identity()
+    
+    if not ObjectId.is_valid(ticket_id):
+        return jsonify({'error': 'Invalid ticket ID format'}), 400
+    
+    ticket = get_ticket(ObjectId(ticket_id), current_user)
+    if not ticket:
+        return jsonify({'error': 'Ticket not found'}), 404
+    
+    response = {
+        'ticket_id': str(ticket['_id']),
+        'company_id': str(ticket['company_id']),
+        'status': ticket['status'],
+        'created_at': ticket['created_at'].isoformat()
+    }
+    if ticket.get('application_id'):
+        response['application_id'] = str(ticket['application_id'])
+    if ticket.get('reason'):
+        response['reason'] = ticket['reason']
+    
+    return jsonify(response), 200
+
 @company_bp.route('/<company_id>/status', methods=['GET'])
 @jwt_required()
 def get_application_status(company_id):
@@ -1,51 +1,62 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from bson.objectid import ObjectId
+from pymongo.errors import ExecutionTimeout
 
 from app import db
 from app.routes.api.admin.admin_routes import admin_required
+from app.utils.search_query import compile_search_query, parse_search_terms, term_predicate
+from app.utils.trigram_index import student_index, MAX_CANDIDATES
+from app.utils.pagination import get_page_params, get_count_mode, paginate_query, count_results, page_metadata, COUNT_NONE
+from app.utils.company_facets import (
+    build_filters, build_facet_pipeline, format_facets, facet_cache_key, get_cached_facets, cache_facets
+)
 
 search_bp = Blueprint('search', __name__)
 
+def search_timeout_response():
+    """Response returned when a search exceeds its server-side time limit."""
+    return jsonify({'error': 'Search took too long, please use more specific terms'}), 503
+
 @search_bp.route('/companies', methods=['GET'])
 @jwt_required()
 def search_companies():
     """Search companies by keyword across multiple fields."""
     # Get search query
     query = request.args.get('q', '')
-    if not query:
-        return jsonify({'error': 'Search query is required'}), 400
-    
-    # Get pagination parameters
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 10))
-    
-    # Build search query
-    search_query = {
-        '$or': [
-            {'name': {'$regex': query, '$options': 'i'}},
-            {'job_title': {'$regex': query, '$options': 'i'}},
-            {'job_description': {'$regex': query, '$options': 'i'}},
-            {'requirements': {'$regex': query, '$options': 'i'}},
-            {'location': {'$regex': query, '$options': 'i'}}
-        ],
-        'active': True
-    }
     
     # Apply additional filters if provided
+    base_filter = {'active': True}
     job_type = request.args.get('job_type')
     if job_type:
-        search_query['job_type'] = job_type
+        base_filter['job_type'] = job_type
         
     work_place = request.args.get('work_place')
     if work_place:
-        search_query['work_place'] = work_place
+        base_filter['work_place'] = work_place
     
-    # Get total count for pagination
-    total = db.companies.count_documents(search_query)
+    # Build search query
+    success, compiled = compile_search_query(
+        query,
+        fields=['name', 'job_title', 'job_description', 'requirements', 'location'],
+        base_filter=base_filter
+    )
+    if not success:
+        return jsonify({'error': compiled}), 400
+    search_query = compiled['filter']
+    
+    # Get pagination parameters
+    page, per_page = get_page_params()
+    max_time_ms = current_app.config['SEARCH_MAX_TIME_MS']
     
-    # Apply pagination
-    companies = list(db.companies.find(search_query).skip((page-1)*per_page).limit(per_page))
+    try:
+        # Fetch the page and its total according to the requested count mode
+        companies, pagination = paginate_query(
+            db.companies, search_query, page, per_page, get_count_mode(),
+            max_time_ms=max_time_ms
+        )
+    except ExecutionTimeout:
+        return search_timeout_response()
     
     # Convert ObjectId to string for JSON serialization
     for company in companies:
@@ -53,56 +64,73 @@ def search_companies():
     
     return jsonify({
         'companies': companies,
-        'total': total,
-        'page': page,
-        'per_page': per_page,
-        'pages': (total + per_page - 1) // per_page,
-        'query': query
+        **pagination,
+        'query': query,
+        'terms': compiled['terms'],
+        'truncated': compiled['truncated']
     }), 200
 
 @search_bp.route('/students', methods=['GET'])
 @jwt_required()
 @admin_required
 def search_students():
-    """Search students by keyword (admin only)."""
+    """Search students by registration number, email prefix or fuzzy name match (admin only)."""
     # Get search query
     query = request.args.get('q', '')
-    if not query:
-        return jsonify({'error': 'Search query is required'}), 400
+    success, compiled = parse_search_terms(query)
+    if not success:
+        return jsonify({'error': compiled}), 400
     
     # Get pagination parameters
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 10))
+    page, per_page = get_page_params()
+    max_time_ms = current_app.config['SEARCH_MAX_TIME_MS']
     
-    # Build search query
-    search_query = {
-        '$or': [
-            {'registration_no': {'$regex': query, '$options': 'i'}},
-            {'name': {'$regex': query, '$options': 'i'}},
-            {'email_id': {'$regex': query, '$options': 'i'}},
-            {'specialization': {'$regex': query, '$options': 'i'}}
-        ]
-    }
+    # Registration number and email prefixes go through anchored, indexed lookups first
+    prefix_query = {'$or': [
+        term_predicate(field, term, anchored=True)
+        for term in compiled['terms']
+        for field in ('registration_no', 'email_id')
+    ]}
+    try:
+        prefix_matches = list(db.students.find(prefix_query, {'registration_no': 1})
+                              .limit(MAX_CANDIDATES).max_time_ms(max_time_ms))
+    except ExecutionTimeout:
+        return search_timeout_response()
     
-    # Get total count for pagination
-    total = db.students.count_documents(search_query)
+    # Exact registration numbers rank above prefix matches
+    terms = set(compiled['terms'])
+    prefix_matches.sort(key=lambda student: student['registration_no'] not in terms)
+    ranked = [(student['registration_no'], 1.0) for student in prefix_matches]
     
-    # Apply pagination
-    students = list(db.students.find(search_query).skip((page-1)*per_page).limit(per_page))
+    # Then rank the remaining students by trigram overlap, which tolerates typos
+    seen = {registration_no for registration_no, _ in ranked}
+    for registration_no, score in student_index.search(' '.join(compiled['terms'])):
+        if registration_no not in seen:
+            seen.add(registration_no)
+            ranked.append((registration_no, score))
     
-    # Convert ObjectId to string for JSON serialization and remove sensitive data
+    total = len(ranked)
+    page_matches = ranked[(page-1)*per_page:page*per_page]
+    scores = dict(page_matches)
+    
+    # Load the students on this page in ranked order
+    students = list(db.students.find(
+        {'registration_no': {'$in': list(scores)}},
+        {'password': 0, 'aadhar_no': 0, 'parivar_pehchan_patra_id': 0}
+    ))
+    students.sort(key=lambda student: -scores.get(student['registration_no'], 0))
+    
+    # Convert ObjectId to string for JSON serialization
     for student in students:
         student['_id'] = str(student['_id'])
-        if 'password' in student:
-            del student['password']
+        student['match_score'] = scores.get(student['registration_no'], 0)
     
     return jsonify({
         'students': students,
-        'total': total,
-        'page': page,
-        'per_page': per_page,
-        'pages': (total + per_page - 1) // per_page,
-        'query': query
+        **page_metadata(total, page, per_page),
+        'query': query,
+        'terms': compiled['terms'],
+        'truncated': compiled['truncated']
     }), 200
 
 @search_bp.route('/announcements', methods=['GET'])
@@ -111,26 +139,26 @@ def search_announcements():
     """Search announcements by keyword."""
     # Get search query
     query = request.args.get('q', '')
-    if not query:
-        return jsonify({'error': 'Search query is required'}), 400
-    
-    # Get pagination parameters
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 10))
     
     # Build search query
-    search_query = {
-        '$or': [
-            {'title': {'$regex': query, '$options': 'i'}},
-            {'content': {'$regex': query, '$options': 'i'}}
-        ]
-    }
+    success, compiled = compile_search_query(query, fields=['title', 'content'])
+    if not success:
+        return jsonify({'error': compiled}), 400
+    search_query = compiled['filter']
     
-    # Get total count for pagination
-    total = db.announcements.count_documents(search_query)
+    # Get pagination parameters
+    page, per_page = get_page_params()
+    max_time_ms = current_app.config['SEARCH_MAX_TIME_MS']
     
-    # Apply pagination
-    announcements = list(db.announcements.find(search_query).sort('date', -1).skip((page-1)*per_page).limit(per_page))
+    try:
+        # Fetch the page and its total according to the requested count mode
+        announcements, pagination = paginate_query(
+            db.announcements, search_query, page, per_page, get_count_mode(),
+            sort=[('date', -1)],
+            max_time_ms=max_time_ms
+        )
+    except ExecutionTimeout:
+        return search_timeout_response()
     
     # Convert ObjectId to string for JSON serialization
     for announcement in announcements:
@@ -138,11 +166,10 @@ def search_announcements():
     
     return jsonify({
         'announcements': announcements,
-        'total': total,
-        'page': page,
-        'per_page': per_page,
-        'pages': (total + per_page - 1) // per_page,
-        'query': query
+        **pagination,
+        'query': query,
+        'terms': compiled['terms'],
+        'truncated': compiled['truncated']
     }), 200
 
 @search_bp.route('/global', methods=['GET'])
@@ -151,12 +178,19 @@ def global_search():
     """Global search across multiple collections."""
     # Get search query
     query = request.args.get('q', '')
-    if not query:
-        return jsonify({'error': 'Search query is required'}), 400
     
-    # Get pagination parameters
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 10))
+    # Build search queries
+    success, company_compiled = compile_search_query(
+        query,
+        fields=['name', 'job_title', 'job_description'],
+        base_filter={'active': True}
+    )
+    if not success:
+        return jsonify({'error': company_compiled}), 400
+    _, announcement_compiled = compile_search_query(query, fields=['title', 'content'])
+    company_query = company_compiled['filter']
+    announcement_query = announcement_compiled['filter']
+    max_time_ms = current_app.config['SEARCH_MAX_TIME_MS']
     
     results = {
         'companies': [],
@@ -164,44 +198,90 @@ def global_search():
         'total': 0
     }
     
-    # Search in companies
-    company_query = {
-        '$or': [
-            {'name': {'$regex': query, '$options': 'i'}},
-            {'job_title': {'$regex': query, '$options': 'i'}},
-            {'job_description': {'$regex': query, '$options': 'i'}}
-        ],
-        'active': True
-    }
-    companies = list(db.companies.find(company_query).limit(5))
-    for company in companies:
-        company['_id'] = str(company['_id'])
-        company['type'] = 'company'
-    results['companies'] = companies
-    
-    # Search in announcements
-    announcement_query = {
-        '$or': [
-            {'title': {'$regex': query, '$options': 'i'}},
-            {'content': {'$regex': query, '$options': 'i'}}
-        ]
-    }
-    announcements = list(db.announcements.find(announcement_query).sort('date', -1).limit(5))
-    for announcement in announcements:
-        announcement['_id'] = str(announcement['_id'])
-        announcement['type'] = 'announcement'
-    results['announcements'] = announcements
-    
-    # Combine results for pagination
-    all_results = companies + announcements
-    all_results.sort(key=lambda x: x.get('date', x.get('posted_date', '')), reverse=True)
-    
-    # Calculate total
-    total_companies = db.companies.count_documents(company_query)
-    total_announcements = db.announcements.count_documents(announcement_query)
-    total = total_companies + total_announcements
+    try:
+        # Search in companies
+        companies = list(db.companies.find(company_query).limit(5).max_time_ms(max_time_ms))
+        for company in companies:
+            company['_id'] = str(company['_id'])
+            company['type'] = 'company'
+        results['companies'] = companies
+        
+        # Search in announcements
+        announcements = list(db.announcements.find(announcement_query).sort('date', -1).limit(5).max_time_ms(max_time_ms))
+        for announcement in announcements:
+            announcement['_id'] = str(announcement['_id'])
+            announcement['type'] = 'announcement'
+        results['announcements'] = announcements
+        
+        # Calculate total unless the client opted out of counting
+        count_mode = get_count_mode()
+        if count_mode == COUNT_NONE:
+            del results['total']
+        else:
+            total_companies = count_results(db.companies, company_query, count_mode, max_time_ms)
+            total_announcements = count_results(db.announcements, announcement_query, count_mode, max_time_ms)
+            results['total'] = total_companies + total_announcements
+    except ExecutionTimeout:
+        return search_timeout_response()
     
-    results['total'] = total
+    results['count'] = count_mode
     results['query'] = query
+    results['terms'] = company_compiled['terms']
+    results['truncated'] = company_compiled['truncated']
     
     return jsonify(results), 200
+
+@search_bp.route('/companies/faceted', methods=['GET'])
+@jwt_required()
+def faceted_company_search():
+    """Search companies and return facet counts for the filter options."""
+    # Search terms are optional for faceted browsing
+    query = request.args.get('q', '')
+    base_filter = {'active': True}
+    terms = []
+    if query.strip():
+        success, compiled = compile_search_query(
+            query,
+            fields=['name', 'job_title', 'job_description', 'requirements', 'location'],
+            base_filter=base_filter
+        )
+        if not success:
+            return jsonify({'error': compiled}), 400
+        base_filter = compiled['filter']
+        terms = compiled['terms']
+    
+    # Get facet filters and pagination parameters
+    filters = build_filters(request.args)
+    page, per_page = get_page_params()
+    max_time_ms = current_app.config['SEARCH_MAX_TIME_MS']
+    
+    # Facet counts do not depend on the page, so they are cached per filter combination
+    cache_key = facet_cache_key(base_filter, filters)
+    facets = get_cached_facets(cache_key)
+    pipeline = build_facet_pipeline(base_filter, filters, page, per_page, include_facets=facets is None)
+    
+    try:
+        result = next(db.companies.aggregate(pipeline, maxTimeMS=max_time_ms), {})
+    except ExecutionTimeout:
+        return search_timeout_response()
+    
+    facets_cached = facets is not None
+    if not facets_cached:
+        facets = format_facets(result)
+        cache_facets(cache_key, facets)
+    
+    companies = result.get('results', [])
+    for company in companies:
+        company['_id'] = str(company['_id'])
+    
+    total_result = result.get('total', [])
+    total = total_result[0]['count'] if total_result else 0
+    
+    return jsonify({
+        'companies': companies,
+        **page_metadata(total, page, per_page),
+        'facets': facets,
+        'facets_cached': facets_cached,
+        'query': query,
+        'terms': terms
+    }), 200
@@ -1,20 +1,49 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required
 from bson.objectid import ObjectId
-import time
+from datetime import datetime, timedelta
 
 from app import db
+from app.utils.pagination import get_page_params, get_count_mode, paginate_query
+from app.utils.catalogue import catalogue_version, ANNOUNCEMENTS
+from app.utils.http_cache import conditional, check_not_modified, make_etag
+from app.utils.singleflight import SingleFlight, query_key
+
+# Announcements change rarely, so clients may reuse them briefly before revalidating
+ANNOUNCEMENT_CACHE_CONTROL = 'private, max-age=60'
 
 announcement_bp = Blueprint('announcement', __name__)
 
+# Students flood these reads right after an announcement goes out
+_announcement_queries = SingleFlight('announcements')
+
+def find_announcements(query, limit):
+    """
+    Return the newest announcements matching query, with string IDs.
+
+    Identical concurrent queries share one execution, so the returned list
+    must not be mutated.
+    """
+    def run():
+        announcements = list(db.announcements.find(query).sort('date', -1).limit(limit))
+        for announcement in announcements:
+            announcement['_id'] = str(announcement['_id'])
+        return announcements
+
+    return _announcement_queries.do(query_key('announcements', query, limit), run)
+
 @announcement_bp.route('/', methods=['GET'])
 @jwt_required()
+@conditional(ANNOUNCEMENT_CACHE_CONTROL)
 def get_all_announcements():
     """Get all announcements with optional filtering and pagination."""
+    # The list only changes when an announcement is published
+    not_modified = check_not_modified(make_etag('announcements', catalogue_version(ANNOUNCEMENTS), request.full_path))
+    if not_modified:
+        return not_modified
+    
     # Get pagination parameters
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 10))
-    skip = (page - 1) * per_page
+    page, per_page = get_page_params()
     
     # Get filter parameters
     important_only = request.args.get('important', '').lower() == 'true'
@@ -31,11 +60,10 @@ def get_all_announcements():
         except ValueError:
             pass
     
-    # Get total count
-    total = db.announcements.count_documents(query)
-    
     # Get announcements
-    announcements = list(db.announcements.find(query).sort('date', -1).skip(skip).limit(per_page))
+    announcements, pagination = paginate_query(
+        db.announcements, query, page, per_page, get_count_mode(), sort=[('date', -1)]
+    )
     
     # Convert ObjectId to string for JSON serialization
     for announcement in announcements:
@@ -43,14 +71,12 @@ def get_all_announcements():
     
     return jsonify({
         'announcements': announcements,
-        'total': total,
-        'page': page,
-        'per_page': per_page,
-        'pages': (total + per_page - 1) // per_page
+        **pagination
     }), 200
 
 @announcement_bp.route('/<announcement_id>', methods=['GET'])
 @jwt_required()
+@conditional(ANNOUNCEMENT_CACHE_CONTROL)
 def get_announcement(announcement_id):
     """Get a specific announcement by ID."""
     try:
@@ -76,23 +102,19 @@ def get_announcement(announcement_id):
 
 @announcement_bp.route('/recent', methods=['GET'])
 @jwt_required()
+@conditional(ANNOUNCEMENT_CACHE_CONTROL)
 def get_recent_announcements():
     """Get recent announcements (last 30 days by default)."""
     # Get the number of days to look back
     days = int(request.args.get('days', 30))
     limit = int(request.args.get('limit', 5))
     
-    # Calculate the timestamp for the specified number of days ago
-    cutoff_date = time.time() - (days * 24 * 60 * 60)
+    # Announcement dates are stored as UTC datetimes; the cutoff is rounded down
+    # to the minute so concurrent requests issue identical queries
+    cutoff_date = datetime.utcnow().replace(second=0, microsecond=0) - timedelta(days=days)
     
     # Get announcements newer than the cutoff date
-    announcements = list(db.announcements.find({
-        'date': {'$gte': cutoff_date}
-    }).sort('date', -1).limit(limit))
-    
-    # Convert ObjectId to string for JSON serialization
-    for announcement in announcements:
-        announcement['_id'] = str(announcement['_id'])
+    announcements = find_announcements({'date': {'$gte': cutoff_date}}, limit)
     
     return jsonify({
         'announcements': announcements,
@@ -101,18 +123,17 @@ def get_recent_announcements():
 
 @announcement_bp.route('/important', methods=['GET'])
 @jwt_required()
+@conditional(ANNOUNCEMENT_CACHE_CONTROL)
 def get_important_announcements():
     """Get important announcements."""
+    not_modified = check_not_modified(make_etag('announcements', catalogue_version(ANNOUNCEMENTS), request.full_path))
+    if not_modified:
+        return not_modified
+    
     limit = int(request.args.get('limit', 5))
     
     # Get important announcements
-    announcements = list(db.announcements.find({
-        'important': True
-    }).sort('date', -1).limit(limit))
-    
-    # Convert ObjectId to string for JSON serialization
-    for announcement in announcements:
-        announcement['_id'] = str(announcement['_id'])
+    announcements = find_announcements({'important': True}, limit)
     
     return jsonify({
         'announcements': announcements,
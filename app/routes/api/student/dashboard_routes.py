@@ -1,63 +1,75 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
-import time
+from datetime import datetime
 
 from app import db
 from app.auth.utils import user_to_json
+from app.utils.shared_cache import shared_cache
+from app.utils.catalogue import catalogue_version, COMPANIES, ANNOUNCEMENTS
+from app.utils.student_counters import get_counters
+from app.utils.concurrency import fan_out
+from app.routes.api.student.announcement_routes import find_announcements
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
+def active_companies_count():
+    """Return the number of active postings, shared by every worker until the catalogue changes."""
+    return shared_cache.get_or_compute(
+        'active_companies',
+        lambda: db.companies.count_documents({'active': True}),
+        version=catalogue_version(COMPANIES)
+    )
+
+def recent_announcements():
+    """Return the five most recent announcements, shared by every worker until one is published."""
+    return shared_cache.get_or_compute(
+        'recent_announcements',
+        lambda: find_announcements({}, 5),
+        version=catalogue_version(ANNOUNCEMENTS)
+    )
+
+def dashboard_stats(counters, active_companies):
+    """Build the dashboard statistics from a student's counters."""
+    return {
+        'unread_messages': counters['unread_messages'],
+        'upcoming_interviews': counters['upcoming_interviews'],
+        'active_companies': active_companies,
+        'applied_companies': counters['applied'],
+        'rejected_companies': counters['rejected'],
+        'interviews_attended': counters['interviews_attended'],
+        'interviews_not_attended': counters['interviews_not_attended']
+    }
+
 @dashboard_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_dashboard_data():
     """Get all user data for the dashboard."""
     current_user = get_jwt_identity()
     
-    # Get user data
-    user = db.students.find_one({'registration_no': current_user})
+    # The queries are independent, so they run concurrently
+    results, degraded = fan_out({
+        'user': lambda: db.students.find_one({'registration_no': current_user}),
+        'announcements': recent_announcements,
+        'counters': lambda: get_counters(current_user),
+        'active_companies': active_companies_count
+    }, defaults={'announcements': []})
+    
+    if 'user' in degraded:
+        return jsonify({'error': 'Dashboard is temporarily unavailable'}), 503
+    user = results['user']
     if not user:
         return jsonify({'error': 'User not found'}), 404
     
-    # Get announcements (most recent 5)
-    announcements = list(db.announcements.find().sort('date', -1).limit(5))
-    for announcement in announcements:
-        announcement['_id'] = str(announcement['_id'])
-    
-    # Get unread messages count
-    unread_messages = db.messages.count_documents({
-        'recipient_id': current_user,
-        'read': False
-    })
-    
-    # Get upcoming interview count
-    upcoming_interviews = db.interviews.count_documents({
-        'student_id': current_user,
-        'status': 'scheduled'
-    })
-    
-    # Convert user to JSON-serializable format
-    user_data = user_to_json(user)
-    
-    # Get active companies count
-    active_companies = db.companies.count_documents({
-        'active': True
-    })
-    
-    # Convert user to JSON-serializable format
-    user_data = user_to_json(user)
+    # Stats are left out rather than failing the whole dashboard
+    stats = None
+    if results['counters'] is not None:
+        stats = dashboard_stats(results['counters'], results['active_companies'])
     
     return jsonify({
-        'user': user_data,
-        'recent_announcements': announcements,
-        'stats': {
-            'unread_messages': unread_messages,
-            'upcoming_interviews': upcoming_interviews,
-            'active_companies': active_companies,
-            'applied_companies': len(user.get('companies', {}).get('applied', [])),
-            'rejected_companies': len(user.get('companies', {}).get('rejected', [])),
-            'interviews_attended': len(user.get('companies', {}).get('interviews_attended', [])),
-            'interviews_not_attended': len(user.get('companies', {}).get('interviews_not_attended', []))
-        }
+        'user': user_to_json(user),
+        'recent_announcements': results['announcements'],
+        'stats': stats,
+        'degraded': degraded
     }), 200
 
 @dashboard_bp.route('/stats', methods=['GET'])
@@ -66,44 +78,13 @@ def get_dashboard_stats():
     """Get only the dashboard statistics."""
     current_user = get_jwt_identity()
     
-    # Get user data
-    user = db.students.find_one({'registration_no': current_user})
-    if not user:
+    # One point read of the counters document
+    counters = get_counters(current_user)
+    if counters is None:
         return jsonify({'error': 'User not found'}), 404
     
-    # Get unread messages count
-    unread_messages = db.messages.count_documents({
-        'recipient_id': current_user,
-        'read': False
-    })
-    
-    # Get upcoming interview count
-    upcoming_interviews = db.interviews.count_documents({
-        'student_id': current_user,
-        'status': 'scheduled'
-    })
-    
-    # Get active companies count
-    active_companies = db.companies.count_documents({
-        'active': True
-    })
-    
-    # Get application status counts
-    applied_companies = len(user.get('companies', {}).get('applied', []))
-    rejected_companies = len(user.get('companies', {}).get('rejected', []))
-    interviews_attended = len(user.get('companies', {}).get('interviews_attended', []))
-    interviews_not_attended = len(user.get('companies', {}).get('interviews_not_attended', []))
-    
     return jsonify({
-        'stats': {
-            'unread_messages': unread_messages,
-            'upcoming_interviews': upcoming_interviews,
-            'active_companies': active_companies,
-            'applied_companies': applied_companies,
-            'rejected_companies': rejected_companies,
-            'interviews_attended': interviews_attended,
-            'interviews_not_attended': interviews_not_attended
-        }
+        'stats': dashboard_stats(counters, active_companies_count())
     }), 200
 
 @dashboard_bp.route('/upcoming-deadlines', methods=['GET'])
@@ -113,8 +94,8 @@ def get_upcoming_deadlines():
     # Get limit parameter
     limit = int(request.args.get('limit', 5))
     
-    # Current time
-    current_time = time.time()
+    # Deadlines are stored as dates (see scripts/migrate_deadlines.py)
+    current_time = datetime.now()
     
     # Get companies with upcoming deadlines
     companies = list(db.companies.find({
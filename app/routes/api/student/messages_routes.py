@@ -4,6 +4,8 @@ from bson.objectid import ObjectId
 from datetime import datetime
 
 from app import db
+from app.utils.student_counters import increment_counters
+from app.utils import events
 
 message_bp = Blueprint('messages', __name__)
 
@@ -54,10 +56,12 @@ def get_message(message_id):
         
         # Mark message as read if user is recipient
         if message['recipient_id'] == current_user and not message.get('read', False):
-            db.messages.update_one(
-                {'_id': ObjectId(message_id)},
+            result = db.messages.update_one(
+                {'_id': ObjectId(message_id), 'read': False},
                 {'$set': {'read': True}}
             )
+            if result.modified_count:
+                increment_counters(current_user, unread_messages=-1)
             message['read'] = True
         
         # Convert ObjectId to string for JSON serialization
@@ -101,6 +105,9 @@ def send_message():
     result = db.messages.insert_one(new_message)
     
     if result.inserted_id:
+        events.emit(events.MESSAGE_SENT, message=new_message)
+        increment_counters(recipient_id, unread_messages=1)
+        
         return jsonify({
             'message': 'Message sent successfully',
             'message_id': str(result.inserted_id)
@@ -135,6 +142,10 @@ def delete_message(message_id):
         result = db.messages.delete_one({'_id': ObjectId(message_id)})
         
         if result.deleted_count:
+            # An unread message no longer counts for its recipient
+            if not message.get('read', False):
+                increment_counters(message['recipient_id'], unread_messages=-1)
+            
             return jsonify({
                 'message': 'Message deleted successfully'
             }), 200
@@ -1,9 +1,15 @@
-from flask import Blueprint, jsonify, request
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, jsonify, request, current_app, Response
+from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
 from bson.objectid import ObjectId
-import time
 
 from app import db
+from app.utils.pagination import get_page_params, get_count_mode
+from app.utils.student_counters import increment_counters
+from app.utils.notifications import (
+    build_notification, list_notifications, advance_read_watermark, count_unread_broadcasts
+)
+from app.utils.notification_stream import open_stream, event_stream, issue_stream_ticket, redeem_stream_ticket
+from app.utils import events
 
 notification_bp = Blueprint('notifications', __name__)
 
@@ -14,9 +20,7 @@ def get_all_notifications():
     current_user = get_jwt_identity()
     
     # Get pagination parameters
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 10))
-    skip = (page - 1) * per_page
+    page, per_page = get_page_params()
     
     # Get filter parameters
     read_status = request.args.get('read')
@@ -27,16 +31,10 @@ def get_all_notifications():
     else:
         read_filter = None
     
-    # Build query
-    query = {'recipient_id': current_user}
-    if read_filter is not None:
-        query['read'] = read_filter
-    
-    # Get total count
-    total = db.notifications.count_documents(query)
-    
-    # Get notifications
-    notifications = list(db.notifications.find(query).sort('timestamp', -1).skip(skip).limit(per_page))
+    # Get notifications, merged with broadcasts to every student
+    notifications, pagination = list_notifications(
+        current_user, read_filter, page, per_page, get_count_mode()
+    )
     
     # Convert ObjectId to string for JSON serialization
     for notification in notifications:
@@ -44,10 +42,7 @@ def get_all_notifications():
     
     return jsonify({
         'notifications': notifications,
-        'total': total,
-        'page': page,
-        'per_page': per_page,
-        'pages': (total + per_page - 1) // per_page
+        **pagination
     }), 200
 
 @notification_bp.route('/<notification_id>', methods=['GET'])
@@ -68,14 +63,20 @@ def get_notification(notification_id):
         })
         
         if not notification:
-            return jsonify({'error': 'Notification not found or you do not have permission to view it'}), 404
-        
-        # Mark notification as read
-        if not notification.get('read', False):
-            db.notifications.update_one(
-                {'_id': ObjectId(notification_id)},
+            # Broadcasts are read up to a watermark rather than one by one
+            notification = db.broadcast_notifications.find_one({'_id': ObjectId(notification_id)})
+            if not notification:
+                return jsonify({'error': 'Notification not found or you do not have permission to view it'}), 404
+            advance_read_watermark(current_user, notification['timestamp'])
+            notification.update({'recipient_id': current_user, 'read': True, 'broadcast': True})
+        elif not notification.get('read', False):
+            # Mark notification as read
+            result = db.notifications.update_one(
+                {'_id': ObjectId(notification_id), 'read': False},
                 {'$set': {'read': True}}
             )
+            if result.modified_count:
+                increment_counters(current_user, unread_notifications=-1)
             notification['read'] = True
         
         # Convert ObjectId to string for JSON serialization
@@ -99,17 +100,24 @@ def mark_notification_read(notification_id):
         if not ObjectId.is_valid(notification_id):
             return jsonify({'error': 'Invalid notification ID format'}), 400
         
-        # Find and update the notification
+        # Find and update the notification; only an unread one changes the counter
         result = db.notifications.update_one(
             {
                 '_id': ObjectId(notification_id),
-                'recipient_id': current_user
+                'recipient_id': current_user,
+                'read': False
             },
             {'$set': {'read': True}}
         )
         
-        if result.matched_count == 0:
-            return jsonify({'error': 'Notification not found or you do not have permission to update it'}), 404
+        if result.modified_count:
+            increment_counters(current_user, unread_notifications=-1)
+        elif not db.notifications.find_one({'_id': ObjectId(notification_id), 'recipient_id': current_user}, {'_id': 1}):
+            # Reading a broadcast marks it and every older broadcast as read
+            broadcast = db.broadcast_notifications.find_one({'_id': ObjectId(notification_id)}, {'timestamp': 1})
+            if not broadcast:
+                return jsonify({'error': 'Notification not found or you do not have permission to update it'}), 404
+            advance_read_watermark(current_user, broadcast['timestamp'])
         
         return jsonify({
             'message': 'Notification marked as read'
@@ -133,9 +141,16 @@ def mark_all_notifications_read():
             },
             {'$set': {'read': True}}
         )
+        increment_counters(current_user, unread_notifications=-result.modified_count)
+        
+        # Broadcasts are marked read by moving the watermark
+        previous, read_until = advance_read_watermark(current_user)
+        broadcasts_read = db.broadcast_notifications.count_documents({
+            'timestamp': {'$gt': previous, '$lte': read_until}
+        })
         
         return jsonify({
-            'message': f'{result.modified_count} notifications marked as read'
+            'message': f'{result.modified_count + broadcasts_read} notifications marked as read'
         }), 200
     
     except Exception as e:
@@ -152,7 +167,7 @@ def get_unread_count():
         count = db.notifications.count_documents({
             'recipient_id': current_user,
             'read': False
-        })
+        }) + count_unread_broadcasts(current_user)
         
         return jsonify({
             'unread_count': count
@@ -161,6 +176,55 @@ def get_unread_count():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@notification_bp.route('/stream/ticket', methods=['POST'])
+@jwt_required()
+def create_stream_ticket():
+    """Issue a short-lived, single-use ticket that opens a notification stream."""
+    current_user = get_jwt_identity()
+    
+    ttl = current_app.config['STREAM_TICKET_SECONDS']
+    ticket = issue_stream_ticket(current_user, ttl)
+    
+    return jsonify({
+        'ticket': ticket,
+        'expires_in': ttl
+    }), 201
+
+@notification_bp.route('/stream', methods=['GET'])
+def stream_notifications():
+    """
+    Push new notifications, messages and unread counts as Server-Sent Events.
+    
+    Browsers' EventSource cannot set headers, so browsers pass a ticket from
+    POST /notifications/stream/ticket as the ticket query parameter; the JWT
+    never appears in URLs or access logs. Other clients may send the usual
+    Authorization header instead.
+    """
+    ticket = request.args.get('ticket')
+    if ticket:
+        current_user = redeem_stream_ticket(ticket)
+        if current_user is None:
+            return jsonify({'error': 'Invalid or expired stream ticket'}), 401
+    else:
+        verify_jwt_in_request(locations=['headers'])
+        current_user = get_jwt_identity()
+    
+    # Each open stream holds a worker thread, so leave some for ordinary requests
+    subscription = open_stream(current_user, current_app.config['STREAM_MAX_CONNECTIONS'])
+    if subscription is None:
+        return jsonify({'error': 'Too many open streams, poll /notifications/unread-count instead'}), 503
+    
+    return Response(
+        event_stream(
+            current_user,
+            subscription,
+            current_app.config['STREAM_HEARTBEAT_SECONDS'],
+            current_app.config['STREAM_MAX_SECONDS']
+        ),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 # Helper function to create a notification (not exposed as an API endpoint)
 def create_notification(recipient_id, title, message, notification_type, related_id=None):
     """
@@ -176,15 +240,10 @@ def create_notification(recipient_id, title, message, notification_type, related
     Returns:
         str: The ID of the created notification
     """
-    notification = {
-        'recipient_id': recipient_id,
-        'title': title,
-        'message': message,
-        'type': notification_type,
-        'related_id': related_id,
-        'timestamp': time.time(),
-        'read': False
-    }
+    notification = build_notification(recipient_id, title, message, notification_type, related_id)
     
     result = db.notifications.insert_one(notification)
+    if result.inserted_id:
+        events.emit(events.NOTIFICATIONS_CREATED, notifications=[notification])
+        increment_counters(recipient_id, unread_notifications=1)
     return str(result.inserted_id) if result.inserted_id else None
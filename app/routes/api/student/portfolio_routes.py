@@ -5,6 +5,7 @@ import os
 from app import db
 from app.auth.utils import user_to_json
 from app.utils.file_utils import get_file
+from app.utils.http_cache import conditional
 
 portfolio_bp = Blueprint('portfolio', __name__)
 
@@ -105,6 +106,7 @@ def download_certification(certification_index):
     return get_file(cert_path, as_attachment=True, custom_filename=download_name)
 
 @portfolio_bp.route('/public/<registration_no>', methods=['GET'])
+@conditional('public, max-age=60')
 def get_public_portfolio(registration_no):
     """Get the public portfolio of a specific user."""
     # Get user data
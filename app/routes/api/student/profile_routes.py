@@ -6,6 +6,9 @@ from datetime import datetime
 from app import db
 from app.auth.utils import user_to_json
 from app.utils.file_utils import save_uploaded_file, delete_file
+from app.utils.trigram_index import index_student, student_search_text
+from app.utils.skills import canonicalize_skills
+from app.utils.recommendation_cache import invalidate_recommendations
 
 profile_bp = Blueprint('profile', __name__)
 
@@ -46,7 +49,18 @@ def update_profile():
     protected_fields = ['_id', 'registration_no', 'password', 'registered', 'cv']
     
     # Remove protected fields from update data
-    update_data = {k: v for k, v in data.items() if k not in protected_fields}
+    update_data = {k: v for k, v in data.items() if k not in protected_fields and k != 'skill_ids'}
+    
+    # Technical skills are stored as canonical names alongside their skill IDs
+    technical_skills = update_data.get('skills.technical')
+    if technical_skills is None and isinstance(update_data.get('skills'), dict):
+        technical_skills = update_data['skills'].get('technical')
+    if isinstance(technical_skills, list):
+        canonical_names, update_data['skill_ids'] = canonicalize_skills(technical_skills)
+        if 'skills.technical' in update_data:
+            update_data['skills.technical'] = canonical_names
+        else:
+            update_data['skills'] = {**update_data['skills'], 'technical': canonical_names}
     
     # Update user data
     result = db.students.update_one(
@@ -55,6 +69,16 @@ def update_profile():
     )
     
     if result.modified_count:
+        # Re-index the student if a fuzzy-searchable field changed
+        updated_user = {**user, **update_data}
+        if student_search_text(updated_user) != student_search_text(user):
+            index_student(updated_user)
+        
+        # Precomputed recommendations no longer reflect changed skills or interests
+        if any(key == 'interests' or key.split('.')[0] == 'skills' for key in update_data):
+            db.student_recommendations.delete_one({'registration_no': current_user})
+            invalidate_recommendations(current_user)
+        
         return jsonify({
             'message': 'Profile updated successfully'
         }), 200
@@ -135,14 +159,19 @@ def add_experience():
         if field not in data:
             return jsonify({'error': f'Missing required field: {field}'}), 400
     
-    # Create experience object
+    if not isinstance(data.get('skills_used', []), list):
+        return jsonify({'error': 'skills_used must be a list'}), 400
+    
+    # Create experience object with canonical skill names and IDs
+    skills_used, skill_ids = canonicalize_skills(data.get('skills_used', []))
     experience = {
         'company_name': data['company_name'],
         'position': data['position'],
         'start_date': data['start_date'],
         'end_date': data['end_date'],
         'description': data['description'],
-        'skills_used': data.get('skills_used', [])
+        'skills_used': skills_used,
+        'skill_ids': skill_ids
     }
     
     # Add experience to user profile
@@ -253,11 +282,16 @@ def add_project():
         if field not in data:
             return jsonify({'error': f'Missing required field: {field}'}), 400
     
-    # Create project object
+    if not isinstance(data['technologies_used'], list):
+        return jsonify({'error': 'technologies_used must be a list'}), 400
+    
+    # Create project object with canonical technology names and IDs
+    technologies_used, skill_ids = canonicalize_skills(data['technologies_used'])
     project = {
         'project_name': data['project_name'],
         'description': data['description'],
-        'technologies_used': data['technologies_used'],
+        'technologies_used': technologies_used,
+        'skill_ids': skill_ids,
         'start_date': data.get('start_date', ''),
         'end_date': data.get('end_date', ''),
         'github_link': data.get('github_link', ''),
@@ -419,9 +453,13 @@ def update_skills():
     if 'technical' not in data and 'non_technical' not in data:
         return jsonify({'error': 'At least one of technical or non_technical skills must be provided'}), 400
     
+    if 'technical' in data and not isinstance(data['technical'], list):
+        return jsonify({'error': 'technical skills must be a list'}), 400
+    
     update_fields = {}
     if 'technical' in data:
-        update_fields['skills.technical'] = data['technical']
+        # Store canonical skill names and their IDs
+        update_fields['skills.technical'], update_fields['skill_ids'] = canonicalize_skills(data['technical'])
     if 'non_technical' in data:
         update_fields['skills.non_technical'] = data['non_technical']
     
@@ -432,6 +470,10 @@ def update_skills():
     )
     
     if result.modified_count:
+        # Precomputed recommendations no longer reflect the student's skills
+        db.student_recommendations.delete_one({'registration_no': current_user})
+        invalidate_recommendations(current_user)
+        
         return jsonify({
             'message': 'Skills updated successfully'
         }), 200
@@ -1,20 +1,39 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from bson.objectid import ObjectId
-import re
 
 from app import db
+from app.utils.pagination import get_page_params, get_count_mode, paginate_query, page_metadata
+from app.utils.recommender import company_recommender
+from app.utils.skills import resolve_skill_ids
+from app.utils.catalogue import catalogue_version
+from app.utils.recommendation_cache import profile_fingerprint, get_cached_recommendations, cache_recommendations
+from app.utils.coapplication import collaborative_scores, blend_rankings, TOP_K as COAPPLICATION_TOP_K
+from app.utils.similarity import update_similar_companies, TOP_K
+from app.utils.background import submit_background
+from app.utils.trending import top_trending, current_score
 
 recommendation_bp = Blueprint('recommendations', __name__)
 
 @recommendation_bp.route('/companies', methods=['GET'])
 @jwt_required()
 def get_recommended_companies():
-    """Get recommended companies based on user skills and interests."""
+    """
+    Get recommended companies based on user skills and interests.
+    
+    With ``mode=blended`` the skill match is blended with co-application
+    scores ("students who applied where you applied also applied to...").
+    """
     current_user = get_jwt_identity()
+    mode = request.args.get('mode', 'skills')
+    if mode not in ('skills', 'blended'):
+        return jsonify({'error': 'mode must be one of: skills, blended'}), 400
     
     # Get user data
-    user = db.students.find_one({'registration_no': current_user})
+    user = db.students.find_one(
+        {'registration_no': current_user},
+        {'skills.technical': 1, 'skill_ids': 1, 'interests': 1, 'companies.applied': 1}
+    )
     if not user:
         return jsonify({'error': 'User not found'}), 404
     
@@ -23,14 +42,13 @@ def get_recommended_companies():
     interests = user.get('interests', [])
     
     # Get pagination parameters
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 10))
+    page, per_page = get_page_params()
+    count_mode = get_count_mode()
     
     # If user has no skills or interests, return active companies
     if not technical_skills and not interests:
         query = {'active': True}
-        total = db.companies.count_documents(query)
-        companies = list(db.companies.find(query).skip((page-1)*per_page).limit(per_page))
+        companies, pagination = paginate_query(db.companies, query, page, per_page, count_mode)
         
         # Convert ObjectId to string for JSON serialization
         for company in companies:
@@ -38,116 +56,122 @@ def get_recommended_companies():
         
         return jsonify({
             'companies': companies,
-            'total': total,
-            'page': page,
-            'per_page': per_page,
-            'pages': (total + per_page - 1) // per_page,
+            **pagination,
             'recommendation_type': 'general'
         }), 200
     
-    # Build query to find companies that match user skills or interests
-    skill_queries = []
-    for skill in technical_skills:
-        skill_queries.append({'requirements': {'$regex': re.escape(skill), '$options': 'i'}})
-    
-    interest_queries = []
-    for interest in interests:
-        interest_queries.append({'job_description': {'$regex': re.escape(interest), '$options': 'i'}})
-        interest_queries.append({'job_title': {'$regex': re.escape(interest), '$options': 'i'}})
-    
-    # Combine queries
-    combined_queries = skill_queries + interest_queries
-    
-    if combined_queries:
-        query = {
-            '$or': combined_queries,
-            'active': True
-        }
+    # Reuse this student's ranking while neither the catalogue nor their profile changed
+    version = catalogue_version()
+    fingerprint = profile_fingerprint(technical_skills, interests, user.get('skill_ids'))
+    cached = get_cached_recommendations(current_user, version, fingerprint)
+    if cached is not None:
+        ranked, source = cached
     else:
-        query = {'active': True}
+        # Serve the batch-computed ranking when it covers this student and the
+        # catalogue has not changed since it was computed, otherwise score every
+        # active company live; either way paginate the global ranking
+        precomputed = db.student_recommendations.find_one(
+            {'registration_no': current_user}, {'companies': 1, 'catalogue_version': 1}
+        )
+        if precomputed is not None and precomputed.get('catalogue_version') == version:
+            ranked = [(str(entry['company_id']), entry['match_percentage']) for entry in precomputed['companies']]
+            source = 'precomputed'
+            ranked_version = version
+        else:
+            # Reloads this worker's index if the catalogue changed elsewhere
+            skill_ids = user.get('skill_ids') or resolve_skill_ids(technical_skills)
+            ranked, ranked_version = company_recommender.rank_at(version, technical_skills, interests, skill_ids)
+            source = 'live'
+        # Only a ranking of exactly this catalogue version may be cached under it
+        if ranked_version == version:
+            cache_recommendations(current_user, version, fingerprint, (ranked, source))
     
-    # Get total count for pagination
-    total = db.companies.count_documents(query)
+    # Co-application scores come from one indexed read of the related companies table
+    if mode == 'blended':
+        applied = user.get('companies', {}).get('applied', [])
+        collaborative = collaborative_scores(applied)
+        # Co-application data may name inactive postings; drop them so totals match the pages
+        active = {
+            str(company['_id'])
+            for company in db.companies.find(
+                {'_id': {'$in': [ObjectId(company_id) for company_id in collaborative]}, 'active': True},
+                {'_id': 1}
+            )
+        }
+        ranked = blend_rankings(ranked, {
+            company_id: score for company_id, score in collaborative.items() if company_id in active
+        })
+    page_ranked = ranked[(page-1)*per_page:page*per_page]
+    match_percentages = dict(page_ranked)
     
-    # Apply pagination
-    companies = list(db.companies.find(query).skip((page-1)*per_page).limit(per_page))
+    # Load only the companies on this page
+    companies = list(db.companies.find({
+        '_id': {'$in': [ObjectId(company_id) for company_id, _ in page_ranked]},
+        'active': True
+    }))
     
-    # Calculate match score for each company
     for company in companies:
         company['_id'] = str(company['_id'])
-        
-        # Calculate match score based on how many skills and interests match
-        match_count = 0
-        requirements = company.get('requirements', '').lower()
-        job_description = company.get('job_description', '').lower()
-        job_title = company.get('job_title', '').lower()
-        
-        for skill in technical_skills:
-            if skill.lower() in requirements:
-                match_count += 2  # Skills are weighted more heavily
-        
-        for interest in interests:
-            if interest.lower() in job_description or interest.lower() in job_title:
-                match_count += 1
-        
-        # Calculate match percentage
-        total_factors = len(technical_skills) * 2 + len(interests)
-        if total_factors > 0:
-            company['match_percentage'] = min(100, int((match_count / total_factors) * 100))
-        else:
-            company['match_percentage'] = 0
+        company['match_percentage'] = match_percentages.get(company['_id'], 0)
     
-    # Sort by match percentage
-    companies.sort(key=lambda x: x.get('match_percentage', 0), reverse=True)
+    # Keep the global ranking order within the page
+    positions = {company_id: position for position, (company_id, _) in enumerate(page_ranked)}
+    companies.sort(key=lambda x: positions.get(x['_id'], len(positions)))
     
     return jsonify({
         'companies': companies,
-        'total': total,
-        'page': page,
-        'per_page': per_page,
-        'pages': (total + per_page - 1) // per_page,
-        'recommendation_type': 'personalized'
+        **page_metadata(len(ranked), page, per_page),
+        'recommendation_type': 'blended' if mode == 'blended' else 'personalized',
+        'source': source,
+        'cached': cached is not None
     }), 200
 
 @recommendation_bp.route('/similar-companies/<company_id>', methods=['GET'])
 @jwt_required()
 def get_similar_companies(company_id):
-    """Get companies similar to the specified company."""
+    """Get companies similar to the specified company from the precomputed table."""
     try:
         # Validate the ObjectId format
         if not ObjectId.is_valid(company_id):
             return jsonify({'error': 'Invalid company ID format'}), 400
         
-        # Find the company
-        company = db.companies.find_one({'_id': ObjectId(company_id)})
-        if not company:
-            return jsonify({'error': 'Company not found'}), 404
-        
-        # Extract key features for similarity matching
-        job_title = company.get('job_title', '')
-        job_type = company.get('job_type', '')
-        requirements = company.get('requirements', '')
-        
-        # Build query to find similar companies
-        query = {
-            '_id': {'$ne': ObjectId(company_id)},  # Exclude the current company
-            'active': True,
-            '$or': [
-                {'job_title': {'$regex': job_title.split(' ')[0] if job_title else '', '$options': 'i'}},
-                {'job_type': job_type},
-                {'requirements': {'$regex': '|'.join(requirements.split(',')[:3]) if requirements else '', '$options': 'i'}}
-            ]
-        }
-        
         # Get limit parameter
-        limit = int(request.args.get('limit', 5))
+        limit = min(int(request.args.get('limit', 5)), TOP_K)
         
-        # Find similar companies
-        similar_companies = list(db.companies.find(query).limit(limit))
+        # Neighbours and their summaries are stored together, so this is one read
+        entry = db.similar_companies.find_one({'company_id': ObjectId(company_id)}, {'neighbours': 1})
         
-        # Convert ObjectId to string for JSON serialization
-        for similar in similar_companies:
-            similar['_id'] = str(similar['_id'])
+        if not entry:
+            company = db.companies.find_one({'_id': ObjectId(company_id)}, {'active': 1})
+            if not company:
+                return jsonify({'error': 'Company not found'}), 404
+            
+            # Not computed yet (e.g. a new posting); compute it for the next request
+            submit_background(update_similar_companies, ObjectId(company_id))
+            return jsonify({
+                'similar_companies': [],
+                'count': 0
+            }), 200
+        
+        # Stored lists may still name postings deactivated since they were computed
+        neighbours = entry.get('neighbours', [])
+        active = {
+            company['_id']
+            for company in db.companies.find(
+                {'_id': {'$in': [neighbour['company_id'] for neighbour in neighbours]}, 'active': True},
+                {'_id': 1}
+            )
+        }
+        
+        similar_companies = []
+        for neighbour in neighbours:
+            if neighbour['company_id'] not in active:
+                continue
+            similar = dict(neighbour)
+            similar['_id'] = str(similar.pop('company_id'))
+            similar_companies.append(similar)
+            if len(similar_companies) == limit:
+                break
         
         return jsonify({
             'similar_companies': similar_companies,
@@ -157,62 +181,84 @@ def get_similar_companies(company_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@recommendation_bp.route('/related-companies/<company_id>', methods=['GET'])
+@jwt_required()
+def get_related_companies(company_id):
+    """Get companies that applicants of the specified company also applied to."""
+    try:
+        # Validate the ObjectId format
+        if not ObjectId.is_valid(company_id):
+            return jsonify({'error': 'Invalid company ID format'}), 400
+        
+        # Get limit parameter
+        limit = min(int(request.args.get('limit', 5)), COAPPLICATION_TOP_K)
+        
+        entry = db.related_companies.find_one(
+            {'company_id': ObjectId(company_id)},
+            {'related': {'$slice': limit * 2}}
+        )
+        related = entry.get('related', []) if entry else []
+        
+        # Get company details for the related companies that are still active
+        companies = {
+            company['_id']: company
+            for company in db.companies.find({
+                '_id': {'$in': [item['company_id'] for item in related]},
+                'active': True
+            })
+        }
+        
+        related_companies = []
+        for item in related:
+            company = companies.get(item['company_id'])
+            if not company:
+                continue
+            company['_id'] = str(company['_id'])
+            company['co_application_score'] = item['score']
+            company['co_applicants'] = item['co_applicants']
+            related_companies.append(company)
+            if len(related_companies) == limit:
+                break
+        
+        return jsonify({
+            'related_companies': related_companies,
+            'count': len(related_companies)
+        }), 200
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @recommendation_bp.route('/trending', methods=['GET'])
 @jwt_required()
 def get_trending_companies():
-    """Get trending companies based on application count and recency."""
+    """Get trending companies ranked by their exponentially decayed application score."""
     try:
         # Get limit parameter
-        limit = int(request.args.get('limit', 10))
-        
-        # Aggregate applications by company with recency factor
-        pipeline = [
-            # Match only recent applications (last 30 days)
-            {'$match': {
-                'applied_date': {'$gte': {'$subtract': [{'$now': {}}, {'$multiply': [30, 24, 60, 60, 1000]}]}}
-            }},
-            # Group by company
-            {'$group': {
-                '_id': '$company_id',
-                'application_count': {'$sum': 1},
-                'latest_application': {'$max': '$applied_date'}
-            }},
-            # Calculate trending score (application count * recency factor)
-            {'$addFields': {
-                'days_ago': {
-                    '$divide': [
-                        {'$subtract': [{'$now': {}}, '$latest_application']},
-                        {'$multiply': [24, 60, 60, 1000]}  # Convert ms to days
-                    ]
-                }
-            }},
-            {'$addFields': {
-                'recency_factor': {'$divide': [1, {'$add': [1, '$days_ago']}]},
-                'trending_score': {
-                    '$multiply': [
-                        '$application_count',
-                        {'$divide': [1, {'$add': [1, '$days_ago']}]}
-                    ]
-                }
-            }},
-            # Sort by trending score
-            {'$sort': {'trending_score': -1}},
-            # Limit results
-            {'$limit': limit}
-        ]
-        
-        trending_results = list(db.applications.aggregate(pipeline))
-        
-        # Get company details for each trending company
+        limit = min(int(request.args.get('limit', 10)), 50)
+        
+        # Read a few extra entries in case some postings are no longer active
+        entries = top_trending(limit * 2)
+        
+        # Get company details for all trending companies at once
+        companies = {
+            company['_id']: company
+            for company in db.companies.find({
+                '_id': {'$in': [entry['company_id'] for entry in entries]},
+                'active': True
+            })
+        }
+        
         trending_companies = []
-        for result in trending_results:
-            company_id = result['_id']
-            company = db.companies.find_one({'_id': company_id})
-            if company and company.get('active', False):
-                company['_id'] = str(company['_id'])
-                company['application_count'] = result['application_count']
-                company['trending_score'] = result['trending_score']
-                trending_companies.append(company)
+        for entry in entries:
+            company = companies.get(entry['company_id'])
+            if not company:
+                continue
+            company['_id'] = str(company['_id'])
+            company['application_count'] = entry.get('application_count', 0)
+            company['trending_score'] = round(current_score(entry['log_weight']), 4)
+            trending_companies.append(company)
+            if len(trending_companies) == limit:
+                break
         
         return jsonify({
             'trending_companies': trending_companies,
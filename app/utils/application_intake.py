@@ -0,0 +1,259 @@
+"""
+Write-behind intake queue for application submissions.
+
+When intake mode is enabled, ``apply_to_company`` only validates the request
+and appends it to the durable ``application_intake`` collection, returning a
+ticket. Background drainers in every worker claim queued tickets in batches,
+insert the applications with one ``insert_many`` and update the students'
+applied lists with one ``bulk_write``, so a deadline rush turns into a few
+large writes instead of many small synchronous ones.
+
+Ticket lifecycle: queued -> processing -> accepted | rejected | failed. A
+ticket whose insert fails for any reason other than a duplicate goes back to
+queued and is retried until MAX_ATTEMPTS, then fails with the error.
+
+Only the drainer that moves a ticket out of processing applies its side
+effects (applied list, dashboard counters, trending), so a ticket re-claimed
+from a slow or dead drainer is never counted twice. A drainer that dies
+between that transition and the side effects loses them; the counters are
+repaired by scripts/reconcile_student_counters.py.
+"""
+import logging
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from app import db
+from app.models.application import COMPANY_SUMMARY_FIELDS, company_summary
+from app.utils.trending import record_application
+from app.utils.student_counters import increment_counters_many
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+PROCESSING = 'processing'
+ACCEPTED = 'accepted'
+REJECTED = 'rejected'
+FAILED = 'failed'
+
+# Attempts before a ticket whose insert keeps failing is given up
+MAX_ATTEMPTS = 3
+
+# Tickets claimed by a drainer that died are re-queued after this long
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+DETAIL_FIELDS = ('coverLetter', 'portfolio', 'availability', 'noticePeriod')
+
+def enqueue_application(company_id, student_id, details):
+    """
+    Append an application to the intake queue.
+
+    Returns:
+        tuple: (success, ticket document or an error message)
+    """
+    ticket = {
+        'company_id': company_id,
+        'student_id': student_id,
+        'details': {field: details.get(field, '') for field in DETAIL_FIELDS},
+        'status': QUEUED,
+        'created_at': datetime.now()
+    }
+    try:
+        db.application_intake.insert_one(ticket)
+    except DuplicateKeyError:
+        # A partial unique index allows one open ticket per student and company
+        return False, 'Application already queued for this company'
+    return True, ticket
+
+def get_ticket(ticket_id, student_id):
+    """Return a student's intake ticket, or None."""
+    return db.application_intake.find_one({'_id': ticket_id, 'student_id': student_id})
+
+def _claim_batch(batch_size, claim_token):
+    """Mark up to batch_size queued (or abandoned) tickets as processing by this drainer."""
+    now = datetime.now()
+    claimable = {'$or': [
+        {'status': QUEUED},
+        {'status': PROCESSING, 'claimed_at': {'$lt': now - CLAIM_TIMEOUT}}
+    ]}
+    ids = [ticket['_id'] for ticket in db.application_intake.find(claimable, {'_id': 1}).sort('created_at', 1).limit(batch_size)]
+    if not ids:
+        return []
+    # Another drainer may claim some of the same tickets; the status filter lets only one win each
+    db.application_intake.update_many(
+        {'_id': {'$in': ids}, **claimable},
+        {'$set': {'status': PROCESSING, 'claimed_by': claim_token, 'claimed_at': now}}
+    )
+    return list(db.application_intake.find({'_id': {'$in': ids}, 'claimed_by': claim_token, 'status': PROCESSING}))
+
+def _finish(ticket_results, claim_token):
+    """
+    Record the outcome of processed tickets with one bulk write.
+
+    Only tickets still claimed by this drainer are updated; one re-claimed by
+    another drainer meanwhile belongs to that drainer.
+
+    Returns:
+        set: IDs of the tickets this drainer moved out of processing
+    """
+    now = datetime.now()
+    operations = [
+        UpdateOne(
+            {'_id': ticket_id, 'status': PROCESSING, 'claimed_by': claim_token},
+            {'$set': {**result, 'processed_at': now}}
+        )
+        for ticket_id, result in ticket_results.items()
+    ]
+    if not operations:
+        return set()
+    db.application_intake.bulk_write(operations, ordered=False)
+    # Finished tickets cannot be claimed again, so claimed_by identifies the winner
+    return {
+        ticket['_id'] for ticket in db.application_intake.find(
+            {'_id': {'$in': list(ticket_results)}, 'claimed_by': claim_token, 'status': {'$ne': PROCESSING}},
+            {'_id': 1}
+        )
+    }
+
+def drain_intake(batch_size=200):
+    """
+    Process one batch of queued tickets.
+
+    Returns:
+        int: The number of tickets processed
+    """
+    claim_token = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}'
+    tickets = _claim_batch(batch_size, claim_token)
+    if not tickets:
+        return 0
+
+    results = {}
+    companies = {
+        company['_id']: company for company in db.companies.find(
+            {'_id': {'$in': list({ticket['company_id'] for ticket in tickets})}}, COMPANY_SUMMARY_FIELDS
+        )
+    }
+    students = {
+        student['registration_no'] for student in db.students.find(
+            {'registration_no': {'$in': list({ticket['student_id'] for ticket in tickets})}}, {'registration_no': 1}
+        )
+    }
+
+    applications = []
+    for ticket in tickets:
+        if ticket['company_id'] not in companies:
+            results[ticket['_id']] = {'status': REJECTED, 'reason': 'Company not found'}
+        elif ticket['student_id'] not in students:
+            results[ticket['_id']] = {'status': REJECTED, 'reason': 'User not found'}
+        else:
+            applications.append({
+                'company_id': ticket['company_id'],
+                'company': company_summary(companies[ticket['company_id']]),
+                'student_id': ticket['student_id'],
+                'status': 'pending',
+                'applied_date': ticket['created_at'],
+                **ticket['details'],
+                'intake_ticket': ticket['_id']
+            })
+
+    # The unique (company_id, student_id) index rejects duplicates individually
+    duplicates = set()
+    errors = {}
+    if applications:
+        try:
+            db.applications.insert_many(applications, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get('writeErrors', []):
+                if error.get('code') == 11000:
+                    duplicates.add(error['index'])
+                else:
+                    errors[error['index']] = error.get('errmsg', 'Write error')
+
+    attempts = {ticket['_id']: ticket.get('attempts', 0) + 1 for ticket in tickets}
+    inserted = []
+    for index, application in enumerate(applications):
+        ticket_id = application['intake_ticket']
+        if index in errors:
+            # Anything but a duplicate is retried, then reported as it happened
+            if attempts[ticket_id] < MAX_ATTEMPTS:
+                results[ticket_id] = {'status': QUEUED, 'attempts': attempts[ticket_id], 'last_error': errors[index]}
+            else:
+                results[ticket_id] = {'status': FAILED, 'attempts': attempts[ticket_id], 'reason': errors[index]}
+            continue
+        if index not in duplicates:
+            inserted.append(application)
+            results[ticket_id] = {'status': ACCEPTED, 'application_id': application['_id']}
+            continue
+        # A re-claimed ticket may have been inserted before its drainer died
+        existing = db.applications.find_one(
+            {'company_id': application['company_id'], 'student_id': application['student_id']},
+            {'intake_ticket': 1}
+        )
+        if existing and existing.get('intake_ticket') == ticket_id:
+            inserted.append({**application, '_id': existing['_id']})
+            results[ticket_id] = {'status': ACCEPTED, 'application_id': existing['_id']}
+        else:
+            results[ticket_id] = {'status': REJECTED, 'reason': 'Already applied to this company'}
+
+    finished = _finish(results, claim_token)
+    inserted = [application for application in inserted if application['intake_ticket'] in finished]
+    if inserted:
+        db.students.bulk_write([
+            UpdateOne(
+                {'registration_no': application['student_id']},
+                {'$addToSet': {'companies.applied': application['company_id']}}
+            )
+            for application in inserted
+        ], ordered=False)
+        # A student has at most one application per company, so each accepted ticket adds one
+        applied = {}
+        for application in inserted:
+            applied[application['student_id']] = applied.get(application['student_id'], 0) + 1
+        increment_counters_many({student_id: {'applied': count} for student_id, count in applied.items()})
+        for application in inserted:
+            record_application(application['company_id'], application['applied_date'])
+
+    return len(tickets)
+
+class IntakeDrainer(threading.Thread):
+    """Daemon thread that drains the intake queue of this worker process."""
+
+    def __init__(self, batch_size=200, poll_interval=1.0):
+        """
+        Args:
+            batch_size (int): Tickets processed per batch
+            poll_interval (float): Seconds to wait when the queue is empty
+        """
+        super().__init__(name='application-intake', daemon=True)
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                processed = drain_intake(self.batch_size)
+            except Exception as e:
+                logger.error(f"Application intake drain failed: {str(e)}")
+                processed = 0
+            # Keep draining while there is a backlog
+            if processed < self.batch_size:
+                self._stopped.wait(self.poll_interval)
+
+    def stop(self):
+        self._stopped.set()
+
+_drainer = None
+
+def start_intake_drainer(batch_size=200, poll_interval=1.0):
+    """Start this worker's intake drainer if it is not running yet."""
+    global _drainer
+    if _drainer is None or not _drainer.is_alive():
+        _drainer = IntakeDrainer(batch_size, poll_interval)
+        _drainer.start()
+    return _drainer
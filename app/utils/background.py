@@ -0,0 +1,29 @@
+"""
+Utility functions for running work outside the request cycle.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Small shared pool for follow-up work triggered by requests
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='background')
+
+def _run_logged(fn, *args, **kwargs):
+    """Run fn and log any exception instead of losing it in the pool."""
+    try:
+        return fn(*args, **kwargs)
+    except Exception as e:
+        logger.error(f"Background task {fn.__name__} failed: {str(e)}")
+        raise
+
+def submit_background(fn, *args, **kwargs):
+    """
+    Run fn(*args, **kwargs) on the background pool.
+
+    The task must not depend on the Flask request or application context.
+
+    Returns:
+        Future: The future of the submitted task
+    """
+    return _executor.submit(_run_logged, fn, *args, **kwargs)
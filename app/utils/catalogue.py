@@ -0,0 +1,34 @@
+"""
+Version numbers of shared catalogues.
+
+A catalogue's version is bumped whenever one of its documents is created,
+updated or deactivated (for companies) or published (for announcements), so
+anything derived from it can be cached or tagged with the version and goes
+stale as soon as the catalogue changes.
+"""
+from pymongo import ReturnDocument
+
+from app import db
+
+COMPANIES = 'companies'
+ANNOUNCEMENTS = 'announcements'
+
+def catalogue_version(name=COMPANIES):
+    """Return the current version of a catalogue (0 before the first change)."""
+    meta = db.catalogue_meta.find_one({'_id': name}, {'version': 1})
+    return meta['version'] if meta else 0
+
+def bump_catalogue_version(name=COMPANIES):
+    """
+    Increment a catalogue's version after one of its documents changed.
+
+    Returns:
+        int: The new version
+    """
+    meta = db.catalogue_meta.find_one_and_update(
+        {'_id': name},
+        {'$inc': {'version': 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return meta['version']
@@ -0,0 +1,168 @@
+"""
+Co-application collaborative filtering.
+
+The ``applications`` collection is a bipartite student x company graph. A
+batch job turns it into a sparse company x company co-occurrence matrix
+(``AᵀA`` for the binary student x company matrix ``A``), normalizes it with
+cosine similarity and stores the top-K related companies of each company in
+the ``related_companies`` collection. Serving "students who applied here also
+applied to..." or blending collaborative scores into a student's
+recommendations is then a single indexed read.
+"""
+from datetime import datetime
+
+import numpy as np
+from scipy import sparse
+from pymongo import ReplaceOne
+
+from app import db
+
+# Number of related companies stored per company
+TOP_K = 20
+
+# Minimum number of shared applicants before two companies count as related
+MIN_CO_APPLICANTS = 2
+
+# Share of the blended score contributed by collaborative filtering
+COLLABORATIVE_WEIGHT = 0.3
+
+def build_coapplication_matrix(pairs):
+    """
+    Build the cosine-normalized company co-application matrix.
+
+    Args:
+        pairs (iterable): (student_id, company_id) application pairs
+
+    Returns:
+        tuple: (company ids, co-application count matrix, cosine similarity matrix)
+    """
+    students = {}
+    companies = {}
+    rows, cols = [], []
+    for student_id, company_id in set(pairs):
+        rows.append(students.setdefault(student_id, len(students)))
+        cols.append(companies.setdefault(company_id, len(companies)))
+
+    applications = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+        shape=(len(students), len(companies))
+    )
+    counts = sparse.csr_matrix(applications.T @ applications)
+
+    # cos(i, j) = |applicants(i) ∩ applicants(j)| / sqrt(|applicants(i)| |applicants(j)|)
+    applicant_counts = counts.diagonal()
+    norms = np.sqrt(applicant_counts)
+    norms[norms == 0] = 1
+    scale = sparse.diags(1 / norms)
+    similarity = sparse.csr_matrix(scale @ counts @ scale)
+    return list(companies), counts, similarity
+
+def top_related(similarity, k=TOP_K):
+    """
+    Pick the k most related companies from each row of the similarity matrix.
+
+    Returns:
+        dict: Row index -> list of (related row index, similarity), best first
+    """
+    related = {}
+    for row in range(similarity.shape[0]):
+        start, end = similarity.indptr[row], similarity.indptr[row + 1]
+        columns = similarity.indices[start:end]
+        scores = similarity.data[start:end]
+        keep = columns != row  # A company is not related to itself
+        columns, scores = columns[keep], scores[keep]
+        order = np.argsort(-scores, kind='stable')[:k]
+        related[row] = [(int(columns[i]), float(scores[i])) for i in order]
+    return related
+
+def compute_related_companies(k=TOP_K, min_co_applicants=MIN_CO_APPLICANTS):
+    """
+    Recompute the related companies table from every application.
+
+    Returns:
+        int: The number of companies whose related list was stored
+    """
+    pairs = (
+        (application['student_id'], application['company_id'])
+        for application in db.applications.find({}, {'student_id': 1, 'company_id': 1})
+        if application.get('student_id') and application.get('company_id')
+    )
+    company_ids, counts, similarity = build_coapplication_matrix(pairs)
+
+    # Pairs with too few shared applicants are noise rather than signal
+    support = counts.copy()
+    support.data = (support.data >= min_co_applicants).astype(np.float32)
+    similarity = sparse.csr_matrix(similarity.multiply(support))
+    similarity.eliminate_zeros()
+
+    now = datetime.utcnow()
+    neighbours = top_related(similarity, k)
+    operations = [
+        ReplaceOne(
+            {'company_id': company_ids[row]},
+            {
+                'company_id': company_ids[row],
+                'related': [
+                    {
+                        'company_id': company_ids[i],
+                        'score': round(score, 4),
+                        'co_applicants': int(counts[row, i])
+                    }
+                    for i, score in row_neighbours
+                ],
+                'computed_at': now
+            },
+            upsert=True
+        )
+        for row, row_neighbours in neighbours.items()
+        if row_neighbours
+    ]
+    if operations:
+        db.related_companies.bulk_write(operations, ordered=False)
+    db.related_companies.delete_many({'computed_at': {'$lt': now}})
+    return len(operations)
+
+def collaborative_scores(applied_company_ids):
+    """
+    Score companies by how often their applicants overlap with a student's applications.
+
+    Args:
+        applied_company_ids (list): Companies the student applied to
+
+    Returns:
+        dict: company_id string -> score in [0, 1], excluding companies already applied to
+    """
+    if not applied_company_ids:
+        return {}
+    applied = {str(company_id) for company_id in applied_company_ids}
+    scores = {}
+    for entry in db.related_companies.find({'company_id': {'$in': list(applied_company_ids)}}, {'related': 1}):
+        for related in entry.get('related', []):
+            company_id = str(related['company_id'])
+            if company_id not in applied:
+                scores[company_id] = scores.get(company_id, 0) + related['score']
+    if not scores:
+        return {}
+    best = max(scores.values())
+    return {company_id: score / best for company_id, score in scores.items()}
+
+def blend_rankings(ranked, collaborative, weight=COLLABORATIVE_WEIGHT):
+    """
+    Blend skill-match percentages with collaborative scores.
+
+    Args:
+        ranked (list): (company_id, match_percentage) pairs from the skill ranking
+        collaborative (dict): company_id -> collaborative score in [0, 1]
+        weight (float): Share of the blended score given to collaborative filtering
+
+    Returns:
+        list: (company_id, blended percentage) pairs, best first
+    """
+    if not collaborative:
+        return ranked
+    blended = {company_id: (1 - weight) * match for company_id, match in ranked}
+    for company_id, score in collaborative.items():
+        blended[company_id] = blended.get(company_id, 0) + weight * 100 * score
+    # Python's sort is stable, so ties keep the skill ranking's order
+    order = sorted(blended.items(), key=lambda item: -item[1])
+    return [(company_id, int(round(score))) for company_id, score in order]
@@ -0,0 +1,138 @@
+"""
+Utility functions for faceted company search.
+
+A faceted search returns one page of matching companies together with the
+number of matches per job type, work place, location, duration and stipend
+range. Everything is computed by a single ``$facet`` aggregation. Each facet
+applies every filter except its own, so the counts show how many results the
+client would get by changing that one filter.
+"""
+from bson import json_util
+
+from app.utils.cache import TTLCache
+from app.utils import events
+
+# Filters that can be selected by exact value, keyed by query parameter
+VALUE_FACETS = ('job_type', 'work_place', 'location', 'duration')
+
+# Lower bounds of the stipend ranges; the last bound closes the final range
+STIPEND_BOUNDARIES = [0, 10000, 25000, 50000, 100000, 250000, 500000, 10 ** 9]
+
+# Facet counts for recently requested filter combinations
+_facet_cache = TTLCache(ttl=60, maxsize=512)
+
+def build_filters(args):
+    """
+    Read the facet filters from the request arguments.
+
+    Returns:
+        dict: Mapping of facet name to MongoDB predicate for each selected filter
+    """
+    filters = {}
+    for field in VALUE_FACETS:
+        value = args.get(field)
+        if value:
+            filters[field] = value
+
+    stipend = args.get('stipend')
+    if stipend:
+        try:
+            filters['stipend'] = {'$gte': int(stipend)}
+        except ValueError:
+            pass
+
+    return filters
+
+def facet_cache_key(base_filter, filters):
+    """Build a cache key identifying a filter combination."""
+    return json_util.dumps([base_filter, filters], sort_keys=True)
+
+def _filters_except(filters, excluded):
+    """Return the filters with the given facet removed."""
+    return {k: v for k, v in filters.items() if k != excluded}
+
+def build_facet_pipeline(base_filter, filters, page, per_page, include_facets=True):
+    """
+    Build the aggregation pipeline for one page of results and its facets.
+
+    Args:
+        base_filter (dict): Filter shared by results and facets (active flag and search terms)
+        filters (dict): Facet filters selected by the client
+        page (int): 1-based page number
+        per_page (int): Page size
+        include_facets (bool): Whether to compute facet counts
+
+    Returns:
+        list: The aggregation pipeline
+    """
+    facets = {
+        'results': [
+            {'$match': filters},
+            {'$sort': {'posted_date': -1, '_id': 1}},
+            {'$skip': (page - 1) * per_page},
+            {'$limit': per_page}
+        ],
+        'total': [
+            {'$match': filters},
+            {'$count': 'count'}
+        ]
+    }
+
+    if include_facets:
+        for field in VALUE_FACETS:
+            facets[field] = [
+                {'$match': _filters_except(filters, field)},
+                {'$group': {'_id': f'${field}', 'count': {'$sum': 1}}},
+                {'$sort': {'count': -1, '_id': 1}}
+            ]
+        facets['stipend'] = [
+            {'$match': _filters_except(filters, 'stipend')},
+            {'$bucket': {
+                'groupBy': '$stipend',
+                'boundaries': STIPEND_BOUNDARIES,
+                'default': 'unspecified',
+                'output': {'count': {'$sum': 1}}
+            }}
+        ]
+
+    return [
+        {'$match': base_filter},
+        {'$facet': facets}
+    ]
+
+def format_facets(result):
+    """Convert the raw ``$facet`` output into the facet counts returned by the API."""
+    facets = {}
+    for field in VALUE_FACETS:
+        facets[field] = [
+            {'value': bucket['_id'], 'count': bucket['count']}
+            for bucket in result.get(field, [])
+            if bucket['_id'] not in (None, '')
+        ]
+
+    upper_bounds = dict(zip(STIPEND_BOUNDARIES, STIPEND_BOUNDARIES[1:]))
+    stipend = []
+    for bucket in result.get('stipend', []):
+        if bucket['_id'] == 'unspecified':
+            stipend.append({'min': None, 'max': None, 'count': bucket['count']})
+        else:
+            upper = upper_bounds.get(bucket['_id'])
+            stipend.append({
+                'min': bucket['_id'],
+                'max': upper if upper != STIPEND_BOUNDARIES[-1] else None,
+                'count': bucket['count']
+            })
+    facets['stipend'] = stipend
+
+    return facets
+
+def get_cached_facets(key):
+    """Return cached facet counts for a filter combination, or None."""
+    return _facet_cache.get(key)
+
+def cache_facets(key, facets):
+    """Cache facet counts for a filter combination."""
+    _facet_cache.set(key, facets)
+
+# Facet counts include deactivated postings until their entries are dropped
+events.subscribe(events.COMPANIES_DEACTIVATED, lambda company_ids: _facet_cache.clear())
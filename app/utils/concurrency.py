@@ -0,0 +1,112 @@
+"""
+Concurrent fan-out of independent queries.
+
+Composite endpoints (dashboards, analytics overviews) run several independent
+queries. ``fan_out`` runs them on a shared thread pool so the endpoint takes
+as long as its slowest query instead of the sum of all of them. Each query
+has a timeout; a query that fails or times out is replaced by a default value
+and reported as degraded, so the endpoint can still answer with partial data.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import pymongo
+from pymongo.errors import PyMongoError
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Seconds a query may take before its default value is used
+DEFAULT_TIMEOUT = 2.0
+
+# Pool size used until configure_fan_out is called (FANOUT_WORKERS)
+DEFAULT_WORKERS = 16
+
+# PyMongo releases the GIL while waiting on the server, so threads overlap I/O
+_executor = None
+_executor_lock = threading.Lock()
+
+def configure_fan_out(max_workers):
+    """Size this worker's fan-out pool; tasks already submitted finish on the old pool."""
+    global _executor
+    with _executor_lock:
+        previous, _executor = _executor, ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fanout')
+    if previous is not None:
+        previous.shutdown(wait=False)
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=DEFAULT_WORKERS, thread_name_prefix='fanout')
+    return _executor
+
+def _run_timed(task, timeout, started_at, started):
+    """
+    Run task with a timeout that starts now, not when it was submitted.
+
+    ``pymongo.timeout`` sends the remaining time as ``maxTimeMS`` with every
+    operation in the block, so the server stops the task's queries at the same
+    deadline the caller stops waiting.
+    """
+    started_at.append(time.monotonic())
+    started.set()
+    with pymongo.timeout(timeout):
+        return task()
+
+def fan_out(tasks, timeout=DEFAULT_TIMEOUT, timeouts=None, defaults=None):
+    """
+    Run independent zero-argument callables concurrently.
+
+    The callables must not depend on the Flask request or application
+    context. Each timeout counts from when its task starts running, so time
+    spent queued behind other requests' tasks is not charged to it.
+
+    Args:
+        tasks (dict): name -> callable
+        timeout (float): Default per-task timeout in seconds
+        timeouts (dict, optional): name -> timeout overriding the default
+        defaults (dict, optional): name -> value used when the task fails or
+            times out (None if not given)
+
+    Returns:
+        tuple: (results dict name -> value, sorted list of degraded task names)
+    """
+    timeouts = timeouts or {}
+    defaults = defaults or {}
+    executor = _get_executor()
+    running = {}
+    for name, task in tasks.items():
+        started_at, started = [], threading.Event()
+        future = executor.submit(_run_timed, task, timeouts.get(name, timeout), started_at, started)
+        running[name] = (future, started_at, started)
+
+    results = {}
+    degraded = []
+    for name, (future, started_at, started) in running.items():
+        try:
+            # Queued tasks start once earlier ones finish, which their own timeouts bound
+            started.wait()
+            deadline = started_at[0] + timeouts.get(name, timeout)
+            results[name] = future.result(timeout=max(deadline - time.monotonic(), 0))
+        except FutureTimeoutError:
+            # The server stops the task's queries at the same deadline
+            future.cancel()
+            logger.warning(f"Query {name} timed out")
+            metrics.increment('fanout.timeouts')
+            results[name] = defaults.get(name)
+            degraded.append(name)
+        except Exception as e:
+            if isinstance(e, PyMongoError) and e.timeout:
+                logger.warning(f"Query {name} timed out")
+                metrics.increment('fanout.timeouts')
+            else:
+                logger.error(f"Query {name} failed: {str(e)}")
+                metrics.increment('fanout.errors')
+            results[name] = defaults.get(name)
+            degraded.append(name)
+    return results, sorted(degraded)
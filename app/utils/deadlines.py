@@ -0,0 +1,199 @@
+"""
+Deadline-driven posting lifecycle.
+
+Each worker runs a scheduler thread that keeps a min-heap of the deadlines of
+active postings expiring soon, loaded with an indexed query over a partial
+index. When the earliest deadline passes, every posting due by then is
+deactivated with one ``update_many`` and a ``companies.deactivated`` event is
+emitted so in-memory indexes and caches drop the postings. Workers race for
+the same postings, but the update only matches postings that are still
+active, so each is deactivated once.
+"""
+import heapq
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from dateutil import parser as date_parser
+from pymongo import UpdateOne
+
+from app import db
+from app.utils import events
+from app.utils.catalogue import bump_catalogue_version
+
+logger = logging.getLogger(__name__)
+
+# Deadlines further away than this are loaded by a later reload
+LOOKAHEAD = timedelta(hours=1)
+
+# Seconds between reloads, which pick up postings created by other workers
+RELOAD_INTERVAL = 60
+
+def parse_deadline(value):
+    """
+    Convert a stored or submitted deadline to a datetime.
+
+    Accepts datetimes, epoch seconds and ISO 8601 strings.
+
+    Returns:
+        datetime: The deadline, or None if value is not a recognisable date
+    """
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return datetime.fromtimestamp(value)
+    if isinstance(value, str) and value.strip():
+        try:
+            deadline = date_parser.isoparse(value.strip())
+        except ValueError:
+            return None
+        # Stored dates are naive local times, like posted_date
+        if deadline.tzinfo is not None:
+            deadline = deadline.astimezone().replace(tzinfo=None)
+        return deadline
+    return None
+
+def deactivate_expired(company_ids=None, now=None):
+    """
+    Deactivate active postings whose deadline has passed.
+
+    Args:
+        company_ids (list, optional): Only consider these postings
+        now (datetime, optional): The current time
+
+    Returns:
+        list: The IDs of the postings deactivated
+    """
+    now = now or datetime.now()
+    query = {'active': True, 'deadline': {'$lte': now}}
+    if company_ids is not None:
+        query['_id'] = {'$in': list(company_ids)}
+    expired = [company['_id'] for company in db.companies.find(query, {'_id': 1})]
+    if not expired:
+        return []
+    # The filter is repeated so a deadline extended meanwhile is left alone
+    result = db.companies.update_many({**query, '_id': {'$in': expired}}, {
+        '$set': {'active': False, 'deactivated_at': now, 'updated_at': now},
+        '$inc': {'version': 1}
+    })
+    if result.modified_count:
+        bump_catalogue_version()
+    return expired
+
+def expired_postings(company_ids, now):
+    """Return the IDs among company_ids that are inactive with a deadline at or before now."""
+    return [
+        company['_id']
+        for company in db.companies.find(
+            {'_id': {'$in': list(company_ids)}, 'active': False, 'deadline': {'$lte': now}},
+            {'_id': 1}
+        )
+    ]
+
+class DeadlineScheduler(threading.Thread):
+    """Daemon thread deactivating postings exactly when their deadline passes."""
+
+    def __init__(self, lookahead=LOOKAHEAD, reload_interval=RELOAD_INTERVAL):
+        super().__init__(name='deadline-scheduler', daemon=True)
+        self.lookahead = lookahead
+        self.reload_interval = reload_interval
+        self._heap = []           # (deadline, company_id)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._next_reload = datetime.min
+
+    def reload(self):
+        """Replace the heap with the active postings expiring within the lookahead window."""
+        horizon = datetime.now() + self.lookahead
+        cursor = db.companies.find(
+            {'active': True, 'deadline': {'$type': 'date', '$lte': horizon}},
+            {'deadline': 1}
+        ).sort('deadline', 1)
+        heap = [(company['deadline'], company['_id']) for company in cursor]
+        heapq.heapify(heap)
+        with self._lock:
+            self._heap = heap
+        self._next_reload = datetime.now() + timedelta(seconds=self.reload_interval)
+
+    def schedule(self, company_id, deadline):
+        """Add a posting created or changed by this worker without waiting for a reload."""
+        if deadline is None or deadline > datetime.now() + self.lookahead:
+            return
+        with self._lock:
+            heapq.heappush(self._heap, (deadline, company_id))
+        self._wakeup.set()
+
+    def _pop_due(self, now):
+        """Remove and return the postings whose deadline is at or before now."""
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due.append(heapq.heappop(self._heap)[1])
+            next_deadline = self._heap[0][0] if self._heap else None
+        return due, next_deadline
+
+    def run(self):
+        while not self._stopped:
+            try:
+                now = datetime.now()
+                if now >= self._next_reload:
+                    self.reload()
+                due, next_deadline = self._pop_due(now)
+                if due:
+                    expired = deactivate_expired(due, now)
+                    # Every worker drops the postings from its local state, whoever updated
+                    # them; postings whose deadline was extended are not due any more
+                    remaining = set(due) - set(expired)
+                    if remaining:
+                        expired += expired_postings(remaining, now)
+                    if expired:
+                        events.emit(events.COMPANIES_DEACTIVATED, company_ids=expired)
+                wake_at = min(filter(None, [next_deadline, self._next_reload]))
+                timeout = max((wake_at - datetime.now()).total_seconds(), 0)
+            except Exception as e:
+                logger.error(f"Deadline scheduler failed: {str(e)}")
+                timeout = self.reload_interval
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+
+    def stop(self):
+        self._stopped = True
+        self._wakeup.set()
+
+_scheduler = None
+
+def start_deadline_scheduler():
+    """Start this worker's deadline scheduler if it is not running yet."""
+    global _scheduler
+    if _scheduler is None or not _scheduler.is_alive():
+        _scheduler = DeadlineScheduler()
+        _scheduler.start()
+    return _scheduler
+
+def schedule_deadline(company_id, deadline):
+    """Tell this worker's scheduler about a new or changed deadline."""
+    if _scheduler is not None:
+        _scheduler.schedule(company_id, deadline)
+
+def normalize_deadlines(batch_size=500):
+    """
+    Convert every posting's deadline to a BSON date and deactivate expired postings.
+
+    Returns:
+        tuple: (deadlines converted, postings deactivated)
+    """
+    operations = []
+    converted = 0
+    for company in db.companies.find({'deadline': {'$exists': True, '$not': {'$type': 'date'}}}, {'deadline': 1}):
+        deadline = parse_deadline(company['deadline'])
+        if deadline is None:
+            logger.warning(f"Unrecognised deadline {company['deadline']!r} on company {company['_id']}")
+            continue
+        operations.append(UpdateOne({'_id': company['_id']}, {'$set': {'deadline': deadline}}))
+        if len(operations) >= batch_size:
+            converted += db.companies.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        converted += db.companies.bulk_write(operations, ordered=False).modified_count
+    return converted, len(deactivate_expired())
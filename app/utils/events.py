@@ -0,0 +1,46 @@
+"""
+In-process event bus.
+
+Modules that keep derived state (in-memory indexes, caches) subscribe to the
+events that invalidate it, so producers such as the deadline scheduler do not
+need to know about every consumer. Handlers run synchronously in the emitting
+thread; a failing handler is logged and does not stop the others.
+"""
+import logging
+import threading
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+# Postings were deactivated; payload: company_ids (list of ObjectId)
+COMPANIES_DEACTIVATED = 'companies.deactivated'
+
+# Notifications were written; payload: notifications (list of inserted documents)
+NOTIFICATIONS_CREATED = 'notifications.created'
+
+# A broadcast to every student was stored; payload: notification (inserted document)
+BROADCAST_CREATED = 'notifications.broadcast_created'
+
+# A message was sent; payload: message (inserted document)
+MESSAGE_SENT = 'messages.sent'
+
+# Students' dashboard counters changed; payload: registration_nos (list of str)
+COUNTERS_CHANGED = 'counters.changed'
+
+_handlers = defaultdict(list)
+_lock = threading.Lock()
+
+def subscribe(event, handler):
+    """Call handler(**payload) whenever event is emitted."""
+    with _lock:
+        _handlers[event].append(handler)
+
+def emit(event, **payload):
+    """Run every handler subscribed to event with the given payload."""
+    with _lock:
+        handlers = list(_handlers[event])
+    for handler in handlers:
+        try:
+            handler(**payload)
+        except Exception as e:
+            logger.error(f"Handler {getattr(handler, '__name__', handler)} for {event} failed: {str(e)}")
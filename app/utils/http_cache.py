@@ -0,0 +1,81 @@
+"""
+Conditional GET support (ETag / Last-Modified).
+
+Views decorated with ``conditional`` get a strong ETag and a Cache-Control
+header on every 200 response, and answer a matching ``If-None-Match`` or
+``If-Modified-Since`` with 304. By default the ETag is a hash of the response
+body. Views that know a version of their data call ``check_not_modified``
+first, which tags the response from that version and returns the 304 before
+any query or serialization happens.
+"""
+import hashlib
+from functools import wraps
+
+from flask import g, request, make_response
+
+# Authenticated clients may keep responses but must revalidate them
+PRIVATE_REVALIDATE = 'private, no-cache'
+
+def make_etag(*parts):
+    """Build a strong ETag value from the parts identifying a representation."""
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+def check_not_modified(etag, last_modified=None):
+    """
+    Tag the current response with etag and return a 304 response if the client has it.
+
+    Call this before loading or serializing the data. If-None-Match takes
+    precedence over If-Modified-Since, as in RFC 9110.
+
+    Args:
+        etag (str): ETag value built with make_etag
+        last_modified (datetime, optional): When the data last changed
+
+    Returns:
+        Response: A 304 response, or None if the full response must be sent
+    """
+    g.conditional_etag = etag
+    g.conditional_last_modified = last_modified
+    if request.if_none_match:
+        modified = not request.if_none_match.contains(etag)
+    elif last_modified is not None and request.if_modified_since is not None:
+        modified = last_modified.replace(microsecond=0) > request.if_modified_since.replace(tzinfo=None)
+    else:
+        modified = True
+    if modified:
+        return None
+    response = make_response('', 304)
+    _tag(response, etag, last_modified)
+    return response
+
+def _tag(response, etag, last_modified):
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+
+def conditional(cache_control=PRIVATE_REVALIDATE):
+    """
+    Decorator adding ETag, Last-Modified and Cache-Control handling to a GET view.
+
+    Args:
+        cache_control (str): Cache-Control header of successful responses
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            response = make_response(f(*args, **kwargs))
+            if response.status_code not in (200, 304):
+                return response
+            response.headers['Cache-Control'] = cache_control
+            if response.status_code == 304:
+                return response
+
+            etag = g.pop('conditional_etag', None)
+            last_modified = g.pop('conditional_last_modified', None)
+            if etag is None:
+                # No version known: fall back to a hash of the serialized body
+                etag = hashlib.sha1(response.get_data()).hexdigest()
+            _tag(response, etag, last_modified)
+            return response.make_conditional(request)
+        return decorated_function
+    return decorator
@@ -0,0 +1,31 @@
+"""
+In-process counters for operational metrics.
+
+Each gunicorn worker keeps its own counters; the admin metrics endpoint
+reports the values of the worker that serves the request.
+"""
+import threading
+from collections import Counter
+
+_counters = Counter()
+_lock = threading.Lock()
+
+def increment(name, amount=1):
+    """Add amount to the counter called name."""
+    with _lock:
+        _counters[name] += amount
+
+def get_counter(name):
+    """Return the current value of a counter."""
+    with _lock:
+        return _counters[name]
+
+def snapshot():
+    """Return a copy of all counters."""
+    with _lock:
+        return dict(_counters)
+
+def reset():
+    """Reset all counters to zero."""
+    with _lock:
+        _counters.clear()
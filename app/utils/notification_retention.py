@@ -0,0 +1,142 @@
+"""
+Retention of notifications.
+
+The ``notifications`` collection is kept to a bounded working set:
+
+- Read notifications expire through a partial TTL index on ``timestamp``
+  after ``NOTIFICATION_READ_RETENTION_DAYS``.
+- Unread notifications older than ``NOTIFICATION_ARCHIVE_DAYS`` are moved by
+  ``archive_notifications`` into ``notification_archive``, one zlib
+  compressed BSON document per recipient and batch.
+- Broadcasts expire through a TTL index after ``NOTIFICATION_ARCHIVE_DAYS``
+  too, so the merged list and the unread broadcast count stay bounded. They
+  are not archived: the announcement they came from is kept.
+
+Both rely on ``timestamp`` being a BSON date; ``normalize_notification_timestamps``
+converts the float epochs written by older versions.
+"""
+import logging
+import zlib
+from datetime import datetime, timedelta
+
+import bson
+from bson.binary import Binary
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import OperationFailure
+
+from app import db
+from app.utils.student_counters import increment_counters_many
+
+logger = logging.getLogger(__name__)
+
+# Name of the partial TTL index on read notifications
+READ_TTL_INDEX = 'read_notifications_ttl'
+
+# Name of the TTL index on broadcasts
+BROADCAST_TTL_INDEX = 'broadcast_notifications_ttl'
+
+# Server error code for an existing index with different options
+INDEX_OPTIONS_CONFLICT = 85
+
+def _ensure_ttl_index(collection, name, retention_days, **options):
+    """Create a TTL index on timestamp, updating the retention of an existing one in place."""
+    expire_after = int(retention_days * 24 * 60 * 60)
+    try:
+        collection.create_index([('timestamp', ASCENDING)], name=name, expireAfterSeconds=expire_after, **options)
+    except OperationFailure as e:
+        if e.code != INDEX_OPTIONS_CONFLICT:
+            raise
+        db.command('collMod', collection.name, index={'name': name, 'expireAfterSeconds': expire_after})
+
+def ensure_read_notification_ttl(retention_days):
+    """Expire read notifications retention_days after they were created."""
+    _ensure_ttl_index(db.notifications, READ_TTL_INDEX, retention_days, partialFilterExpression={'read': True})
+
+def ensure_broadcast_ttl(retention_days):
+    """Expire broadcasts retention_days after they were sent (the index also serves newest-first reads)."""
+    _ensure_ttl_index(db.broadcast_notifications, BROADCAST_TTL_INDEX, retention_days)
+
+def normalize_notification_timestamps(batch_size=500):
+    """
+    Convert float epoch timestamps of notifications, broadcasts and read watermarks to BSON dates.
+
+    Returns:
+        int: The number of documents converted
+    """
+    converted = 0
+    for collection, field in (
+        (db.notifications, 'timestamp'),
+        (db.broadcast_notifications, 'timestamp'),
+        (db.notification_watermarks, 'read_until')
+    ):
+        operations = []
+        for document in collection.find({field: {'$type': 'number'}}, {field: 1}):
+            operations.append(UpdateOne(
+                {'_id': document['_id']},
+                {'$set': {field: datetime.utcfromtimestamp(document[field])}}
+            ))
+            if len(operations) >= batch_size:
+                converted += collection.bulk_write(operations, ordered=False).modified_count
+                operations = []
+        if operations:
+            converted += collection.bulk_write(operations, ordered=False).modified_count
+    return converted
+
+def archive_notifications(older_than_days=90, batch_size=500, now=None):
+    """
+    Move unread notifications older than older_than_days into the compressed archive.
+
+    Archived notifications no longer count as unread. Each batch is written
+    to the archive before it is deleted, so an interrupted run loses nothing.
+    Only notifications still unread are deleted and taken off the unread
+    counters; one read meanwhile stays (until its TTL) and also in the archive.
+
+    Returns:
+        int: The number of notifications archived
+    """
+    cutoff = (now or datetime.utcnow()) - timedelta(days=older_than_days)
+    archived = 0
+    while True:
+        batch = list(db.notifications.find(
+            {'read': False, 'timestamp': {'$lt': cutoff}}
+        ).sort('timestamp', ASCENDING).limit(batch_size))
+        if not batch:
+            return archived
+
+        by_recipient = {}
+        for notification in batch:
+            by_recipient.setdefault(notification['recipient_id'], []).append(notification)
+
+        archived_at = datetime.utcnow()
+        db.notification_archive.insert_many([
+            {
+                'recipient_id': recipient_id,
+                'archived_at': archived_at,
+                'count': len(notifications),
+                'oldest': notifications[0]['timestamp'],
+                'newest': notifications[-1]['timestamp'],
+                'data': Binary(zlib.compress(bson.encode({'notifications': notifications})))
+            }
+            for recipient_id, notifications in by_recipient.items()
+        ], ordered=False)
+        deleted = {}
+        for recipient_id, notifications in by_recipient.items():
+            result = db.notifications.delete_many({
+                '_id': {'$in': [notification['_id'] for notification in notifications]},
+                'read': False
+            })
+            if result.deleted_count:
+                deleted[recipient_id] = {'unread_notifications': -result.deleted_count}
+        increment_counters_many(deleted)
+
+        archived += len(batch)
+        if len(batch) < batch_size:
+            return archived
+
+def load_archived_notifications(recipient_id):
+    """Return a student's archived notifications, newest first."""
+    notifications = []
+    for archive in db.notification_archive.find({'recipient_id': recipient_id}):
+        notifications.extend(bson.decode(zlib.decompress(archive['data']))['notifications'])
+    notifications.sort(key=lambda notification: notification['timestamp'], reverse=True)
+    return notifications
@@ -0,0 +1,340 @@
+"""
+Server-Sent Events feed of notifications and unread counts.
+
+Connected students subscribe to ``stream_broker`` on their registration
+number. With ``NOTIFICATION_CHANGE_STREAM`` enabled (the default), each worker
+follows a MongoDB change stream, so every worker sees every write; on a
+standalone server, which has no change streams, it polls the watched
+collections instead. Until either feed runs (and in scripts, which start no
+background threads), the broker is fed in-process from the write paths
+through the event bus, which only reaches clients held by the worker that
+handled the write.
+
+Browsers' EventSource cannot send headers, so streams are opened with a
+short-lived, single-use ticket instead of putting the JWT in the URL.
+
+Counter changes are only signals: the stream reads the student's current
+counts when it sends them, so bursts of changes and dropped messages never
+leave a client with wrong totals.
+"""
+import hashlib
+import json
+import logging
+import queue
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta
+
+from bson.objectid import ObjectId
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app import db
+from app.utils import events
+from app.utils.pubsub import Broker, BROADCAST
+from app.utils.notifications import count_unread_broadcasts
+from app.utils.student_counters import get_counters
+
+logger = logging.getLogger(__name__)
+
+# Messages queued per connection before it is considered too slow
+STREAM_QUEUE_SIZE = 100
+
+# Tells the client how long to wait before reconnecting (milliseconds)
+RECONNECT_MS = 3000
+
+# Collections whose writes are pushed to connected students
+WATCHED_COLLECTIONS = ('notifications', 'broadcast_notifications', 'messages', 'student_counters')
+
+# Server error code for change streams on a standalone server
+CHANGE_STREAM_UNSUPPORTED = 40573
+
+# Seconds between polls of the watched collections without change streams
+POLL_INTERVAL = 2.0
+
+# Each poll re-reads this far back so writes stamped by a worker with a slower
+# clock are not missed; writes already published are skipped
+POLL_OVERLAP = timedelta(seconds=10)
+
+# Seconds a stream ticket can be redeemed after it was issued
+STREAM_TICKET_SECONDS = 60
+
+stream_broker = Broker()
+_streams_lock = threading.Lock()
+
+# Set while a change stream or poller feeds the broker; the in-process feed stands down
+_feed_active = threading.Event()
+
+def _serialize(document, **extra):
+    return {**document, '_id': str(document['_id']), **extra}
+
+def _message_summary(message):
+    return {
+        '_id': str(message['_id']),
+        'sender_id': message.get('sender_id'),
+        'subject': message.get('subject', ''),
+        'timestamp': message.get('timestamp')
+    }
+
+def _publish_notification(notification):
+    stream_broker.publish(notification['recipient_id'], ('notification', _serialize(notification)))
+
+def _publish_broadcast(notification):
+    stream_broker.publish(BROADCAST, ('notification', _serialize(notification, broadcast=True)))
+    # A broadcast raises every student's unread count without touching their counters
+    stream_broker.publish(BROADCAST, ('counters', None))
+
+def _publish_message(message):
+    stream_broker.publish(message['recipient_id'], ('message', _message_summary(message)))
+
+def _publish_counters(registration_no):
+    stream_broker.publish(registration_no, ('counters', None))
+
+def _on_notifications_created(notifications):
+    if not _feed_active.is_set():
+        for notification in notifications:
+            _publish_notification(notification)
+
+def _on_broadcast_created(notification):
+    if not _feed_active.is_set():
+        _publish_broadcast(notification)
+
+def _on_message_sent(message):
+    if not _feed_active.is_set():
+        _publish_message(message)
+
+def _on_counters_changed(registration_nos):
+    if not _feed_active.is_set():
+        for registration_no in registration_nos:
+            _publish_counters(registration_no)
+
+events.subscribe(events.NOTIFICATIONS_CREATED, _on_notifications_created)
+events.subscribe(events.BROADCAST_CREATED, _on_broadcast_created)
+events.subscribe(events.MESSAGE_SENT, _on_message_sent)
+events.subscribe(events.COUNTERS_CHANGED, _on_counters_changed)
+
+def _ticket_key(ticket):
+    # Only a hash is stored, so the tickets collection cannot be replayed
+    return hashlib.sha256(ticket.encode('utf-8')).hexdigest()
+
+def issue_stream_ticket(registration_no, ttl=STREAM_TICKET_SECONDS):
+    """
+    Issue a ticket that opens one notification stream for a student.
+
+    Returns:
+        str: The ticket, to be passed as the ticket query parameter
+    """
+    ticket = secrets.token_urlsafe(32)
+    db.stream_tickets.insert_one({
+        '_id': _ticket_key(ticket),
+        'registration_no': registration_no,
+        'expires_at': datetime.utcnow() + timedelta(seconds=ttl)
+    })
+    return ticket
+
+def redeem_stream_ticket(ticket):
+    """
+    Consume a stream ticket.
+
+    Returns:
+        str: The student's registration number, or None if the ticket is
+        unknown, expired or already used
+    """
+    entry = db.stream_tickets.find_one_and_delete({'_id': _ticket_key(ticket)})
+    if not entry or entry['expires_at'] <= datetime.utcnow():
+        return None
+    return entry['registration_no']
+
+def current_counts(registration_no):
+    """Return the unread counts pushed to a student's stream."""
+    counters = get_counters(registration_no) or {}
+    return {
+        'unread_notifications': counters.get('unread_notifications', 0) + count_unread_broadcasts(registration_no),
+        'unread_messages': counters.get('unread_messages', 0)
+    }
+
+def format_event(event, data):
+    """Encode one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def open_stream(registration_no, max_connections):
+    """
+    Subscribe a student's stream unless this worker holds max_connections already.
+
+    Returns:
+        Subscription: The subscription, or None when the worker is full
+    """
+    with _streams_lock:
+        if stream_broker.subscriber_count() >= max_connections:
+            return None
+        return stream_broker.subscribe(registration_no, STREAM_QUEUE_SIZE)
+
+def event_stream(registration_no, subscription, heartbeat=15, max_seconds=300):
+    """
+    Generate the Server-Sent Events of one connection.
+
+    The connection starts with the current counts, sends a comment every
+    heartbeat seconds while idle (which also detects closed connections) and
+    ends after max_seconds so clients reconnect and spread over workers.
+    A connection that fell behind gets a ``resync`` event and fresh counts.
+    """
+    try:
+        yield f"retry: {RECONNECT_MS}\n\n"
+        yield format_event('counters', current_counts(registration_no))
+        ends_at = time.monotonic() + max_seconds
+        while True:
+            remaining = ends_at - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                pending = [subscription.get(timeout=min(heartbeat, remaining))]
+            except queue.Empty:
+                yield ': heartbeat\n\n'
+                continue
+
+            if subscription.overflowed:
+                subscription.drain()
+                yield format_event('resync', {})
+                yield format_event('counters', current_counts(registration_no))
+                continue
+
+            # Take whatever else is already queued so a burst of counter changes costs one read
+            while len(pending) < STREAM_QUEUE_SIZE:
+                try:
+                    pending.append(subscription.get(timeout=0))
+                except queue.Empty:
+                    break
+            counters_changed = False
+            for kind, data in pending:
+                if kind == 'counters':
+                    counters_changed = True
+                else:
+                    yield format_event(kind, data)
+            if counters_changed:
+                yield format_event('counters', current_counts(registration_no))
+    finally:
+        stream_broker.unsubscribe(subscription)
+
+class CollectionPoller:
+    """Finds new writes to the watched collections by polling them."""
+
+    def __init__(self, overlap=POLL_OVERLAP):
+        self.overlap = overlap
+        self._since = datetime.utcnow()
+        self._seen = {}  # Published document keys -> when they were first seen
+
+    def poll(self):
+        """
+        Publish the writes made since the previous poll.
+
+        Returns:
+            int: The number of writes published
+        """
+        started = datetime.utcnow()
+        since = self._since - self.overlap
+        published = 0
+        # Nobody to publish to; the next poll starts from now
+        if stream_broker.subscriber_count():
+            # ObjectIds start with their creation time, so _id ranges select recent inserts
+            first_id = ObjectId.from_datetime(since)
+            for collection, publish in (
+                ('notifications', _publish_notification),
+                ('broadcast_notifications', _publish_broadcast),
+                ('messages', _publish_message)
+            ):
+                for document in db[collection].find({'_id': {'$gte': first_id}}).sort('_id', 1):
+                    if self._first_seen((collection, document['_id']), started):
+                        publish(document)
+                        published += 1
+            for counters in db.student_counters.find({'updated_at': {'$gte': since}}, {'updated_at': 1}):
+                if self._first_seen(('student_counters', counters['_id'], counters['updated_at']), started):
+                    _publish_counters(counters['_id'])
+                    published += 1
+        self._since = started
+        # Writes older than the next poll's window cannot be read again
+        horizon = started - self.overlap
+        self._seen = {key: seen_at for key, seen_at in self._seen.items() if seen_at >= horizon}
+        return published
+
+    def _first_seen(self, key, now):
+        if key in self._seen:
+            return False
+        self._seen[key] = now
+        return True
+
+class ChangeStreamFeed(threading.Thread):
+    """
+    Daemon thread that feeds the broker from a MongoDB change stream, or by
+    polling the watched collections where change streams are unsupported.
+    """
+
+    def __init__(self, retry_interval=5.0, poll_interval=POLL_INTERVAL):
+        super().__init__(name='notification-change-stream', daemon=True)
+        self.retry_interval = retry_interval
+        self.poll_interval = poll_interval
+        self._stopped = threading.Event()
+        self._resume_token = None
+
+    def run(self):
+        pipeline = [{'$match': {
+            'ns.coll': {'$in': list(WATCHED_COLLECTIONS)},
+            'operationType': {'$in': ['insert', 'update', 'replace']}
+        }}]
+        while not self._stopped.is_set():
+            try:
+                with db.watch(pipeline, resume_after=self._resume_token) as stream:
+                    _feed_active.set()
+                    for change in stream:
+                        self._dispatch(change)
+                        self._resume_token = stream.resume_token
+                        if self._stopped.is_set():
+                            break
+            except OperationFailure as e:
+                if e.code == CHANGE_STREAM_UNSUPPORTED:
+                    logger.warning("Change streams are not supported; polling for notification stream writes instead")
+                    self._poll()
+                    break
+                logger.error(f"Notification change stream failed: {str(e)}")
+            except PyMongoError as e:
+                logger.error(f"Notification change stream failed: {str(e)}")
+            finally:
+                _feed_active.clear()
+            self._stopped.wait(self.retry_interval)
+
+    def _poll(self):
+        poller = CollectionPoller()
+        _feed_active.set()
+        try:
+            while not self._stopped.wait(self.poll_interval):
+                try:
+                    poller.poll()
+                except PyMongoError as e:
+                    logger.error(f"Notification polling failed: {str(e)}")
+        finally:
+            _feed_active.clear()
+
+    def _dispatch(self, change):
+        collection = change['ns']['coll']
+        if collection == 'student_counters':
+            _publish_counters(change['documentKey']['_id'])
+        elif change['operationType'] == 'insert':
+            document = change['fullDocument']
+            if collection == 'notifications':
+                _publish_notification(document)
+            elif collection == 'broadcast_notifications':
+                _publish_broadcast(document)
+            elif collection == 'messages':
+                _publish_message(document)
+
+    def stop(self):
+        self._stopped.set()
+
+_feed = None
+
+def start_change_stream_feed(poll_interval=POLL_INTERVAL):
+    """Start this worker's change stream (or polling) feed if it is not running yet."""
+    global _feed
+    if _feed is None or not _feed.is_alive():
+        _feed = ChangeStreamFeed(poll_interval=poll_interval)
+        _feed.start()
+    return _feed
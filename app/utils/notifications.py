@@ -0,0 +1,215 @@
+"""
+Notification service.
+
+Notifications reach students in one of two ways:
+
+- Fan-out on write: one document per recipient in ``notifications``, written
+  with batched ``insert_many`` calls on the background pool (``notify_many``).
+- Fan-out on read: a broadcast meant for every student is stored once in
+  ``broadcast_notifications`` (``broadcast``) and merged into each student's
+  list when it is read. Each student has a read watermark in
+  ``notification_watermarks``; broadcasts at or before it count as read.
+  Signup seeds the watermark, so earlier broadcasts are not a new student's.
+"""
+from datetime import datetime
+
+from pymongo import ReturnDocument
+
+from app import db
+from app.utils import events
+from app.utils.background import submit_background
+from app.utils.pagination import COUNT_EXACT, COUNT_NONE, count_results
+from app.utils.student_counters import increment_counters_many
+
+# Notifications written per insert_many call
+NOTIFICATION_BATCH_SIZE = 500
+
+# Watermark of a student who signed up before watermarks existed and never read a broadcast
+NEVER_READ = datetime(1970, 1, 1)
+
+def build_notification(recipient_id, title, message, notification_type, related_id=None):
+    """Build a notification document."""
+    return {
+        'recipient_id': recipient_id,
+        'title': title,
+        'message': message,
+        'type': notification_type,
+        'related_id': related_id,
+        'timestamp': datetime.utcnow(),
+        'read': False
+    }
+
+def create_notifications(notifications):
+    """
+    Insert many notifications in batches instead of one insert per recipient.
+
+    Args:
+        notifications (list): Documents built with build_notification
+
+    Returns:
+        int: The number of notifications created
+    """
+    created = 0
+    for start in range(0, len(notifications), NOTIFICATION_BATCH_SIZE):
+        batch = notifications[start:start + NOTIFICATION_BATCH_SIZE]
+        result = db.notifications.insert_many(batch, ordered=False)
+        created += len(result.inserted_ids)
+        events.emit(events.NOTIFICATIONS_CREATED, notifications=batch)
+
+        # One counter update per recipient in the batch
+        unread = {}
+        for notification in batch:
+            unread[notification['recipient_id']] = unread.get(notification['recipient_id'], 0) + 1
+        increment_counters_many({recipient_id: {'unread_notifications': count} for recipient_id, count in unread.items()})
+    return created
+
+def notify_many(recipients, title, message, notification_type, related_id=None):
+    """
+    Send the same notification to many students on the background pool.
+
+    Args:
+        recipients (iterable): Registration numbers; duplicates are notified once
+        title (str): The notification title
+        message (str): The notification message
+        notification_type (str): The type of notification (e.g., 'announcement')
+        related_id (str, optional): The ID of the related object
+
+    Returns:
+        Future: Resolves to the number of notifications created
+    """
+    recipients = list(dict.fromkeys(recipients))
+    notifications = [
+        build_notification(recipient_id, title, message, notification_type, related_id)
+        for recipient_id in recipients
+    ]
+    return submit_background(create_notifications, notifications)
+
+def notify_all_students(title, message, notification_type, related_id=None):
+    """
+    Write a notification for every student on the background pool.
+
+    Students are read and notified one batch at a time, so the full
+    recipient list is never held in memory.
+
+    Returns:
+        Future: Resolves to the number of notifications created
+    """
+    def fan_out():
+        created = 0
+        batch = []
+        for student in db.students.find({}, {'registration_no': 1}).batch_size(NOTIFICATION_BATCH_SIZE):
+            batch.append(build_notification(student['registration_no'], title, message, notification_type, related_id))
+            if len(batch) == NOTIFICATION_BATCH_SIZE:
+                created += create_notifications(batch)
+                batch = []
+        if batch:
+            created += create_notifications(batch)
+        return created
+
+    return submit_background(fan_out)
+
+def broadcast(title, message, notification_type, related_id=None):
+    """
+    Store a notification for every student once, to be merged in at read time.
+
+    Returns:
+        str: The ID of the broadcast
+    """
+    notification = build_notification(None, title, message, notification_type, related_id)
+    del notification['recipient_id'], notification['read']
+    result = db.broadcast_notifications.insert_one(notification)
+    events.emit(events.BROADCAST_CREATED, notification=notification)
+    return str(result.inserted_id)
+
+def get_read_watermark(recipient_id):
+    """Return the time up to which a student has read broadcasts (NEVER_READ if never)."""
+    watermark = db.notification_watermarks.find_one({'_id': recipient_id}, {'read_until': 1})
+    return watermark['read_until'] if watermark else NEVER_READ
+
+def advance_read_watermark(recipient_id, read_until=None):
+    """
+    Mark a student's broadcasts up to read_until (default now) as read.
+
+    The watermark never moves backwards.
+
+    Returns:
+        tuple: (previous watermark, new watermark)
+    """
+    read_until = datetime.utcnow() if read_until is None else read_until
+    before = db.notification_watermarks.find_one_and_update(
+        {'_id': recipient_id},
+        {'$max': {'read_until': read_until}},
+        upsert=True,
+        return_document=ReturnDocument.BEFORE
+    )
+    previous = before['read_until'] if before else NEVER_READ
+    return previous, max(previous, read_until)
+
+def _broadcast_query(watermark, read=None):
+    """Filter broadcasts by their read state relative to a watermark."""
+    if read is True:
+        return {'timestamp': {'$lte': watermark}}
+    if read is False:
+        return {'timestamp': {'$gt': watermark}}
+    return {}
+
+def count_unread_broadcasts(recipient_id, watermark=None):
+    """Count the broadcasts a student has not read yet."""
+    if watermark is None:
+        watermark = get_read_watermark(recipient_id)
+    return db.broadcast_notifications.count_documents(_broadcast_query(watermark, read=False))
+
+def list_notifications(recipient_id, read=None, page=1, per_page=10, count_mode=COUNT_EXACT):
+    """
+    Fetch one page of a student's notifications merged with broadcasts.
+
+    Args:
+        recipient_id (str): The student's registration number
+        read (bool, optional): Only return read (True) or unread (False) ones
+        page (int): 1-based page number
+        per_page (int): Page size
+        count_mode (str): One of the pagination count modes
+
+    Returns:
+        tuple: (notifications newest first, pagination metadata)
+    """
+    watermark = get_read_watermark(recipient_id)
+    query = {'recipient_id': recipient_id}
+    if read is not None:
+        query['read'] = read
+    broadcast_query = _broadcast_query(watermark, read)
+
+    limit = per_page + 1 if count_mode == COUNT_NONE else per_page
+    notifications = list(db.notifications.aggregate([
+        {'$match': query},
+        {'$unionWith': {'coll': 'broadcast_notifications', 'pipeline': [
+            {'$match': broadcast_query},
+            {'$addFields': {
+                'recipient_id': {'$literal': recipient_id},
+                'read': {'$lte': ['$timestamp', watermark]},
+                'broadcast': True
+            }}
+        ]}},
+        {'$sort': {'timestamp': -1, '_id': -1}},
+        {'$skip': (page - 1) * per_page},
+        {'$limit': limit}
+    ]))
+
+    if count_mode == COUNT_NONE:
+        return notifications[:per_page], {
+            'page': page,
+            'per_page': per_page,
+            'count': count_mode,
+            'has_more': len(notifications) > per_page
+        }
+
+    total = (count_results(db.notifications, query, count_mode)
+             + count_results(db.broadcast_notifications, broadcast_query, count_mode))
+    return notifications, {
+        'total': total,
+        'page': page,
+        'per_page': per_page,
+        'pages': (total + per_page - 1) // per_page,
+        'count': count_mode,
+        'has_more': page * per_page < total
+    }
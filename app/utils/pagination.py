@@ -0,0 +1,133 @@
+"""
+Utility functions for paginated list endpoints.
+
+List endpoints accept a ``count`` query parameter that controls how the
+total number of results is obtained:
+
+- ``exact``: run ``count_documents`` with the page filter (default)
+- ``estimate``: use ``estimated_document_count`` for unfiltered queries and a
+  short-lived cached count for filtered ones
+- ``none``: skip counting and fetch ``per_page + 1`` documents to report
+  whether another page exists
+"""
+from bson import json_util
+from flask import request
+
+from app.utils.cache import TTLCache
+
+COUNT_EXACT = 'exact'
+COUNT_ESTIMATE = 'estimate'
+COUNT_NONE = 'none'
+COUNT_MODES = (COUNT_EXACT, COUNT_ESTIMATE, COUNT_NONE)
+
+# Upper bound on page size so a single request cannot fetch a whole collection
+MAX_PER_PAGE = 100
+
+# Cached totals for count=estimate on filtered queries
+_count_cache = TTLCache(ttl=60, maxsize=2048)
+
+def get_page_params(default_per_page=10, max_per_page=MAX_PER_PAGE):
+    """
+    Read and clamp pagination parameters from the request.
+
+    Returns:
+        tuple: (page, per_page)
+    """
+    page = max(int(request.args.get('page', 1)), 1)
+    per_page = min(max(int(request.args.get('per_page', default_per_page)), 1), max_per_page)
+    return page, per_page
+
+def get_count_mode(default=COUNT_EXACT):
+    """Read the count mode from the request, falling back to default for unknown values."""
+    count_mode = request.args.get('count', default).lower()
+    return count_mode if count_mode in COUNT_MODES else default
+
+def count_results(collection, query, count_mode=COUNT_EXACT, max_time_ms=None):
+    """
+    Count the documents matching query using the given count mode.
+
+    Args:
+        collection: The pymongo collection to count in
+        query (dict): The page filter
+        count_mode (str): Either 'exact' or 'estimate'
+        max_time_ms (int, optional): Server-side time limit for the count
+
+    Returns:
+        int: The (possibly approximate) number of matching documents
+    """
+    kwargs = {'maxTimeMS': max_time_ms} if max_time_ms else {}
+
+    if count_mode != COUNT_ESTIMATE:
+        return collection.count_documents(query, **kwargs)
+
+    # Unfiltered totals come from collection metadata without a scan
+    if not query:
+        return collection.estimated_document_count(**kwargs)
+
+    cache_key = (collection.full_name, json_util.dumps(query, sort_keys=True))
+    total = _count_cache.get(cache_key)
+    if total is None:
+        total = collection.count_documents(query, **kwargs)
+        _count_cache.set(cache_key, total)
+    return total
+
+def page_metadata(total, page, per_page):
+    """Build the pagination metadata for a result set whose total is already known."""
+    return {
+        'total': total,
+        'page': page,
+        'per_page': per_page,
+        'pages': (total + per_page - 1) // per_page,
+        'count': COUNT_EXACT,
+        'has_more': page * per_page < total
+    }
+
+def paginate_query(collection, query, page, per_page, count_mode=COUNT_EXACT,
+                   sort=None, projection=None, max_time_ms=None):
+    """
+    Fetch one page of documents and the pagination metadata for it.
+
+    Args:
+        collection: The pymongo collection to query
+        query (dict): The page filter
+        page (int): 1-based page number
+        per_page (int): Page size
+        count_mode (str): One of COUNT_MODES
+        sort (list, optional): List of (field, direction) pairs
+        projection (dict, optional): Fields to include or exclude
+        max_time_ms (int, optional): Server-side time limit for each query
+
+    Returns:
+        tuple: (documents, metadata)
+            - documents is the list of documents on the page
+            - metadata is a dict with page, per_page, count and has_more, plus
+              total and pages unless count_mode is 'none'
+    """
+    cursor = collection.find(query, projection)
+    if sort:
+        cursor = cursor.sort(sort)
+    cursor = cursor.skip((page - 1) * per_page)
+    if max_time_ms:
+        cursor = cursor.max_time_ms(max_time_ms)
+
+    if count_mode == COUNT_NONE:
+        # One extra document tells us whether another page exists
+        documents = list(cursor.limit(per_page + 1))
+        has_more = len(documents) > per_page
+        return documents[:per_page], {
+            'page': page,
+            'per_page': per_page,
+            'count': count_mode,
+            'has_more': has_more
+        }
+
+    documents = list(cursor.limit(per_page))
+    total = count_results(collection, query, count_mode, max_time_ms)
+    return documents, {
+        'total': total,
+        'page': page,
+        'per_page': per_page,
+        'pages': (total + per_page - 1) // per_page,
+        'count': count_mode,
+        'has_more': page * per_page < total
+    }
@@ -0,0 +1,91 @@
+"""
+In-process publish/subscribe for long-lived client connections.
+
+Each subscriber gets a bounded queue. A subscriber that falls behind does not
+slow down publishers: messages that do not fit are dropped and the
+subscription is flagged as overflowed, so the consumer can resynchronise from
+the database instead.
+"""
+import queue
+import threading
+from collections import defaultdict
+
+from app.utils import metrics
+
+# Messages published here reach every subscriber
+BROADCAST = '*'
+
+class Subscription:
+    """A subscriber's queue of messages for one channel."""
+
+    def __init__(self, channel, maxsize):
+        self.channel = channel
+        self.overflowed = False
+        self._queue = queue.Queue(maxsize)
+
+    def get(self, timeout=None):
+        """
+        Wait for the next message.
+
+        Raises:
+            queue.Empty: If no message arrived within timeout
+        """
+        return self._queue.get(timeout=timeout)
+
+    def drain(self):
+        """Discard pending messages and clear the overflow flag."""
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        self.overflowed = False
+
+    def _offer(self, message):
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except queue.Full:
+            self.overflowed = True
+            metrics.increment('pubsub.dropped')
+            return False
+
+class Broker:
+    """Routes published messages to the subscriptions of a channel."""
+
+    def __init__(self):
+        self._subscriptions = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel, maxsize=100):
+        """Subscribe to channel (and to BROADCAST) with a queue of maxsize messages."""
+        subscription = Subscription(channel, maxsize)
+        with self._lock:
+            self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+    def publish(self, channel, message):
+        """
+        Deliver message to the subscribers of channel without blocking.
+
+        Returns:
+            int: The number of subscribers that received the message
+        """
+        with self._lock:
+            if channel == BROADCAST:
+                targets = [s for subscriptions in self._subscriptions.values() for s in subscriptions]
+            else:
+                targets = list(self._subscriptions.get(channel, ()))
+        return sum(subscription._offer(message) for subscription in targets)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
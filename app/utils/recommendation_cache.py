@@ -0,0 +1,49 @@
+"""
+Per-student cache of company recommendation rankings.
+
+Entries are keyed by student and stamped with the catalogue version and a
+fingerprint of the student's skills and interests, so a changed catalogue or
+profile misses the cache; profile routes also drop the local entry eagerly.
+Callers must only store a ranking under the catalogue version it was built
+from (see CompanyRecommender.rank_at), otherwise a worker whose index lags
+behind a change made through another worker would cache a stale ranking
+under the new version.
+"""
+import hashlib
+import json
+
+from app.utils.cache import TTLCache
+from app.utils import metrics
+
+# Rankings are recomputed at least this often even without changes
+RECOMMENDATION_TTL = 600
+
+_recommendation_cache = TTLCache(ttl=RECOMMENDATION_TTL, maxsize=4096)
+
+def profile_fingerprint(skills, interests, skill_ids=None):
+    """Hash of the profile fields a ranking depends on."""
+    payload = json.dumps([sorted(map(str, skills)), sorted(map(str, interests)), sorted(skill_ids or [])])
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+def get_cached_recommendations(registration_no, version, fingerprint):
+    """
+    Return the cached (ranking, source) of a student, or None.
+
+    Counts a hit or a miss in the ``recommendations.cache_hits`` and
+    ``recommendations.cache_misses`` metrics.
+    """
+    entry = _recommendation_cache.get(registration_no)
+    if entry is not None and entry[0] == version and entry[1] == fingerprint:
+        metrics.increment('recommendations.cache_hits')
+        return entry[2]
+    metrics.increment('recommendations.cache_misses')
+    return None
+
+def cache_recommendations(registration_no, version, fingerprint, result):
+    """Store the (ranking, source) of a student for the given catalogue version and profile."""
+    _recommendation_cache.set(registration_no, (version, fingerprint, result))
+
+def invalidate_recommendations(registration_no):
+    """Drop the cached ranking of a student after their skills or interests changed."""
+    _recommendation_cache.delete(registration_no)
+    metrics.increment('recommendations.cache_invalidations')
@@ -0,0 +1,295 @@
+"""
+Skill-based company recommendation engine.
+
+Active companies are kept in two sparse binary matrices per worker:
+
+- a company x skill matrix built from each posting's ``requirements``
+- a company x word matrix built from each posting's title and description
+
+A student is scored against every active company at once with sparse matrix
+products, so the ranking is global and its cost does not depend on how many
+skills the student lists. Skills are weighted twice as much as interests, as
+in the original ``match_percentage`` calculation.
+
+Postings and students that carry canonical skill IDs (see ``app.utils.skills``)
+are matched on those IDs; older documents fall back to normalized text keys.
+"""
+import re
+import threading
+import time
+
+import numpy as np
+from scipy import sparse
+
+from app import db
+from app.utils import events
+from app.utils.catalogue import catalogue_version
+
+# Seconds between full reloads, which pick up changes made by other workers
+REFRESH_INTERVAL = 300
+
+SKILL_WEIGHT = 2
+INTEREST_WEIGHT = 1
+
+# Words keep characters used in skill names such as c++, c# and node.js
+_WORD = re.compile(r'[a-z0-9+#.]+')
+
+COMPANY_FIELDS = {'requirements': 1, 'requirement_ids': 1, 'requirement_keys': 1, 'job_title': 1, 'job_description': 1, 'active': 1}
+
+def normalize_skill(skill):
+    """Normalize a skill or requirement for exact matching."""
+    return ' '.join(words(skill))
+
+def words(text):
+    """Split text into lower-case words."""
+    return [word.strip('.') for word in _WORD.findall((text or '').lower()) if word.strip('.')]
+
+def requirement_items(requirements):
+    """Split a posting's requirements, stored as a comma-joined string or a list, into items."""
+    if isinstance(requirements, str):
+        requirements = requirements.split(',')
+    return [item for item in (requirements or []) if isinstance(item, str) and item.strip()]
+
+def company_skill_keys(company):
+    """
+    Return the skill keys a posting requires.
+
+    Postings with canonical skill IDs use those plus the text keys of the
+    requirements that did not resolve to a known skill (``requirement_keys``).
+    Otherwise each requirement contributes its full normalized form and its
+    single words, so "Python" matches both "Python" and "Experience with
+    Python" while "Java" does not match "JavaScript".
+    """
+    if company.get('requirement_ids'):
+        requirement_keys = company.get('requirement_keys')
+        if requirement_keys is None:
+            # Canonicalised before the unresolved text keys were stored
+            from app.utils.skills import resolve_requirements
+            requirement_keys = resolve_requirements(company.get('requirements'))[1]
+        return set(company['requirement_ids']) | set(requirement_keys)
+    keys = set()
+    for item in requirement_items(company.get('requirements')):
+        normalized = normalize_skill(item)
+        if normalized:
+            keys.add(normalized)
+            keys.update(normalized.split())
+    return keys
+
+def company_text_words(company):
+    """Return the words of a posting's title and description."""
+    return set(words(company.get('job_title', ''))) | set(words(company.get('job_description', '')))
+
+class CompanyRecommender:
+    """Per-worker sparse index of active companies for global ranking."""
+
+    def __init__(self, refresh_interval=REFRESH_INTERVAL):
+        """
+        Args:
+            refresh_interval (float): Seconds between full reloads from MongoDB
+        """
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._companies = {}      # company id -> (skill keys, text words)
+        self._loaded_at = None
+        self._version = None      # Catalogue version the index reflects, if known
+        self._matrices = None     # (company ids, skill vocab, word vocab, skill matrix, word matrix)
+
+    def load(self):
+        """Load every active company from MongoDB, replacing the current index."""
+        # Read before the companies, so a change made meanwhile triggers another reload
+        version = catalogue_version()
+        self.load_companies(db.companies.find({'active': True}, COMPANY_FIELDS).sort('posted_date', -1), version)
+
+    def load_companies(self, company_documents, version=None):
+        """Replace the current index with the given active company documents of a catalogue version."""
+        companies = {}
+        for company in company_documents:
+            companies[str(company['_id'])] = (company_skill_keys(company), company_text_words(company))
+        with self._lock:
+            self._companies = companies
+            self._matrices = None
+            self._loaded_at = time.monotonic()
+            self._version = version
+
+    def ensure_loaded(self, version=None):
+        """
+        Load the index on first use and reload it once it is older than the
+        refresh interval or, when version is given, reflects another catalogue
+        version (e.g. after a change made through another worker).
+        """
+        if (self._loaded_at is None
+                or time.monotonic() - self._loaded_at >= self.refresh_interval
+                or (version is not None and version != self._version)):
+            self.load()
+
+    def _advance_version(self, version):
+        """Record a change made through this worker. Caller holds the lock."""
+        # Only the change that produced version may be applied in place; if
+        # others happened since the load, the next read reloads instead
+        if version is not None and self._version is not None and version == self._version + 1:
+            self._version = version
+        self._matrices = None
+
+    def upsert_company(self, company, version=None):
+        """
+        Add, replace or remove a single company after it was created or updated.
+
+        Inactive companies are removed from the index.
+
+        Args:
+            company (dict): The company document
+            version (int, optional): The catalogue version the change produced
+        """
+        company_id = str(company['_id'])
+        with self._lock:
+            if company.get('active', False):
+                self._companies[company_id] = (company_skill_keys(company), company_text_words(company))
+            else:
+                self._companies.pop(company_id, None)
+            self._advance_version(version)
+
+    def refresh_company(self, company_id, version=None):
+        """Re-read one company from MongoDB and update the index (see upsert_company)."""
+        company = db.companies.find_one({'_id': company_id}, COMPANY_FIELDS)
+        if company:
+            self.upsert_company(company, version)
+        else:
+            with self._lock:
+                self._companies.pop(str(company_id), None)
+                self._advance_version(version)
+
+    def remove_companies(self, company_ids):
+        """Drop postings from the index, e.g. after they were deactivated."""
+        with self._lock:
+            for company_id in company_ids:
+                self._companies.pop(str(company_id), None)
+            self._matrices = None
+
+    def _build_matrices(self):
+        """Build the sparse matrices from the company features. Caller holds the lock."""
+        company_ids = list(self._companies)
+        skill_vocab = {}
+        word_vocab = {}
+        skill_rows, skill_cols, word_rows, word_cols = [], [], [], []
+        for row, company_id in enumerate(company_ids):
+            skill_keys, text_words = self._companies[company_id]
+            for key in skill_keys:
+                skill_rows.append(row)
+                skill_cols.append(skill_vocab.setdefault(key, len(skill_vocab)))
+            for word in text_words:
+                word_rows.append(row)
+                word_cols.append(word_vocab.setdefault(word, len(word_vocab)))
+
+        n = len(company_ids)
+        skill_matrix = sparse.csr_matrix(
+            (np.ones(len(skill_rows), dtype=np.float32), (skill_rows, skill_cols)),
+            shape=(n, len(skill_vocab))
+        )
+        word_matrix = sparse.csr_matrix(
+            (np.ones(len(word_rows), dtype=np.float32), (word_rows, word_cols)),
+            shape=(n, len(word_vocab))
+        )
+        self._matrices = (company_ids, skill_vocab, word_vocab, skill_matrix, word_matrix)
+        return self._matrices
+
+    def rank(self, skills, interests, skill_ids=None):
+        """
+        Score every active company for a student and sort them globally.
+
+        A skill matches a company that requires it. An interest matches a
+        company whose title or description contains all of its words.
+
+        Args:
+            skills (list): The student's technical skills
+            interests (list): The student's interests
+            skill_ids (list): Canonical IDs of the student's technical skills
+
+        Returns:
+            list: (company_id, match_percentage) pairs for companies matching at
+            least one skill or interest, best match first
+        """
+        return self.rank_at(None, skills, interests, skill_ids)[0]
+
+    def rank_at(self, version, skills, interests, skill_ids=None):
+        """
+        Rank like rank, reloading first if the index is not at catalogue version.
+
+        Returns:
+            tuple: (ranking, catalogue version the ranking was built from; None
+            if unknown). The two versions differ when the catalogue changed
+            again during the reload, and the ranking should not be cached.
+        """
+        self.ensure_loaded(version)
+        with self._lock:
+            matrices = self._matrices or self._build_matrices()
+            built_version = self._version
+        company_ids, skill_vocab, word_vocab, skill_matrix, word_matrix = matrices
+        if not company_ids:
+            return [], built_version
+
+        text_keys = {normalize_skill(skill) for skill in skills if normalize_skill(skill)}
+        # IDs match canonicalised postings, text keys match older ones
+        skill_keys = set(skill_ids or []) | text_keys
+        scores = np.zeros(len(company_ids), dtype=np.float32)
+
+        # Each known skill is one column of the query vector
+        skill_columns = [skill_vocab[key] for key in skill_keys if key in skill_vocab]
+        if skill_columns:
+            skill_query = np.zeros(len(skill_vocab), dtype=np.float32)
+            skill_query[skill_columns] = 1
+            scores += SKILL_WEIGHT * (skill_matrix @ skill_query)
+
+        # Each interest is one column of the query matrix; a company matches when
+        # it contains every word of the interest
+        interest_columns = []
+        for interest in interests:
+            interest_words = set(words(interest))
+            if interest_words and interest_words <= word_vocab.keys():
+                interest_columns.append([word_vocab[word] for word in interest_words])
+        if interest_columns:
+            rows = [word for column in interest_columns for word in column]
+            cols = [i for i, column in enumerate(interest_columns) for _ in column]
+            interest_query = sparse.csr_matrix(
+                (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+                shape=(len(word_vocab), len(interest_columns))
+            )
+            word_hits = (word_matrix @ interest_query).toarray()
+            required = np.array([len(column) for column in interest_columns], dtype=np.float32)
+            scores += INTEREST_WEIGHT * (word_hits >= required).sum(axis=1)
+
+        # Each skill counts once whether it matches by ID or by text
+        skill_count = max(len(text_keys), len(skill_ids or []))
+        total_factors = skill_count * SKILL_WEIGHT + len(interests) * INTEREST_WEIGHT
+        matched = np.flatnonzero(scores)
+        # Stable sort keeps newer postings first among equal scores
+        order = matched[np.argsort(-scores[matched], kind='stable')]
+        return [
+            (company_ids[i], min(100, int(scores[i] / total_factors * 100)) if total_factors else 0)
+            for i in order
+        ], built_version
+
+# One index per worker process
+company_recommender = CompanyRecommender()
+events.subscribe(events.COMPANIES_DEACTIVATED, company_recommender.remove_companies)
+
+def init_batch_worker(company_documents):
+    """Build the recommender of a batch worker process from the given companies."""
+    global _batch_recommender
+    _batch_recommender = CompanyRecommender(refresh_interval=float('inf'))
+    _batch_recommender.load_companies(company_documents)
+
+def rank_students_batch(students, top_n):
+    """
+    Rank companies for a shard of students inside a batch worker process.
+
+    Args:
+        students (list): (registration_no, skills, interests, skill_ids) tuples
+        top_n (int): Number of companies kept per student
+
+    Returns:
+        list: (registration_no, [(company_id, match_percentage), ...]) pairs
+    """
+    return [
+        (registration_no, _batch_recommender.rank(skills, interests, skill_ids)[:top_n])
+        for registration_no, skills, interests, skill_ids in students
+    ]
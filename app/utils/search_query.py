@@ -0,0 +1,127 @@
+"""
+Utility functions for compiling user-supplied search terms into MongoDB filters.
+
+Every filter produced here has a bounded worst-case cost: the raw input is
+capped in length, split into a limited number of terms, and each term is
+escaped so it is matched literally instead of being interpreted as a regular
+expression.
+"""
+import re
+
+# Limits applied to every search query
+MAX_QUERY_LENGTH = 100
+MAX_TERMS = 5
+MIN_TERM_LENGTH = 2
+
+# A term must contain at least one letter or digit to be searchable
+_SEARCHABLE_TERM = re.compile(r'\w')
+
+
+def tokenize_search_query(raw_query, max_length=MAX_QUERY_LENGTH, max_terms=MAX_TERMS):
+    """
+    Split a raw search string into a bounded list of unique search terms.
+
+    Args:
+        raw_query (str): The search string supplied by the client
+        max_length (int): Maximum number of characters considered
+        max_terms (int): Maximum number of terms kept
+
+    Returns:
+        tuple: (terms, truncated)
+            - terms is the list of search terms in input order
+            - truncated is True if part of the input was dropped
+    """
+    query = (raw_query or '').strip()
+    truncated = len(query) > max_length
+    query = query[:max_length]
+
+    terms = []
+    seen = set()
+    for term in query.split():
+        # Punctuation-only and very short terms match almost everything
+        if len(term) < MIN_TERM_LENGTH or not _SEARCHABLE_TERM.search(term):
+            continue
+        key = term.lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        terms.append(term)
+
+    if len(terms) > max_terms:
+        terms = terms[:max_terms]
+        truncated = True
+
+    return terms, truncated
+
+
+def term_predicate(field, term, anchored=False):
+    """
+    Build a literal match predicate for a single term on a single field.
+
+    Anchored predicates are case-sensitive prefix matches, which MongoDB can
+    answer with an index range scan. Other predicates are case-insensitive
+    substring matches on the escaped term.
+    """
+    if anchored:
+        return {field: {'$regex': '^' + re.escape(term)}}
+    return {field: {'$regex': re.escape(term), '$options': 'i'}}
+
+
+def parse_search_terms(raw_query):
+    """
+    Validate a raw search string and split it into search terms.
+
+    Returns:
+        tuple: (success, result)
+            - If success is True, result is a dict with terms and truncated
+            - If success is False, result is an error message
+    """
+    if not raw_query or not raw_query.strip():
+        return False, 'Search query is required'
+
+    terms, truncated = tokenize_search_query(raw_query)
+    if not terms:
+        return False, f'Search query must contain at least one term of {MIN_TERM_LENGTH} or more letters or digits'
+    return True, {'terms': terms, 'truncated': truncated}
+
+def compile_search_query(raw_query, fields, prefix_fields=(), base_filter=None):
+    """
+    Compile a raw search string into a bounded-cost MongoDB filter.
+
+    Each term must match at least one of the given fields. Terms are combined
+    with AND so that adding words narrows the result set.
+
+    Args:
+        raw_query (str): The search string supplied by the client
+        fields (list): Fields searched with case-insensitive substring matches
+        prefix_fields (list, optional): Identifier fields searched with anchored,
+            index-friendly prefix matches
+        base_filter (dict, optional): Additional filter merged into the result
+
+    Returns:
+        tuple: (success, result)
+            - If success is True, result is a dict with filter, terms and truncated
+            - If success is False, result is an error message
+    """
+    success, parsed = parse_search_terms(raw_query)
+    if not success:
+        return False, parsed
+    terms, truncated = parsed['terms'], parsed['truncated']
+
+    clauses = []
+    for term in terms:
+        predicates = [term_predicate(field, term, anchored=True) for field in prefix_fields]
+        predicates.extend(term_predicate(field, term) for field in fields)
+        clauses.append({'$or': predicates})
+
+    search_filter = dict(base_filter or {})
+    if len(clauses) == 1:
+        search_filter.update(clauses[0])
+    else:
+        search_filter['$and'] = clauses
+
+    return True, {
+        'filter': search_filter,
+        'terms': terms,
+        'truncated': truncated
+    }
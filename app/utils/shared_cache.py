@@ -0,0 +1,167 @@
+"""
+Two-tier cache for values shared by every worker.
+
+Values that are the same for every user (the active posting count, the latest
+announcements) are kept in a per-worker LRU in front of a shared tier, the
+``cache`` collection, whose entries expire through a TTL index (which reads
+``expires_at`` as UTC). Each value is
+computed at most once per TTL across all workers: the first worker to miss
+takes a short lease on the key and computes the value while the others wait
+for the shared entry to appear.
+
+Keys may carry a version (such as a catalogue version), so entries go stale
+as soon as the data they were derived from changes.
+
+Cached values must be BSON-serializable and must not be mutated by callers.
+"""
+import logging
+import time
+from datetime import datetime, timedelta
+
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from app import db
+from app.utils import metrics
+from app.utils.cache import TTLCache
+from app.utils.concurrency import DEFAULT_TIMEOUT as FAN_OUT_TIMEOUT
+from app.utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Seconds a worker may spend computing a value before another worker takes over
+LEASE_SECONDS = 10
+
+# Seconds a worker waits for the lease holder before computing the value itself.
+# Values are read inside fan_out tasks, so waiters give up within half of the
+# fan-out timeout and still have time to compute instead of being cut off
+LEASE_WAIT_SECONDS = FAN_OUT_TIMEOUT / 2
+
+# Seconds between shared tier reads while another worker holds the lease
+WAIT_INTERVAL = 0.05
+
+_MISSING = object()
+
+class SharedCache:
+    """Per-worker LRU backed by the shared ``cache`` collection."""
+
+    def __init__(self, name, ttl=60, local_ttl=None, maxsize=256, lease=LEASE_SECONDS, wait=LEASE_WAIT_SECONDS):
+        """
+        Args:
+            name (str): Name used in the metrics counters
+            ttl (float): Lifetime of a shared entry in seconds
+            local_ttl (float, optional): Upper bound on how long a worker keeps
+                its own copy (defaults to ttl); a copy never outlives the
+                shared entry it came from
+            maxsize (int): Maximum number of entries in the per-worker tier
+            lease (float): Seconds a worker may spend computing a value
+            wait (float): Seconds a worker waits for another worker's value
+                before computing it without sharing; keep it below the
+                timeout of any fan_out task reading the cache
+        """
+        self.ttl = ttl
+        self.local_ttl = ttl if local_ttl is None else local_ttl
+        self.lease = lease
+        self.wait = wait
+        self._local = TTLCache(ttl=self.local_ttl, maxsize=maxsize)
+        self._flight = SingleFlight(f'shared_cache.{name}')
+
+    @staticmethod
+    def make_key(name, version=None):
+        """Build the cache key for a value, tagged with its version if given."""
+        return name if version is None else f'{name}:v{version}'
+
+    def get_or_compute(self, name, compute, version=None, ttl=None):
+        """
+        Return the cached value for name, computing and sharing it on a miss.
+
+        Args:
+            name (str): Name of the value
+            compute (callable): Zero-argument function producing the value
+            version (optional): Version the value was derived from
+            ttl (float, optional): Lifetime of a new shared entry (defaults
+                to the cache TTL)
+
+        Returns:
+            The cached or freshly computed value
+        """
+        key = self.make_key(name, version)
+        value = self._local.get(key, _MISSING)
+        if value is not _MISSING:
+            metrics.increment('shared_cache.local_hits')
+            return value
+
+        # Only one thread per worker goes to the shared tier for a key
+        return self._flight.do(key, lambda: self._load(key, compute, ttl or self.ttl))
+
+    def invalidate(self, name, version=None):
+        """
+        Drop a value from this worker's tier and the shared tier.
+
+        Other workers keep their own copies until they expire; values that
+        must change everywhere at once should be versioned instead.
+        """
+        key = self.make_key(name, version)
+        self._local.delete(key)
+        db.cache.delete_one({'_id': key})
+
+    def _load(self, key, compute, ttl):
+        """Fill this worker's tier from the shared tier, computing the value if needed."""
+        # A previous execution may have filled it since the caller missed
+        value = self._local.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        try:
+            value, expires_at = self._get_shared(key, compute, ttl)
+        except PyMongoError as e:
+            # Without the shared tier each worker computes its own copy
+            logger.warning(f"Shared cache unavailable for {key}: {str(e)}")
+            metrics.increment('shared_cache.errors')
+            value, expires_at = compute(), datetime.utcnow() + timedelta(seconds=self.local_ttl)
+        remaining = (expires_at - datetime.utcnow()).total_seconds()
+        self._local.set(key, value, ttl=min(self.local_ttl, remaining))
+        return value
+
+    def _get_shared(self, key, compute, ttl):
+        """Read key from the shared tier, computing it under a lease on a miss."""
+        give_up_at = time.monotonic() + self.wait
+        while True:
+            entry = db.cache.find_one({'_id': key})
+            now = datetime.utcnow()
+            if entry and entry['expires_at'] > now:
+                metrics.increment('shared_cache.shared_hits')
+                return entry['value'], entry['expires_at']
+
+            if self._acquire_lease(key, now):
+                try:
+                    metrics.increment('shared_cache.misses')
+                    value = compute()
+                    expires_at = datetime.utcnow() + timedelta(seconds=ttl)
+                    db.cache.replace_one(
+                        {'_id': key},
+                        {'_id': key, 'value': value, 'expires_at': expires_at},
+                        upsert=True
+                    )
+                    return value, expires_at
+                finally:
+                    db.cache.delete_one({'_id': f'lease:{key}'})
+
+            if time.monotonic() >= give_up_at:
+                # The lease holder is slow or gone; compute without sharing
+                metrics.increment('shared_cache.lease_timeouts')
+                return compute(), datetime.utcnow() + timedelta(seconds=self.local_ttl)
+            time.sleep(WAIT_INTERVAL)
+
+    def _acquire_lease(self, key, now):
+        """Take the lease on key unless another worker holds an unexpired one."""
+        try:
+            db.cache.update_one(
+                {'_id': f'lease:{key}', 'expires_at': {'$lte': now}},
+                {'$set': {'expires_at': now + timedelta(seconds=self.lease)}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+# Cache for values shared by every student, such as dashboard statistics
+shared_cache = SharedCache('global', ttl=300)
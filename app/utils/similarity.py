@@ -0,0 +1,212 @@
+"""
+Precomputed "similar companies" table.
+
+Active postings are vectorized with TF-IDF over their title, requirements and
+description. The top-K cosine neighbours of each posting are stored, together
+with a small summary of each neighbour, in the ``similar_companies``
+collection so the similar-companies endpoint is a single indexed read.
+"""
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+from scipy import sparse
+from pymongo import ReplaceOne
+
+from app import db
+from app.utils.recommender import words, requirement_items
+
+# Number of neighbours stored per posting
+TOP_K = 10
+
+# Rows of the similarity matrix computed at once, bounding memory use
+CHUNK_SIZE = 256
+
+# Title words describe the role best, so they count more than description words
+TITLE_WEIGHT = 2
+
+COMPANY_FIELDS = {
+    'name': 1, 'job_title': 1, 'job_type': 1, 'location': 1, 'logo': 1,
+    'requirements': 1, 'job_description': 1
+}
+
+def company_terms(company):
+    """Return the weighted term counts of a posting."""
+    terms = Counter()
+    for word in words(company.get('job_title', '')):
+        terms[word] += TITLE_WEIGHT
+    for item in requirement_items(company.get('requirements')):
+        terms.update(words(item))
+    terms.update(words(company.get('job_description', '')))
+    return terms
+
+def build_tfidf_matrix(companies):
+    """
+    Vectorize postings with L2-normalized TF-IDF.
+
+    Args:
+        companies (list): Company documents
+
+    Returns:
+        scipy.sparse.csr_matrix: One row per company
+    """
+    vocab = {}
+    rows, cols, values = [], [], []
+    for row, company in enumerate(companies):
+        for term, count in company_terms(company).items():
+            rows.append(row)
+            cols.append(vocab.setdefault(term, len(vocab)))
+            values.append(1 + np.log(count))
+
+    matrix = sparse.csr_matrix(
+        (np.array(values, dtype=np.float32), (rows, cols)),
+        shape=(len(companies), len(vocab))
+    )
+
+    # Smoothed inverse document frequency
+    document_frequency = np.bincount(matrix.indices, minlength=len(vocab))
+    idf = np.log((1 + len(companies)) / (1 + document_frequency)) + 1
+    matrix = matrix @ sparse.diags(idf.astype(np.float32))
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.csr_matrix(sparse.diags(1 / norms) @ matrix)
+
+def top_k_neighbours(matrix, rows, k=TOP_K):
+    """
+    Compute the k most similar postings for each of the given rows.
+
+    Returns:
+        dict: Row index -> list of (neighbour row index, cosine similarity)
+    """
+    neighbours = {}
+    transposed = matrix.T.tocsc()
+    for start in range(0, len(rows), CHUNK_SIZE):
+        chunk = rows[start:start + CHUNK_SIZE]
+        similarities = (matrix[chunk] @ transposed).toarray()
+        for offset, row in enumerate(chunk):
+            scores = similarities[offset]
+            scores[row] = 0  # A posting is not similar to itself
+            candidates = np.flatnonzero(scores > 0)
+            if len(candidates) > k:
+                candidates = candidates[np.argpartition(-scores[candidates], k)[:k]]
+            candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+            neighbours[row] = [(int(i), float(scores[i])) for i in candidates]
+    return neighbours
+
+def neighbour_summary(company, score):
+    """Build the summary of a neighbour stored in the similar companies table."""
+    return {
+        'company_id': company['_id'],
+        'name': company.get('name', ''),
+        'job_title': company.get('job_title', ''),
+        'job_type': company.get('job_type', ''),
+        'location': company.get('location', ''),
+        'logo': company.get('logo', ''),
+        'similarity': round(score, 4)
+    }
+
+def _write_neighbours(companies, neighbours):
+    """Replace the stored neighbour lists of the given rows."""
+    now = datetime.utcnow()
+    operations = [
+        ReplaceOne(
+            {'company_id': companies[row]['_id']},
+            {
+                'company_id': companies[row]['_id'],
+                'neighbours': [neighbour_summary(companies[i], score) for i, score in row_neighbours],
+                'computed_at': now
+            },
+            upsert=True
+        )
+        for row, row_neighbours in neighbours.items()
+    ]
+    if operations:
+        db.similar_companies.bulk_write(operations, ordered=False)
+    return len(operations)
+
+def _load_active_companies():
+    """Load every active posting with the fields used for similarity."""
+    return list(db.companies.find({'active': True}, COMPANY_FIELDS).sort('_id', 1))
+
+def compute_similar_companies(k=TOP_K):
+    """
+    Recompute the similar companies table for every active posting.
+
+    Returns:
+        int: The number of postings whose neighbours were stored
+    """
+    companies = _load_active_companies()
+    if companies:
+        matrix = build_tfidf_matrix(companies)
+        written = _write_neighbours(companies, top_k_neighbours(matrix, list(range(len(companies))), k))
+    else:
+        written = 0
+
+    # Drop entries of postings that are no longer active
+    db.similar_companies.delete_many({'company_id': {'$nin': [company['_id'] for company in companies]}})
+    return written
+
+def update_similar_companies(company_id, k=TOP_K):
+    """
+    Recompute the neighbours affected by a change to one posting.
+
+    The posting's own list is recomputed, along with the lists of postings
+    that currently reference it, that it now references, or that it is now
+    similar enough to enter. An inactive or deleted posting is removed from
+    the table. The whole matrix is rebuilt because the IDF weights depend on
+    every posting.
+
+    Returns:
+        int: The number of postings whose neighbours were stored
+    """
+    companies = _load_active_companies()
+    positions = {company['_id']: row for row, company in enumerate(companies)}
+
+    # Postings whose stored lists mention this one may need to change
+    affected = {
+        doc['company_id']
+        for doc in db.similar_companies.find({'neighbours.company_id': company_id}, {'company_id': 1})
+    }
+
+    matrix = build_tfidf_matrix(companies) if companies else None
+    if company_id in positions:
+        row = positions[company_id]
+        own = top_k_neighbours(matrix, [row], k)
+        affected.update(companies[i]['_id'] for i, _ in own[row])
+        affected.add(company_id)
+        affected.update(_entering_lists(companies, matrix, row, k))
+    else:
+        db.similar_companies.delete_one({'company_id': company_id})
+
+    rows = sorted(positions[affected_id] for affected_id in affected if affected_id in positions)
+    if not rows:
+        return 0
+    return _write_neighbours(companies, top_k_neighbours(matrix, rows, k))
+
+def _entering_lists(companies, matrix, row, k=TOP_K):
+    """
+    Find the postings whose stored top-k lists the posting at row now belongs in.
+
+    A posting qualifies if its list is not full yet or the changed posting is
+    more similar to it than its current last neighbour.
+    """
+    similarities = (matrix @ matrix[row].T).toarray().ravel()
+    similarities[row] = 0
+    candidates = np.flatnonzero(similarities > 0)
+    if not len(candidates):
+        return set()
+
+    stored = {
+        doc['company_id']: [neighbour['similarity'] for neighbour in doc.get('neighbours', [])]
+        for doc in db.similar_companies.find(
+            {'company_id': {'$in': [companies[i]['_id'] for i in candidates]}},
+            {'company_id': 1, 'neighbours.similarity': 1}
+        )
+    }
+    entering = set()
+    for i in candidates:
+        scores = stored.get(companies[i]['_id'], [])
+        if len(scores) < k or round(float(similarities[i]), 4) > min(scores):
+            entering.add(companies[i]['_id'])
+    return entering
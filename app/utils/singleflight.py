@@ -0,0 +1,99 @@
+"""
+Request coalescing for identical concurrent queries.
+
+When many requests issue the same query at the same moment (for example
+right after an announcement goes out), ``SingleFlight.do`` lets the first
+caller run it while the others wait and share its result, so the database
+sees one query instead of hundreds. Results are not kept once the execution
+finishes; combine with a cache for reuse over time.
+
+Shared results are handed to every waiting caller and must not be mutated.
+"""
+import json
+import threading
+
+from app.utils import metrics
+
+# Every SingleFlight by name, for reporting coalescing ratios
+_groups = {}
+
+def query_key(collection, *parts):
+    """
+    Build a normalized key for a query.
+
+    Args:
+        collection (str): Name of the queried collection
+        *parts: Filter, sort, limit, projection, ... (JSON-serializable, or
+            convertible with str)
+
+    Returns:
+        str: Key that is equal for equal queries regardless of dict order
+    """
+    return json.dumps([collection, *parts], sort_keys=True, default=str)
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """A group of keyed executions that concurrent callers share."""
+
+    def __init__(self, name):
+        """
+        Args:
+            name (str): Name used in the metrics counters
+        """
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+        _groups[name] = self
+
+    def do(self, key, fn):
+        """
+        Run fn for key, or wait for the execution already in flight for key.
+
+        Args:
+            key (hashable): Normalized key of the work (see query_key)
+            fn (callable): Zero-argument function doing the work
+
+        Returns:
+            The result of fn; an exception raised by fn is raised to every
+            caller sharing the execution
+        """
+        metrics.increment(f'singleflight.{self.name}.calls')
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            metrics.increment(f'singleflight.{self.name}.coalesced')
+            call.done.wait()
+        else:
+            metrics.increment(f'singleflight.{self.name}.executions')
+            try:
+                call.result = fn()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def coalescing_ratio(self):
+        """Return the share of calls served by another caller's execution."""
+        calls = metrics.get_counter(f'singleflight.{self.name}.calls')
+        if not calls:
+            return 0.0
+        return metrics.get_counter(f'singleflight.{self.name}.coalesced') / calls
+
+def coalescing_ratios():
+    """Return the coalescing ratio of every group, keyed by name."""
+    return {name: round(group.coalescing_ratio(), 4) for name, group in _groups.items()}
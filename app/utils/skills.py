@@ -0,0 +1,281 @@
+"""
+Skill canonicalisation registry.
+
+Free-text skills ("js", "JavaScript", "javascript ") are mapped to one
+canonical skill with a small integer ID. The registry lives in the ``skills``
+collection ({_id: int, name, key, aliases}) and is mirrored in memory by each
+worker. Student, experience, project and company documents store the IDs next
+to the display names, so matching becomes set intersection on integers and
+can use multikey indexes instead of substring tests.
+"""
+import threading
+import time
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from app import db
+from app.utils.recommender import normalize_skill, requirement_items
+
+# Seconds between reloads, which pick up skills registered by other workers
+REFRESH_INTERVAL = 300
+
+# Canonical skills seeded into the registry with their common aliases
+BUILTIN_SKILLS = {
+    'Python': ['python3', 'py'],
+    'Java': ['core java', 'java se'],
+    'JavaScript': ['js', 'ecmascript', 'es6'],
+    'TypeScript': ['ts'],
+    'Node.js': ['node', 'nodejs', 'node js'],
+    'React': ['reactjs', 'react.js', 'react js'],
+    'Angular': ['angularjs', 'angular.js'],
+    'Vue.js': ['vue', 'vuejs'],
+    'HTML': ['html5'],
+    'CSS': ['css3'],
+    'C': [],
+    'C++': ['cpp', 'c plus plus'],
+    'C#': ['csharp', 'c sharp'],
+    'Go': ['golang'],
+    'SQL': [],
+    'MySQL': [],
+    'PostgreSQL': ['postgres', 'postgre sql'],
+    'MongoDB': ['mongo', 'mongo db'],
+    'Flask': [],
+    'Django': [],
+    'Spring Boot': ['springboot', 'spring-boot'],
+    'Docker': [],
+    'Kubernetes': ['k8s'],
+    'AWS': ['amazon web services'],
+    'Azure': ['microsoft azure'],
+    'DevOps': ['dev ops'],
+    'CI/CD': ['cicd', 'ci cd'],
+    'Jenkins': [],
+    'Git': ['github'],
+    'Machine Learning': ['ml'],
+    'Deep Learning': ['dl'],
+    'Data Structures': ['dsa', 'data structure'],
+    'Algorithms': ['algorithm'],
+    'UI/UX Design': ['ui/ux', 'ui ux', 'ux design', 'ui design'],
+    'Figma': [],
+    'Adobe XD': ['xd'],
+}
+
+class SkillRegistry:
+    """Per-worker mirror of the ``skills`` collection."""
+
+    def __init__(self, refresh_interval=REFRESH_INTERVAL):
+        """
+        Args:
+            refresh_interval (float): Seconds between reloads from MongoDB
+        """
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._ids = {}      # normalized alias -> skill id
+        self._names = {}    # skill id -> canonical name
+        self._loaded_at = None
+
+    def _add(self, skill):
+        """Add a registry document to the in-memory maps. Caller holds the lock."""
+        self._names[skill['_id']] = skill['name']
+        for alias in [skill['key']] + skill.get('aliases', []):
+            self._ids[alias] = skill['_id']
+
+    def load(self):
+        """Load the registry from MongoDB, seeding the built-in skills on first use."""
+        if db.skills.estimated_document_count() == 0:
+            seed_builtin_skills()
+        with self._lock:
+            for skill in db.skills.find():
+                self._add(skill)
+            self._loaded_at = time.monotonic()
+
+    def _ensure_loaded(self):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.refresh_interval:
+            self.load()
+
+    def lookup(self, name):
+        """Return the ID of a known skill, or None."""
+        self._ensure_loaded()
+        return self._ids.get(normalize_skill(name))
+
+    def name(self, skill_id):
+        """Return the canonical name of a skill ID, or None."""
+        self._ensure_loaded()
+        return self._names.get(skill_id)
+
+    def intern(self, name):
+        """
+        Return the ID of a skill, registering it as a new canonical skill if unknown.
+
+        Returns:
+            int: The skill ID, or None if name contains no skill text
+        """
+        key = normalize_skill(name)
+        if not key:
+            return None
+        skill_id = self.lookup(name)
+        if skill_id is not None:
+            return skill_id
+
+        # Another worker may have registered it since this registry was loaded
+        skill = db.skills.find_one({'aliases': key}) or db.skills.find_one({'key': key})
+        if skill is None:
+            skill = _create_skill(name.strip(), key)
+        with self._lock:
+            self._add(skill)
+        return skill['_id']
+
+# One registry per worker process
+skill_registry = SkillRegistry()
+
+def _next_skill_id():
+    """Allocate the next skill ID from the counters collection."""
+    counter = db.counters.find_one_and_update(
+        {'_id': 'skill_id'},
+        {'$inc': {'seq': 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return counter['seq']
+
+def _create_skill(name, key, aliases=()):
+    """Insert a new canonical skill, returning the existing one if another worker won the race."""
+    skill = {'_id': _next_skill_id(), 'name': name, 'key': key, 'aliases': sorted(set(aliases) - {key})}
+    try:
+        db.skills.insert_one(skill)
+        return skill
+    except DuplicateKeyError:
+        return db.skills.find_one({'key': key})
+
+def seed_builtin_skills():
+    """Register the built-in canonical skills and their aliases if missing."""
+    for name, aliases in BUILTIN_SKILLS.items():
+        key = normalize_skill(name)
+        if db.skills.find_one({'key': key}) is None:
+            _create_skill(name, key, [normalize_skill(alias) for alias in aliases])
+
+def canonicalize_skills(names):
+    """
+    Map free-text skill names to canonical names and IDs.
+
+    Unknown skills are registered as new canonical skills.
+
+    Returns:
+        tuple: (canonical names, sorted list of unique IDs)
+    """
+    canonical_names = []
+    skill_ids = []
+    for name in names or []:
+        if not isinstance(name, str):
+            continue
+        skill_id = skill_registry.intern(name)
+        if skill_id is None or skill_id in skill_ids:
+            continue
+        skill_ids.append(skill_id)
+        canonical_names.append(skill_registry.name(skill_id))
+    return canonical_names, sorted(skill_ids)
+
+def resolve_requirements(requirements):
+    """
+    Resolve a posting's requirements to skill IDs and text keys.
+
+    Only known skills and aliases are resolved; requirements are never
+    interned as new skills, so arbitrary posting text cannot grow the
+    registry. A requirement that is not itself a known skill ("Experience
+    with Python and Rust") contributes the known skills mentioned in it, and
+    its other words become text keys. A requirement with no known skill at
+    all keeps the full text keys of ``company_skill_keys``, so it is still
+    matched by text.
+
+    Returns:
+        tuple: (sorted unique skill IDs, sorted unique text keys)
+    """
+    skill_ids = set()
+    text_keys = set()
+    for item in requirement_items(requirements):
+        skill_id = skill_registry.lookup(item)
+        if skill_id is not None:
+            skill_ids.add(skill_id)
+            continue
+        # Look for known one- and two-word skills in the text
+        words = normalize_skill(item).split()
+        resolved = set()
+        for size in (2, 1):
+            for i in range(len(words) - size + 1):
+                if resolved.intersection(range(i, i + size)):
+                    continue
+                skill_id = skill_registry.lookup(' '.join(words[i:i + size]))
+                if skill_id is not None:
+                    skill_ids.add(skill_id)
+                    resolved.update(range(i, i + size))
+        if not resolved and words:
+            text_keys.add(' '.join(words))
+        text_keys.update(word for i, word in enumerate(words) if i not in resolved)
+    return sorted(skill_ids), sorted(text_keys)
+
+def requirement_skill_ids(requirements):
+    """Resolve a posting's requirements to skill IDs (see resolve_requirements)."""
+    return resolve_requirements(requirements)[0]
+
+def resolve_skill_ids(names):
+    """Return the IDs of the known skills among names without registering new ones."""
+    skill_ids = set()
+    for name in names or []:
+        if isinstance(name, str):
+            skill_id = skill_registry.lookup(name)
+            if skill_id is not None:
+                skill_ids.add(skill_id)
+    return sorted(skill_ids)
+
+def _canonical_items(items, field):
+    """Canonicalise the skill list of each experience or project entry."""
+    canonical = []
+    for item in items or []:
+        if isinstance(item, dict) and isinstance(item.get(field), list):
+            names, skill_ids = canonicalize_skills(item[field])
+            item = {**item, field: names, 'skill_ids': skill_ids}
+        canonical.append(item)
+    return canonical
+
+def backfill_skill_ids(batch_size=500):
+    """
+    Canonicalise the skills of every existing student and company.
+
+    Returns:
+        tuple: (students updated, companies updated)
+    """
+    seed_builtin_skills()
+    skill_registry.load()
+
+    operations = []
+    students = 0
+    projection = {'skills.technical': 1, 'experience': 1, 'projects': 1}
+    for student in db.students.find({}, projection):
+        update = {
+            'experience': _canonical_items(student.get('experience'), 'skills_used'),
+            'projects': _canonical_items(student.get('projects'), 'technologies_used')
+        }
+        technical_skills = student.get('skills', {}).get('technical')
+        if isinstance(technical_skills, list):
+            update['skills.technical'], update['skill_ids'] = canonicalize_skills(technical_skills)
+        operations.append(UpdateOne({'_id': student['_id']}, {'$set': update}))
+        if len(operations) >= batch_size:
+            students += db.students.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        students += db.students.bulk_write(operations, ordered=False).modified_count
+
+    operations = []
+    companies = 0
+    for company in db.companies.find({'requirements': {'$exists': True}}, {'requirements': 1}):
+        requirement_ids, requirement_keys = resolve_requirements(company['requirements'])
+        operations.append(UpdateOne(
+            {'_id': company['_id']},
+            {'$set': {'requirement_ids': requirement_ids, 'requirement_keys': requirement_keys}}
+        ))
+        if len(operations) >= batch_size:
+            companies += db.companies.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        companies += db.companies.bulk_write(operations, ordered=False).modified_count
+    return students, companies
@@ -0,0 +1,126 @@
+"""
+Per-student dashboard counters.
+
+The ``student_counters`` collection holds one document per student (keyed by
+registration number) with the numbers shown on the dashboard. Write paths
+keep it current with ``$inc``, so dashboard stats are a single point read
+instead of several ``count_documents`` calls and a full student load.
+Increments never create a document: a partial one would hide the fields it
+lacks from ``get_counters``, which instead computes the whole document on
+first read (from source data that already includes the change).
+``reconcile_counters`` recomputes the documents from the source collections
+to repair any drift.
+"""
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+from app import db
+from app.utils import events
+
+COUNTER_FIELDS = (
+    'unread_messages',
+    'unread_notifications',
+    'upcoming_interviews',
+    'applied',
+    'rejected',
+    'interviews_attended',
+    'interviews_not_attended'
+)
+
+def increment_counters(registration_no, **deltas):
+    """Add the given deltas to a student's existing counters document."""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not registration_no or not deltas:
+        return
+    db.student_counters.update_one(
+        {'_id': registration_no},
+        {'$inc': deltas, '$set': {'updated_at': datetime.utcnow()}}
+    )
+    events.emit(events.COUNTERS_CHANGED, registration_nos=[registration_no])
+
+def increment_counters_many(deltas_by_student):
+    """
+    Apply counter deltas for many students with one unordered bulk write.
+
+    Args:
+        deltas_by_student (dict): registration_no -> {field: delta}
+    """
+    now = datetime.utcnow()
+    changed = [registration_no for registration_no, deltas in deltas_by_student.items() if registration_no and deltas]
+    operations = [
+        UpdateOne({'_id': registration_no}, {'$inc': deltas_by_student[registration_no], '$set': {'updated_at': now}})
+        for registration_no in changed
+    ]
+    if operations:
+        db.student_counters.bulk_write(operations, ordered=False)
+        events.emit(events.COUNTERS_CHANGED, registration_nos=changed)
+
+def compute_counters(registration_no, student=None):
+    """Count a student's dashboard numbers from the source collections."""
+    if student is None:
+        student = db.students.find_one({'registration_no': registration_no}, {'companies': 1}) or {}
+    companies = student.get('companies', {})
+    return {
+        'unread_messages': db.messages.count_documents({'recipient_id': registration_no, 'read': False}),
+        'unread_notifications': db.notifications.count_documents({'recipient_id': registration_no, 'read': False}),
+        'upcoming_interviews': db.interviews.count_documents({'student_id': registration_no, 'status': 'scheduled'}),
+        'applied': len(companies.get('applied', [])),
+        'rejected': len(companies.get('rejected', [])),
+        'interviews_attended': len(companies.get('interviews_attended', [])),
+        'interviews_not_attended': len(companies.get('interviews_not_attended', []))
+    }
+
+def get_counters(registration_no):
+    """
+    Return a student's counters with one point read.
+
+    Students without a counters document (e.g. created before counters
+    existed) get one computed on first use.
+
+    Returns:
+        dict: The counters, or None if the student does not exist
+    """
+    counters = db.student_counters.find_one({'_id': registration_no})
+    if counters is None:
+        student = db.students.find_one({'registration_no': registration_no}, {'companies': 1})
+        if student is None:
+            return None
+        counters = compute_counters(registration_no, student)
+        # $setOnInsert keeps a document another request created meanwhile
+        db.student_counters.update_one(
+            {'_id': registration_no},
+            {'$setOnInsert': {**counters, 'updated_at': datetime.utcnow()}},
+            upsert=True
+        )
+    return {field: max(counters.get(field, 0), 0) for field in COUNTER_FIELDS}
+
+def reconcile_counters(batch_size=500):
+    """
+    Recompute every student's counters from the source collections.
+
+    Returns:
+        tuple: (students checked, counter documents that had drifted)
+    """
+    checked = 0
+    repaired = 0
+    operations = []
+    for student in db.students.find({}, {'registration_no': 1, 'companies': 1}):
+        registration_no = student.get('registration_no')
+        if not registration_no:
+            continue
+        operations.append(UpdateOne(
+            {'_id': registration_no},
+            {'$set': compute_counters(registration_no, student)},
+            upsert=True
+        ))
+        if len(operations) >= batch_size:
+            result = db.student_counters.bulk_write(operations, ordered=False)
+            repaired += result.modified_count + result.upserted_count
+            checked += len(operations)
+            operations = []
+    if operations:
+        result = db.student_counters.bulk_write(operations, ordered=False)
+        repaired += result.modified_count + result.upserted_count
+        checked += len(operations)
+    return checked, repaired
@@ -0,0 +1,120 @@
+"""
+Materialised trending leaderboard.
+
+Each company has an exponentially decayed application score: every new
+application updates it to ``score * e^(-λΔt) + 1``. To keep the ranking
+independent of when it is read, the ``trending_companies`` collection stores
+the score scaled to a fixed epoch in log space:
+
+    log_weight = ln(sum of e^(λ(t_i - EPOCH)) over applications i)
+
+so ``score(now) = e^(log_weight - λ(now - EPOCH))``. Ordering by
+``log_weight`` is the same as ordering by the current score, which makes
+``/trending`` a top-K read on an index. Working in log space means the
+weights never overflow however far ``now`` moves from the epoch.
+"""
+import math
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+from app import db
+from app.utils.cache import TTLCache
+
+# Applications lose half their weight every three days
+HALF_LIFE_SECONDS = 3 * 24 * 60 * 60
+DECAY_RATE = math.log(2) / HALF_LIFE_SECONDS
+
+EPOCH = datetime(2024, 1, 1)
+
+# Per-worker mirror of the top of the leaderboard
+_leaderboard_cache = TTLCache(ttl=30, maxsize=64)
+
+def _log_increment(when):
+    """Log of the epoch-scaled weight of one application made at when."""
+    return DECAY_RATE * (when - EPOCH).total_seconds()
+
+def current_score(log_weight, now=None):
+    """Convert a stored log weight into the decayed score at now."""
+    return math.exp(log_weight - _log_increment(now or datetime.now()))
+
+def _log_add_expression(increment):
+    """Aggregation expression computing ln(e^log_weight + e^increment) without overflow."""
+    high = {'$max': ['$log_weight', increment]}
+    low = {'$min': ['$log_weight', increment]}
+    return {'$cond': [
+        {'$eq': [{'$type': '$log_weight'}, 'missing']},
+        increment,
+        {'$add': [high, {'$ln': {'$add': [1, {'$exp': {'$subtract': [low, high]}}]}}]}
+    ]}
+
+def record_application(company_id, applied_date=None):
+    """
+    Add one application to a company's trending score.
+
+    The update is a single atomic upsert, so concurrent applications to the
+    same company are all counted.
+    """
+    applied_date = applied_date or datetime.now()
+    increment = _log_increment(applied_date)
+    db.trending_companies.update_one(
+        {'company_id': company_id},
+        [{'$set': {
+            'log_weight': _log_add_expression(increment),
+            'application_count': {'$add': [{'$ifNull': ['$application_count', 0]}, 1]},
+            'last_applied': applied_date
+        }}],
+        upsert=True
+    )
+
+def top_trending(limit):
+    """
+    Return the top entries of the leaderboard, best first.
+
+    Results are mirrored in memory for a short time, so bursts of requests
+    share one indexed read.
+
+    Returns:
+        list: Leaderboard documents with company_id, log_weight and application_count
+    """
+    entries = _leaderboard_cache.get(limit)
+    if entries is None:
+        entries = list(db.trending_companies.find({}, {'_id': 0}).sort('log_weight', -1).limit(limit))
+        _leaderboard_cache.set(limit, entries)
+    return entries
+
+def rebuild_trending_scores():
+    """
+    Recompute every company's trending score from the applications collection.
+
+    Returns:
+        int: The number of companies with a score
+    """
+    weights = {}
+    counts = {}
+    for application in db.applications.find({}, {'company_id': 1, 'applied_date': 1}):
+        applied_date = application.get('applied_date')
+        if not isinstance(applied_date, datetime) or not application.get('company_id'):
+            continue
+        company_id = application['company_id']
+        increment = _log_increment(applied_date)
+        if company_id in weights:
+            high, low = max(weights[company_id], increment), min(weights[company_id], increment)
+            weights[company_id] = high + math.log1p(math.exp(low - high))
+        else:
+            weights[company_id] = increment
+        counts[company_id] = counts.get(company_id, 0) + 1
+
+    operations = [
+        UpdateOne(
+            {'company_id': company_id},
+            {'$set': {'log_weight': log_weight, 'application_count': counts[company_id]}},
+            upsert=True
+        )
+        for company_id, log_weight in weights.items()
+    ]
+    if operations:
+        db.trending_companies.bulk_write(operations, ordered=False)
+    db.trending_companies.delete_many({'company_id': {'$nin': list(weights)}})
+    _leaderboard_cache.clear()
+    return len(operations)
@@ -0,0 +1,249 @@
+"""
+Trigram index for typo-tolerant student search.
+
+Each student's searchable text (name, specialization and the local part of the
+email address) is broken into trigrams that are stored in the
+``student_trigrams`` side collection. Every worker keeps an in-memory posting
+list (trigram -> student ids) built from that collection and ranks candidates
+by the fraction of the query's trigrams they contain, so a misspelt name still
+finds the right student without scanning the students collection.
+
+Only the first load blocks searches. Incremental refreshes run once per
+worker however many searches trigger them, and periodic full reloads run on
+the background pool while searches keep using the current lists.
+"""
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+from app import db
+from app.utils.background import submit_background
+from app.utils.singleflight import SingleFlight
+
+# Minimum fraction of query trigrams a student must contain to be returned
+SIMILARITY_THRESHOLD = 0.4
+
+# Maximum number of ranked candidates returned by a search
+MAX_CANDIDATES = 200
+
+# Seconds between incremental refreshes from the side collection
+REFRESH_INTERVAL = 60
+
+# Seconds between full reloads, which drop students removed from the side collection
+RELOAD_INTERVAL = 3600
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+_TRIGRAM_PROJECTION = {'registration_no': 1, 'trigrams': 1, 'updated_at': 1}
+
+def trigrams(text):
+    """
+    Break text into the set of trigrams of its words.
+
+    Words are lower-cased and padded with two leading spaces and one trailing
+    space, so short words and word starts carry extra weight.
+    """
+    grams = set()
+    for word in _WORD.findall((text or '').lower()):
+        padded = f'  {word} '
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+def student_search_text(student):
+    """Return the text of a student document that is indexed for fuzzy search."""
+    email = student.get('email_id') or ''
+    return ' '.join([
+        student.get('name') or '',
+        student.get('specialization') or '',
+        email.split('@')[0]
+    ])
+
+class StudentTrigramIndex:
+    """In-memory posting lists over the ``student_trigrams`` collection."""
+
+    def __init__(self, refresh_interval=REFRESH_INTERVAL, reload_interval=RELOAD_INTERVAL):
+        """
+        Args:
+            refresh_interval (float): Seconds between incremental refreshes
+                from the side collection
+            reload_interval (float): Seconds between full reloads
+        """
+        self.refresh_interval = refresh_interval
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._ids = {}            # registration_no -> internal int id
+        self._registration = []   # internal int id -> registration_no
+        self._doc_grams = {}      # internal int id -> frozenset of trigrams
+        self._postings = {}       # trigram -> set of internal int ids
+        self._loaded_until = None
+        self._last_refresh = 0.0
+        self._last_reload = 0.0
+        self._reloading = None    # Future of the background reload in progress
+        self._flight = SingleFlight('trigram_index')
+
+    def _put(self, registration_no, grams):
+        """Insert or replace the trigrams of one student. Caller holds the lock."""
+        doc_id = self._ids.get(registration_no)
+        if doc_id is None:
+            doc_id = len(self._registration)
+            self._ids[registration_no] = doc_id
+            self._registration.append(registration_no)
+        else:
+            for gram in self._doc_grams.get(doc_id, ()):
+                posting = self._postings.get(gram)
+                if posting is not None:
+                    posting.discard(doc_id)
+
+        grams = frozenset(grams)
+        self._doc_grams[doc_id] = grams
+        for gram in grams:
+            self._postings.setdefault(gram, set()).add(doc_id)
+
+    def refresh(self, force=False):
+        """
+        Load trigram documents changed since the last refresh.
+
+        The first call loads the whole side collection, building it from the
+        students collection if it is empty. Every reload_interval the whole
+        collection is reloaded in the background, so students removed from it
+        drop out of the index.
+
+        Returns:
+            Future: The background reload started by this call, if any
+        """
+        if not force and time.monotonic() - self._last_refresh < self.refresh_interval:
+            return None
+        # Concurrent searches share one refresh instead of each running it
+        return self._flight.do('refresh', self._refresh)
+
+    def _refresh(self):
+        now = time.monotonic()
+        self._last_refresh = now
+
+        if self._loaded_until is None:
+            if db.student_trigrams.estimated_document_count() == 0:
+                rebuild_student_trigrams()
+            self._last_reload = now
+            self._reload()
+            return None
+
+        reloading = None
+        if now - self._last_reload >= self.reload_interval and (self._reloading is None or self._reloading.done()):
+            self._last_reload = now
+            reloading = self._reloading = submit_background(self._reload)
+
+        loaded_until = self._loaded_until
+        with self._lock:
+            for doc in db.student_trigrams.find({'updated_at': {'$gte': self._loaded_until}}, _TRIGRAM_PROJECTION):
+                self._put(doc['registration_no'], doc.get('trigrams', []))
+                if doc['updated_at'] > loaded_until:
+                    loaded_until = doc['updated_at']
+            self._loaded_until = max(loaded_until, self._loaded_until)
+        return reloading
+
+    def _reload(self):
+        """Rebuild the posting lists from the whole side collection and swap them in."""
+        fresh = StudentTrigramIndex()
+        loaded_until = None
+        for doc in db.student_trigrams.find({}, _TRIGRAM_PROJECTION):
+            fresh._put(doc['registration_no'], doc.get('trigrams', []))
+            if loaded_until is None or doc['updated_at'] > loaded_until:
+                loaded_until = doc['updated_at']
+        # Searches keep using the old lists until the new ones are complete
+        with self._lock:
+            self._ids = fresh._ids
+            self._registration = fresh._registration
+            self._doc_grams = fresh._doc_grams
+            self._postings = fresh._postings
+            self._loaded_until = loaded_until or datetime.utcnow()
+
+    def add(self, registration_no, grams):
+        """Update a single student in the local index."""
+        with self._lock:
+            self._put(registration_no, grams)
+
+    def search(self, text, limit=MAX_CANDIDATES, threshold=SIMILARITY_THRESHOLD):
+        """
+        Rank students by trigram overlap with text.
+
+        Returns:
+            list: (registration_no, score) pairs, best match first
+        """
+        self.refresh()
+        query_grams = trigrams(text)
+        if not query_grams:
+            return []
+
+        with self._lock:
+            shared = Counter()
+            for gram in query_grams:
+                shared.update(self._postings.get(gram, ()))
+
+            scored = []
+            for doc_id, count in shared.items():
+                score = count / len(query_grams)
+                if score < threshold:
+                    continue
+                # Prefer documents whose text is close in size to the query
+                jaccard = count / (len(query_grams) + len(self._doc_grams[doc_id]) - count)
+                scored.append((score, jaccard, self._registration[doc_id]))
+
+        scored.sort(key=lambda item: (-item[0], -item[1], item[2]))
+        return [(registration_no, round(score, 3)) for score, _, registration_no in scored[:limit]]
+
+# One index per worker process
+student_index = StudentTrigramIndex()
+
+def index_student(student):
+    """
+    Store the trigrams of a student document and update the local index.
+
+    Call this after creating a student or changing an indexed field.
+    """
+    registration_no = student.get('registration_no')
+    if not registration_no:
+        return
+    grams = sorted(trigrams(student_search_text(student)))
+    db.student_trigrams.update_one(
+        {'registration_no': registration_no},
+        {'$set': {'trigrams': grams, 'updated_at': datetime.utcnow()}},
+        upsert=True
+    )
+    student_index.add(registration_no, grams)
+
+def rebuild_student_trigrams(batch_size=1000):
+    """
+    Recompute the trigram documents of every student.
+
+    Documents of students that no longer exist are deleted.
+
+    Returns:
+        int: The number of students indexed
+    """
+    projection = {'registration_no': 1, 'name': 1, 'specialization': 1, 'email_id': 1}
+    now = datetime.utcnow()
+    operations = []
+    indexed = 0
+    for student in db.students.find({}, projection):
+        if not student.get('registration_no'):
+            continue
+        operations.append(UpdateOne(
+            {'registration_no': student['registration_no']},
+            {'$set': {'trigrams': sorted(trigrams(student_search_text(student))), 'updated_at': now}},
+            upsert=True
+        ))
+        if len(operations) >= batch_size:
+            db.student_trigrams.bulk_write(operations, ordered=False)
+            indexed += len(operations)
+            operations = []
+    if operations:
+        db.student_trigrams.bulk_write(operations, ordered=False)
+        indexed += len(operations)
+    # Every remaining student was stamped with now above
+    db.student_trigrams.delete_many({'updated_at': {'$lt': now}})
+    return indexed
@@ -1,3 +1,11 @@
 workers = 4
 bind = "0.0.0.0:10000"
-timeout = 120 
\ No newline at end of file
+timeout = 120
+
+# Threaded workers so idle notification streams (Server-Sent Events) hold a
+# thread rather than a whole worker; STREAM_MAX_CONNECTIONS stays below threads
+# to leave room for ordinary requests. Each request thread may also wait on
+# the fan-out pool (FANOUT_WORKERS); raise it with threads when dashboards
+# queue there
+worker_class = "gthread"
+threads = 50
@@ -0,0 +1,19 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Scripts build the app without the web workers' background threads
+os.environ.setdefault('BACKGROUND_THREADS', 'false')
+
+from app import create_app
+from app.utils.notification_retention import archive_notifications
+
+def main():
+    """Move old unread notifications into the compressed archive (run periodically, e.g. daily)."""
+    app = create_app()
+    
+    with app.app_context():
+        archived = archive_notifications(app.config['NOTIFICATION_ARCHIVE_DAYS'])
+        print(f"Archived {archived} notifications")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,19 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Scripts build the app without the web workers' background threads
+os.environ.setdefault('BACKGROUND_THREADS', 'false')
+
+from app import create_app
+from app.models.application import Application
+
+def main():
+    """Embed company summary snapshots in existing applications."""
+    app = create_app()
+    
+    with app.app_context():
+        updated = Application.backfill_company_snapshots()
+        print(f"Embedded company snapshots in {updated} applications")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,19 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Scripts build the app without the web workers' background threads
+os.environ.setdefault('BACKGROUND_THREADS', 'false')
+
+from app import create_app
+from app.utils.trigram_index import rebuild_student_trigrams
+
+def build_student_trigrams():
+    """Rebuild the trigram side collection used by fuzzy student search."""
+    app = create_app()
+    
+    with app.app_context():
+        indexed = rebuild_student_trigrams()
+        print(f"Indexed trigrams for {indexed} students")
+
+if __name__ == '__main__':
+    build_student_trigrams()
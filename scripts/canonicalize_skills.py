@@ -0,0 +1,19 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Scripts build the app without the web workers' background threads
+os.environ.setdefault('BACKGROUND_THREADS', 'false')
+
+from app import create_app
+from app.utils.skills import backfill_skill_ids
+
+def main():
+    """Seed the skill registry and canonicalise the skills of existing documents."""
+    app = create_app()
+    
+    with app.app_context():
+        students, companies = backfill_skill_ids()
+        print(f"Canonicalised skills of {students} students and {companies} companies")
+
+if __name__ == '__main__':
+    main()
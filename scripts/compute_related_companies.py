@@ -0,0 +1,19 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Scripts build the app without the web workers' background threads
+os.environ.setdefault('BACKGROUND_THREADS', 'false')
+
+from app import create_app
+from app.utils.coapplication import compute_related_companies
+
+def main():
+    """Recompute the co-application related companies table from all applications."""
+    app = create_app()
+    
+    with app.app_context():
+        written = compute_related_companies()
+        print(f"Stored related companies for {written} companies")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,19 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Scripts build the app without the web workers' background threads
+os.environ.setdefault('BACKGROUND_THREADS', 'false')
+
+from app import create_app
+from app.utils.similarity import compute_similar_companies
+
+def main():
+    """Recompute the similar companies table for all active postings."""
+    app = create_app()
+    
+    with app.app_context():
+        written = compute_similar_companies()
+        print(f"Stored similar companies for {written} postings")
+
+if __name__ == '__main__':
+    main()
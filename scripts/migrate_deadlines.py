@@ -0,0 +1,19 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Scripts build the app without the web workers' background threads
+os.environ.setdefault('BACKGROUND_THREADS', 'false')
+
+from app import create_app
+from app.utils.deadlines import normalize_deadlines
+
+def main():
+    """Convert posting deadlines to BSON dates and deactivate expired postings."""
+    app = create_app()
+    
+    with app.app_context():
+        converted, deactivated = normalize_deadlines()
+        print(f"Converted {converted} deadlines to dates and deactivated {deactivated} expired postings")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,19 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Scripts build the app without the web workers' background threads
+os.environ.setdefault('BACKGROUND_THREADS', 'false')
+
+from app import create_app
+from app.utils.notification_retention import normalize_notification_timestamps
+
+def main():
+    """Convert float epoch notification timestamps to BSON dates so the TTL index applies."""
+    app = create_app()
+    
+    with app.app_context():
+        converted = normalize_notification_timestamps()
+        print(f"Converted {converted} notification timestamps to dates")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+import os
+import sys
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Scripts build the app without the web workers' background threads
+os.environ.setdefault('BACKGROUND_THREADS', 'false')
+
+from bson.objectid import ObjectId
+from pymongo import ReplaceOne
+
+from app import create_app, db
+from app.utils.recommender import COMPANY_FIELDS, init_batch_worker, rank_students_batch
+from app.utils.skills import resolve_requirements, resolve_skill_ids
+from app.utils.catalogue import catalogue_version
+
+# Students scored per task sent to a worker process
+SHARD_SIZE = 500
+
+def load_students():
+    """Load the skills and interests of every student."""
+    students = []
+    projection = {'registration_no': 1, 'skills.technical': 1, 'skill_ids': 1, 'interests': 1}
+    for student in db.students.find({}, projection):
+        if not student.get('registration_no'):
+            continue
+        technical_skills = student.get('skills', {}).get('technical', [])
+        students.append((
+            student['registration_no'],
+            technical_skills,
+            student.get('interests', []),
+            student.get('skill_ids') or resolve_skill_ids(technical_skills)
+        ))
+    return students
+
+def precompute_recommendations(workers=None, top_n=100):
+    """
+    Score every student against every active company on a process pool and
+    store the top-N companies per student in the student_recommendations collection.
+    """
+    version = datetime.utcnow().strftime('%Y%m%d%H%M%S')
+    # Read before loading companies, so a change during the run marks the lists stale
+    scored_version = catalogue_version()
+    companies = list(db.companies.find({'active': True}, COMPANY_FIELDS).sort('posted_date', -1))
+    # Workers rank without the skill registry, so resolve postings canonicalised before text keys were stored
+    for company in companies:
+        if company.get('requirement_ids') and company.get('requirement_keys') is None:
+            company['requirement_keys'] = resolve_requirements(company.get('requirements'))[1]
+    students = load_students()
+    print(f"Scoring {len(students)} students against {len(companies)} active companies")
+    
+    shards = [students[i:i + SHARD_SIZE] for i in range(0, len(students), SHARD_SIZE)]
+    written = 0
+    # Spawned rather than forked: PyMongo clients are not fork-safe, so each worker
+    # opens its own client when it imports the app instead of inheriting this one
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=init_batch_worker,
+        initargs=(companies,)
+    ) as executor:
+        for results in executor.map(rank_students_batch, shards, [top_n] * len(shards)):
+            operations = [
+                ReplaceOne(
+                    {'registration_no': registration_no},
+                    {
+                        'registration_no': registration_no,
+                        'companies': [
+                            {'company_id': ObjectId(company_id), 'match_percentage': match_percentage}
+                            for company_id, match_percentage in ranked
+                        ],
+                        'version': version,
+                        'catalogue_version': scored_version,
+                        'computed_at': datetime.utcnow()
+                    },
+                    upsert=True
+                )
+                for registration_no, ranked in results
+            ]
+            if operations:
+                db.student_recommendations.bulk_write(operations, ordered=False)
+                written += len(operations)
+    
+    # Remove lists of students that no longer exist
+    db.student_recommendations.delete_many({'version': {'$ne': version}})
+    print(f"Stored recommendations for {written} students (version {version})")
+    return written
+
+def main():
+    parser = argparse.ArgumentParser(description='Precompute company recommendations for all students.')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes (default: CPU count)')
+    parser.add_argument('--top-n', type=int, default=100, help='Number of companies stored per student')
+    args = parser.parse_args()
+    
+    app = create_app()
+    with app.app_context():
+        precompute_recommendations(workers=args.workers, top_n=args.top_n)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,19 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Scripts build the app without the web workers' background threads
+os.environ.setdefault('BACKGROUND_THREADS', 'false')
+
+from app import create_app
+from app.utils.trending import rebuild_trending_scores
+
+def main():
+    """Recompute the trending leaderboard from all applications."""
+    app = create_app()
+    
+    with app.app_context():
+        scored = rebuild_trending_scores()
+        print(f"Rebuilt trending scores for {scored} companies")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,19 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Scripts build the app without the web workers' background threads
+os.environ.setdefault('BACKGROUND_THREADS', 'false')
+
+from app import create_app
+from app.utils.student_counters import reconcile_counters
+
+def main():
+    """Recompute every student's dashboard counters and report drift."""
+    app = create_app()
+    
+    with app.app_context():
+        checked, repaired = reconcile_counters()
+        print(f"Checked counters of {checked} students, repaired {repaired}")
+
+if __name__ == '__main__':
+    main()
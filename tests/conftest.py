@@ -0,0 +1,600 @@
+"""
+Shared test fixtures.
+
+Unit tests run without MongoDB: ``fake_db`` installs an in-memory database in
+place of ``app.db`` in the modules under test. Its collections implement the
+subset of the PyMongo collection API the application uses, so tests can check
+the resulting documents rather than the calls that produced them.
+"""
+import copy
+import os
+import re
+import sys
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+_MISSING = object()
+
+def _get_values(document, path):
+    """Return the values at a dotted path, descending into arrays."""
+    values = [document]
+    for part in path.split('.'):
+        found = []
+        for value in values:
+            if isinstance(value, dict) and part in value:
+                found.append(value[part])
+            elif isinstance(value, list):
+                found.extend(item[part] for item in value if isinstance(item, dict) and part in item)
+        values = found
+    return values
+
+def _candidates(values):
+    """Values a condition is tested against: each value and the items of array values."""
+    for value in values:
+        yield value
+        if isinstance(value, list):
+            yield from value
+
+def _compare(op, value, bound):
+    try:
+        return {'$lt': value < bound, '$lte': value <= bound, '$gt': value > bound, '$gte': value >= bound}[op]
+    except TypeError:
+        return False
+
+def _is_type(value, name):
+    if name == 'number':
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    if name == 'date':
+        return isinstance(value, datetime)
+    if name == 'string':
+        return isinstance(value, str)
+    return False
+
+def _matches_condition(values, condition):
+    if isinstance(condition, re.Pattern):
+        return any(isinstance(v, str) and condition.search(v) for v in _candidates(values))
+    if not (isinstance(condition, dict) and condition and all(key.startswith('$') for key in condition)):
+        return any(v == condition for v in _candidates(values))
+    for op, operand in condition.items():
+        if op == '$eq':
+            result = _matches_condition(values, operand)
+        elif op == '$ne':
+            result = not _matches_condition(values, operand)
+        elif op == '$in':
+            result = any(_matches_condition(values, option) for option in operand) or (None in operand and not values)
+        elif op == '$nin':
+            result = not any(_matches_condition(values, option) for option in operand)
+        elif op in ('$lt', '$lte', '$gt', '$gte'):
+            result = any(_compare(op, v, operand) for v in _candidates(values))
+        elif op == '$exists':
+            result = bool(values) == bool(operand)
+        elif op == '$type':
+            result = any(_is_type(v, operand) for v in values)
+        elif op == '$regex':
+            flags = re.IGNORECASE if 'i' in condition.get('$options', '') else 0
+            pattern = re.compile(operand, flags) if isinstance(operand, str) else operand
+            result = any(isinstance(v, str) and pattern.search(v) for v in _candidates(values))
+        elif op == '$options':
+            continue
+        elif op == '$elemMatch':
+            result = any(isinstance(v, dict) and matches(v, operand) for value in values if isinstance(value, list) for v in value)
+        elif op == '$not':
+            result = not _matches_condition(values, operand)
+        else:
+            raise NotImplementedError(f'Query operator {op} is not supported by the fake')
+        if not result:
+            return False
+    return True
+
+def matches(document, query):
+    """Whether document matches a MongoDB query filter."""
+    for field, condition in (query or {}).items():
+        if field == '$and':
+            if not all(matches(document, sub) for sub in condition):
+                return False
+        elif field == '$or':
+            if not any(matches(document, sub) for sub in condition):
+                return False
+        elif field == '$nor':
+            if any(matches(document, sub) for sub in condition):
+                return False
+        elif not _matches_condition(_get_values(document, field), condition):
+            return False
+    return True
+
+def _set_path(document, path, value):
+    *parents, last = path.split('.')
+    for part in parents:
+        document = document.setdefault(part, {})
+    document[last] = value
+
+def _get_path(document, path, default=None):
+    for part in path.split('.'):
+        if not isinstance(document, dict) or part not in document:
+            return default
+        document = document[part]
+    return document
+
+def _unset_path(document, path):
+    *parents, last = path.split('.')
+    for part in parents:
+        document = document.get(part, {})
+    document.pop(last, None)
+
+def _each(value):
+    return value['$each'] if isinstance(value, dict) and '$each' in value else [value]
+
+def apply_update(document, update, inserting=False):
+    """Apply an update document in place."""
+    if not any(key.startswith('$') for key in update):
+        preserved = document.get('_id')
+        document.clear()
+        document.update(copy.deepcopy(update))
+        if preserved is not None:
+            document.setdefault('_id', preserved)
+        return
+    for op, fields in update.items():
+        for path, value in fields.items():
+            value = copy.deepcopy(value)
+            current = _get_path(document, path, _MISSING)
+            if op == '$set' or (op == '$setOnInsert' and inserting):
+                _set_path(document, path, value)
+            elif op == '$setOnInsert':
+                continue
+            elif op == '$unset':
+                _unset_path(document, path)
+            elif op == '$inc':
+                _set_path(document, path, (0 if current is _MISSING else current) + value)
+            elif op == '$max':
+                _set_path(document, path, value if current is _MISSING else max(current, value))
+            elif op == '$min':
+                _set_path(document, path, value if current is _MISSING else min(current, value))
+            elif op == '$push':
+                items = [] if current is _MISSING else current
+                _set_path(document, path, items + _each(value))
+            elif op == '$addToSet':
+                items = [] if current is _MISSING else list(current)
+                items += [item for item in _each(value) if item not in items]
+                _set_path(document, path, items)
+            elif op == '$pull':
+                if current is not _MISSING:
+                    _set_path(document, path, [
+                        item for item in current
+                        if not (matches(item, value) if isinstance(value, dict) and isinstance(item, dict)
+                                else _matches_condition([item], value))
+                    ])
+            else:
+                raise NotImplementedError(f'Update operator {op} is not supported by the fake')
+
+def sort_documents(documents, sort):
+    """Sort documents by (field, direction) pairs; missing values sort first."""
+    documents = list(documents)
+    for field, direction in reversed(sort):
+        def key(document, field=field):
+            value = _get_path(document, field)
+            return (value is not None, type(value).__name__ if value is not None else '', value if value is not None else 0)
+        documents.sort(key=key, reverse=direction < 0)
+    return documents
+
+class FakeCursor:
+    """A find() cursor over a snapshot of matching documents."""
+
+    def __init__(self, documents, projection=None):
+        self._documents = documents
+        self._projection = projection  # Applied on iteration, so sorts see every field
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key_or_list, direction=None):
+        sort = [(key_or_list, direction or 1)] if isinstance(key_or_list, str) else list(key_or_list)
+        self._documents = sort_documents(self._documents, sort)
+        return self
+
+    def skip(self, count):
+        self._skip = count
+        return self
+
+    def limit(self, count):
+        self._limit = count
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    def max_time_ms(self, max_time_ms):
+        return self
+
+    def hint(self, index):
+        return self
+
+    def __iter__(self):
+        documents = self._documents[self._skip:]
+        if self._limit:
+            documents = documents[:self._limit]
+        return iter([_project(document, self._projection) for document in documents])
+
+def _include_path(projected, document, parts):
+    # Like MongoDB, a path through an array projects the field of every element
+    first, rest = parts[0], parts[1:]
+    if not isinstance(document, dict) or first not in document:
+        return
+    value = document[first]
+    if not rest:
+        projected[first] = copy.deepcopy(value)
+    elif isinstance(value, list):
+        elements = projected.setdefault(first, [{} for _ in value])
+        for element, source in zip(elements, value):
+            _include_path(element, source, rest)
+    else:
+        _include_path(projected.setdefault(first, {}), value, rest)
+
+_EXPRESSION_OPERATORS = {
+    '$eq': lambda left, right: left == right,
+    '$ne': lambda left, right: left != right,
+    '$lt': lambda left, right: left < right,
+    '$lte': lambda left, right: left <= right,
+    '$gt': lambda left, right: left > right,
+    '$gte': lambda left, right: left >= right,
+}
+
+def _evaluate(document, expression):
+    # The aggregation expressions the application uses: literals, field paths and comparisons
+    if isinstance(expression, str) and expression.startswith('$'):
+        return _get_path(document, expression[1:])
+    if isinstance(expression, dict) and len(expression) == 1:
+        (operator, arguments), = expression.items()
+        if operator == '$literal':
+            return arguments
+        if operator in _EXPRESSION_OPERATORS:
+            left, right = (_evaluate(document, argument) for argument in arguments)
+            return _EXPRESSION_OPERATORS[operator](left, right)
+    return expression
+
+def _project(document, projection):
+    if not projection:
+        return copy.deepcopy(document)
+    if isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection}
+    included = [field for field, flag in projection.items() if flag and field != '_id']
+    if included:
+        projected = {} if projection.get('_id', 1) == 0 else {'_id': document.get('_id')}
+        for field in included:
+            _include_path(projected, document, field.split('.'))
+        return projected
+    projected = copy.deepcopy(document)
+    for field, flag in projection.items():
+        if not flag:
+            _unset_path(projected, field)
+    return projected
+
+class _Result:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+class FakeCollection:
+    """In-memory collection supporting the PyMongo calls the application makes."""
+
+    def __init__(self, database=None, name='collection'):
+        self.database = database
+        self.name = name
+        self.full_name = f'test.{name}'
+        self.docs = []
+        self.indexes = {}
+
+    # Indexes
+
+    def create_index(self, keys, **options):
+        if isinstance(keys, str):
+            keys = [(keys, 1)]
+        name = options.get('name') or '_'.join(f'{field}_{direction}' for field, direction in keys)
+        index = {'key': list(keys), **options}
+        if options.get('unique'):
+            seen = set()
+            for document in self.docs:
+                key = self._unique_key(document, index)
+                if key is not None and key in seen:
+                    raise DuplicateKeyError(f'E11000 duplicate key error building index {name}', 11000)
+                seen.add(key)
+        self.indexes[name] = index
+        return name
+
+    def index_information(self):
+        return dict(self.indexes)
+
+    def drop_index(self, name):
+        self.indexes.pop(name, None)
+
+    def _unique_key(self, document, index):
+        partial = index.get('partialFilterExpression')
+        if partial and not matches(document, partial):
+            return None
+        return tuple(repr(_get_path(document, field)) for field, _ in index['key'])
+
+    def _check_unique(self, document, ignore=None):
+        if document.get('_id') is not None:
+            for other in self.docs:
+                if other is not ignore and other.get('_id') == document['_id']:
+                    raise DuplicateKeyError('E11000 duplicate key error index: _id_', 11000)
+        for name, index in self.indexes.items():
+            if not index.get('unique'):
+                continue
+            key = self._unique_key(document, index)
+            if key is None:
+                continue
+            for other in self.docs:
+                if other is not ignore and self._unique_key(other, index) == key:
+                    raise DuplicateKeyError(f'E11000 duplicate key error index: {name}', 11000)
+
+    # Reads
+
+    def find(self, query=None, projection=None, **kwargs):
+        return FakeCursor([document for document in self.docs if matches(document, query)], projection)
+
+    def find_one(self, query=None, projection=None, sort=None, **kwargs):
+        if query is not None and not isinstance(query, dict):
+            query = {'_id': query}
+        cursor = self.find(query, projection)
+        if sort:
+            cursor.sort(sort)
+        return next(iter(cursor), None)
+
+    def count_documents(self, query, **kwargs):
+        return sum(1 for document in self.docs if matches(document, query))
+
+    def estimated_document_count(self, **kwargs):
+        return len(self.docs)
+
+    def distinct(self, field, query=None):
+        values = []
+        for document in self.docs:
+            if matches(document, query):
+                for value in _candidates(_get_values(document, field)):
+                    if not isinstance(value, list) and value not in values:
+                        values.append(value)
+        return values
+
+    # Writes
+
+    def insert_one(self, document, **kwargs):
+        document.setdefault('_id', ObjectId())
+        stored = copy.deepcopy(document)
+        self._check_unique(stored)
+        self.docs.append(stored)
+        return _Result(inserted_id=document['_id'], acknowledged=True)
+
+    def insert_many(self, documents, ordered=True, **kwargs):
+        inserted, errors = [], []
+        for index, document in enumerate(documents):
+            try:
+                inserted.append(self.insert_one(document).inserted_id)
+            except DuplicateKeyError as e:
+                errors.append({'index': index, 'code': 11000, 'errmsg': str(e), 'op': document})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({'writeErrors': errors, 'nInserted': len(inserted)})
+        return _Result(inserted_ids=inserted, acknowledged=True)
+
+    def _upsert_document(self, query, update):
+        document = {}
+        for field, condition in query.items():
+            if not field.startswith('$') and not (isinstance(condition, dict) and any(k.startswith('$') for k in condition)):
+                _set_path(document, field, copy.deepcopy(condition))
+        apply_update(document, update, inserting=True)
+        document.setdefault('_id', ObjectId())
+        self._check_unique(document)
+        self.docs.append(document)
+        return document
+
+    def _update(self, query, update, upsert, many):
+        matched = [document for document in self.docs if matches(document, query)]
+        if not many:
+            matched = matched[:1]
+        if not matched:
+            if upsert:
+                document = self._upsert_document(query, update)
+                return _Result(matched_count=0, modified_count=0, upserted_id=document['_id'])
+            return _Result(matched_count=0, modified_count=0, upserted_id=None)
+        modified = 0
+        for document in matched:
+            before = copy.deepcopy(document)
+            apply_update(document, update)
+            try:
+                self._check_unique(document, ignore=document)
+            except DuplicateKeyError:
+                document.clear()
+                document.update(before)
+                raise
+            modified += document != before
+        return _Result(matched_count=len(matched), modified_count=modified, upserted_id=None)
+
+    def update_one(self, query, update, upsert=False, **kwargs):
+        return self._update(query, update, upsert, many=False)
+
+    def update_many(self, query, update, upsert=False, **kwargs):
+        return self._update(query, update, upsert, many=True)
+
+    def replace_one(self, query, replacement, upsert=False, **kwargs):
+        return self._update(query, replacement, upsert, many=False)
+
+    def find_one_and_update(self, query, update, projection=None, sort=None, upsert=False,
+                            return_document=ReturnDocument.BEFORE, **kwargs):
+        candidates = [document for document in self.docs if matches(document, query)]
+        if sort:
+            candidates = sort_documents(candidates, sort)
+        document = next(iter(candidates), None)
+        if document is None:
+            if not upsert:
+                return None
+            document = self._upsert_document(query, update)
+            return _project(document, projection) if return_document == ReturnDocument.AFTER else None
+        before = _project(document, projection)
+        apply_update(document, update)
+        return _project(document, projection) if return_document == ReturnDocument.AFTER else before
+
+    def find_one_and_delete(self, query, projection=None, sort=None, **kwargs):
+        candidates = [document for document in self.docs if matches(document, query)]
+        if sort:
+            candidates = sort_documents(candidates, sort)
+        document = next(iter(candidates), None)
+        if document is None:
+            return None
+        self.docs.remove(document)
+        return _project(document, projection)
+
+    def delete_one(self, query, **kwargs):
+        for document in self.docs:
+            if matches(document, query):
+                self.docs.remove(document)
+                return _Result(deleted_count=1)
+        return _Result(deleted_count=0)
+
+    def delete_many(self, query, **kwargs):
+        kept = [document for document in self.docs if not matches(document, query)]
+        deleted, self.docs = len(self.docs) - len(kept), kept
+        return _Result(deleted_count=deleted)
+
+    def bulk_write(self, requests, ordered=True, **kwargs):
+        totals = {'inserted_count': 0, 'matched_count': 0, 'modified_count': 0, 'upserted_count': 0, 'deleted_count': 0}
+        errors = []
+        for index, request in enumerate(requests):
+            try:
+                request.apply(self, totals)
+            except DuplicateKeyError as e:
+                errors.append({'index': index, 'code': 11000, 'errmsg': str(e), 'op': request.document})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({'writeErrors': errors, 'nInserted': totals['inserted_count']})
+        return _Result(**totals)
+
+    # Aggregation
+
+    def aggregate(self, pipeline, **kwargs):
+        documents = [copy.deepcopy(document) for document in self.docs]
+        for stage in pipeline:
+            (name, spec), = stage.items()
+            if name == '$match':
+                documents = [document for document in documents if matches(document, spec)]
+            elif name == '$unionWith':
+                documents += list(self.database[spec['coll']].aggregate(spec.get('pipeline', [])))
+            elif name in ('$addFields', '$set'):
+                for document in documents:
+                    for field, expression in spec.items():
+                        _set_path(document, field, _evaluate(document, expression))
+            elif name == '$sort':
+                documents = sort_documents(documents, list(spec.items()))
+            elif name == '$skip':
+                documents = documents[spec:]
+            elif name == '$limit':
+                documents = documents[:spec]
+            else:
+                raise NotImplementedError(f'FakeCollection.aggregate does not support {name}')
+        return iter(documents)
+
+class InsertOne:
+    def __init__(self, document):
+        self.document = document
+
+    def apply(self, collection, totals):
+        collection.insert_one(self.document)
+        totals['inserted_count'] += 1
+
+class UpdateOne:
+    many = False
+
+    def __init__(self, filter, update, upsert=False, **kwargs):
+        self.filter = filter
+        self.document = update
+        self.upsert = upsert
+
+    def apply(self, collection, totals):
+        result = collection._update(self.filter, self.document, self.upsert, many=self.many)
+        totals['matched_count'] += result.matched_count
+        totals['modified_count'] += result.modified_count
+        totals['upserted_count'] += result.upserted_id is not None
+
+class UpdateMany(UpdateOne):
+    many = True
+
+class ReplaceOne(UpdateOne):
+    pass
+
+class DeleteOne:
+    def __init__(self, filter, **kwargs):
+        self.filter = filter
+        self.document = filter
+
+    def apply(self, collection, totals):
+        totals['deleted_count'] += collection.delete_one(self.filter).deleted_count
+
+# Bulk write request classes substituted in modules that use fake_db
+BULK_REQUESTS = {
+    'InsertOne': InsertOne,
+    'UpdateOne': UpdateOne,
+    'UpdateMany': UpdateMany,
+    'ReplaceOne': ReplaceOne,
+    'DeleteOne': DeleteOne,
+}
+
+class FakeDB:
+    """In-memory database; collections are created on first access, like PyMongo's."""
+
+    def __init__(self):
+        self._collections = {}
+        self.commands = []
+        self.name = 'test'
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name):
+        if name not in self._collections:
+            self._collections[name] = FakeCollection(self, name)
+        return self._collections[name]
+
+    def list_collection_names(self):
+        return [name for name, collection in self._collections.items() if collection.docs]
+
+    def command(self, *args, **kwargs):
+        self.commands.append((args, kwargs))
+        return {'ok': 1}
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """
+    Return a function installing one in-memory database as ``db`` in modules.
+
+    PyMongo's bulk request classes used by those modules are swapped for
+    fakes the collections can apply.
+    """
+    database = FakeDB()
+
+    def install(*modules):
+        for module in modules:
+            monkeypatch.setattr(module, 'db', database)
+            for name, fake in BULK_REQUESTS.items():
+                if hasattr(module, name):
+                    monkeypatch.setattr(module, name, fake)
+        return database
+
+    return install
+
+def pytest_collection_modifyitems(config, items):
+    """Skip the end-to-end API tests when MongoDB is not reachable."""
+    api_tests = [item for item in items if item.fspath.basename == 'test_api.py']
+    if not api_tests:
+        return
+    from app import db
+    if db is None:
+        skip = pytest.mark.skip(reason='MongoDB is not reachable')
+        for item in api_tests:
+            item.add_marker(skip)
@@ -142,6 +142,10 @@ def test_full_company_and_application_flow(client, admin_token, student_credenti
     assert rv.status_code == 200
     apps = rv.get_json()['applications']
     assert any(a['_id'] == app_id for a in apps)
+    # Company summaries are attached and the list is paginated
+    own_app = next(a for a in apps if a['_id'] == app_id)
+    assert set(own_app['company']) == {'name', 'logo', 'job_title'}
+    assert rv.get_json()['page'] == 1
 
     # Student checks application status
     rv = client.get(f'/api/company/{cid}/status', headers=headers_student)
@@ -162,6 +166,19 @@ def test_full_company_and_application_flow(client, admin_token, student_credenti
     rv = client.get(f'/api/company/{cid}/status', headers=headers_student)
     assert rv.get_json()['application']['status'] == 'approved'
 
+    # Admin rejects in bulk; unknown ids are reported per item
+    missing_id = '0' * 24
+    rv = client.put('/api/admin/applications/status', json={'updates': [
+        {'application_id': app_id, 'status': 'rejected'},
+        {'application_id': missing_id, 'status': 'rejected'},
+        {'application_id': 'bad', 'status': 'rejected'}
+    ]}, headers=headers_admin)
+    assert rv.status_code == 200
+    results = {r['application_id']: r['result'] for r in rv.get_json()['results']}
+    assert results == {app_id: 'updated', missing_id: 'not_found', 'bad': 'invalid_id'}
+    rv = client.get(f'/api/company/{cid}/status', headers=headers_student)
+    assert rv.get_json()['application']['status'] == 'rejected'
+
 def test_search_endpoints_and_announcements(client, admin_token, student_credentials):
     headers_admin = {'Authorization': f'Bearer {admin_token}'}
     # Admin creates announcement
@@ -194,6 +211,25 @@ def test_search_endpoints_and_announcements(client, admin_token, student_credent
     glob = rv.get_json()
     assert 'companies' in glob and 'announcements' in glob 
 
+def test_faceted_company_search(client, admin_token, student_credentials):
+    headers_admin = {'Authorization': f'Bearer {admin_token}'}
+    rv = client.post('/api/admin/companies', json={'name': 'FacetCo', 'job_title': 'Analyst'}, headers=headers_admin)
+    assert rv.status_code == 201
+
+    headers_student = {'Authorization': f"Bearer {student_credentials['token']}"}
+    rv = client.get('/api/search/companies/faceted', query_string={'q': 'FacetCo'}, headers=headers_student)
+    assert rv.status_code == 200
+    data = rv.get_json()
+    assert any(c['name'] == 'FacetCo' for c in data['companies'])
+    assert data['total'] >= 1
+    for facet in ('job_type', 'work_place', 'location', 'duration', 'stipend'):
+        assert facet in data['facets']
+
+    # The same filter combination is served from the facet cache
+    rv = client.get('/api/search/companies/faceted', query_string={'q': 'FacetCo', 'page': 2}, headers=headers_student)
+    assert rv.status_code == 200
+    assert rv.get_json()['facets_cached'] is True
+
 class TestConfig(Config):
     TESTING = True
     MONGO_URI = "mongodb://localhost:27017/internship_portal_test"
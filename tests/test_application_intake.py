@@ -0,0 +1,116 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime
+
+import pytest
+from bson.objectid import ObjectId
+from pymongo.errors import BulkWriteError
+
+from app.models import indexes
+from app.utils import application_intake, student_counters
+from app.utils.application_intake import (
+    ACCEPTED, CLAIM_TIMEOUT, FAILED, MAX_ATTEMPTS, PROCESSING, QUEUED, REJECTED,
+    _claim_batch, _finish, drain_intake, enqueue_application
+)
+
+
+@pytest.fixture
+def database(fake_db, monkeypatch):
+    database = fake_db(application_intake, indexes, student_counters)
+    indexes.create_application_unique_index()
+    indexes.create_intake_indexes()
+    database.company_id = database.companies.insert_one({'name': 'Acme', 'job_title': 'Intern'}).inserted_id
+    for registration_no in ('S1', 'S2'):
+        database.students.insert_one({'registration_no': registration_no})
+        database.student_counters.insert_one({'_id': registration_no, 'applied': 0})
+    # Trending updates are pipeline updates, which the fake does not evaluate
+    database.trending = []
+    monkeypatch.setattr(application_intake, 'record_application', lambda company_id, applied_date: database.trending.append(company_id))
+    return database
+
+
+def ticket(database, student_id='S1'):
+    return database.application_intake.find_one({'student_id': student_id})
+
+
+def test_drain_accepts_tickets_and_applies_side_effects_once(database):
+    enqueue_application(database.company_id, 'S1', {'coverLetter': 'Hello'})
+    enqueue_application(ObjectId(), 'S2', {})
+
+    assert drain_intake() == 2
+
+    accepted = ticket(database)
+    assert accepted['status'] == ACCEPTED
+    application = database.applications.find_one({'_id': accepted['application_id']})
+    assert application['coverLetter'] == 'Hello' and application['company']['name'] == 'Acme'
+    assert database.students.find_one({'registration_no': 'S1'})['companies']['applied'] == [database.company_id]
+    assert database.student_counters.find_one({'_id': 'S1'})['applied'] == 1
+    assert database.trending == [database.company_id]
+    assert ticket(database, 'S2')['status'] == REJECTED
+    assert drain_intake() == 0
+
+
+def test_existing_application_rejects_the_ticket_as_a_duplicate(database):
+    database.applications.insert_one({'company_id': database.company_id, 'student_id': 'S1'})
+    enqueue_application(database.company_id, 'S1', {})
+
+    drain_intake()
+
+    assert ticket(database)['status'] == REJECTED
+    assert ticket(database)['reason'] == 'Already applied to this company'
+    assert database.student_counters.find_one({'_id': 'S1'})['applied'] == 0
+
+
+def test_other_write_errors_are_retried_then_fail_with_the_real_reason(database, monkeypatch):
+    def insert_many(documents, ordered=True):
+        raise BulkWriteError({'writeErrors': [
+            {'index': index, 'code': 121, 'errmsg': 'Document failed validation'} for index in range(len(documents))
+        ]})
+    monkeypatch.setattr(database.applications, 'insert_many', insert_many)
+    enqueue_application(database.company_id, 'S1', {})
+
+    drain_intake()
+    assert ticket(database)['status'] == QUEUED
+    assert ticket(database)['last_error'] == 'Document failed validation'
+
+    for _ in range(MAX_ATTEMPTS - 1):
+        drain_intake()
+    assert ticket(database)['status'] == FAILED
+    assert ticket(database)['reason'] == 'Document failed validation'
+    assert database.student_counters.find_one({'_id': 'S1'})['applied'] == 0
+
+
+def test_reclaimed_ticket_is_counted_once(database):
+    enqueue_application(database.company_id, 'S1', {})
+    # A slow drainer claims the ticket and inserts its application, then stalls
+    stalled = _claim_batch(10, 'slow')[0]
+    database.applications.insert_one({
+        'company_id': database.company_id, 'student_id': 'S1', 'applied_date': stalled['created_at'],
+        'intake_ticket': stalled['_id']
+    })
+    database.application_intake.update_one(
+        {'_id': stalled['_id']}, {'$set': {'claimed_at': datetime.now() - 2 * CLAIM_TIMEOUT}}
+    )
+
+    # Another drainer re-claims it and finds the stalled drainer's application
+    drain_intake()
+    assert ticket(database)['status'] == ACCEPTED
+    assert database.applications.count_documents({'student_id': 'S1'}) == 1
+
+    # The stalled drainer's late outcome no longer applies
+    assert _finish({stalled['_id']: {'status': ACCEPTED}}, 'slow') == set()
+    assert ticket(database)['claimed_by'] != 'slow'
+    assert database.student_counters.find_one({'_id': 'S1'})['applied'] == 1
+    assert database.trending == [database.company_id]
+
+
+def test_finish_only_updates_tickets_still_claimed_by_this_drainer(database):
+    enqueue_application(database.company_id, 'S1', {})
+    claimed = _claim_batch(10, 'mine')[0]
+
+    assert _finish({claimed['_id']: {'status': REJECTED, 'reason': 'Company not found'}}, 'other') == set()
+    assert ticket(database)['status'] == PROCESSING
+    assert _finish({claimed['_id']: {'status': REJECTED, 'reason': 'Company not found'}}, 'mine') == {claimed['_id']}
+    assert ticket(database)['status'] == REJECTED
@@ -0,0 +1,86 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime
+
+import pytest
+from bson.objectid import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+from app.models import application as application_model, indexes
+from app.models.application import Application, ALREADY_APPLIED, COMPANY_NOT_FOUND, STUDENT_NOT_FOUND
+from app.models.indexes import create_application_unique_index
+from app.utils import student_counters
+
+
+@pytest.fixture
+def database(fake_db):
+    database = fake_db(application_model, indexes, student_counters)
+    create_application_unique_index()
+    database.company_id = database.companies.insert_one({'name': 'Acme', 'job_title': 'Intern'}).inserted_id
+    database.students.insert_one({'registration_no': 'S1'})
+    database.student_counters.insert_one({'_id': 'S1', 'applied': 0})
+    return database
+
+
+def test_submit_embeds_the_summary_and_counts_the_application(database):
+    submitted, application = Application.submit(database.company_id, 'S1', {'coverLetter': 'Hello'})
+
+    assert submitted
+    stored = database.applications.find_one({'student_id': 'S1'})
+    assert stored['company'] == {'name': 'Acme', 'logo': '', 'job_title': 'Intern'}
+    assert stored['coverLetter'] == 'Hello' and stored['status'] == 'pending'
+    assert database.students.find_one({'registration_no': 'S1'})['companies']['applied'] == [database.company_id]
+    assert database.student_counters.find_one({'_id': 'S1'})['applied'] == 1
+
+
+def test_duplicate_submission_is_rejected_by_the_unique_index(database):
+    Application.submit(database.company_id, 'S1', {})
+
+    assert Application.submit(database.company_id, 'S1', {}) == (False, ALREADY_APPLIED)
+    assert database.applications.count_documents({'student_id': 'S1'}) == 1
+    assert database.student_counters.find_one({'_id': 'S1'})['applied'] == 1
+
+
+def test_rejected_submissions_leave_no_application(database):
+    assert Application.submit(ObjectId(), 'S1', {}) == (False, COMPANY_NOT_FOUND)
+    assert Application.submit(database.company_id, 'missing', {}) == (False, STUDENT_NOT_FOUND)
+    assert database.applications.count_documents({}) == 0
+
+
+def test_unique_index_build_removes_all_but_the_earliest_duplicate(fake_db):
+    database = fake_db(application_model, indexes)
+    company_id = ObjectId()
+    for day in (3, 1, 2):
+        database.applications.insert_one({'company_id': company_id, 'student_id': 'S1', 'applied_date': datetime(2024, 1, day)})
+    database.applications.insert_one({'company_id': company_id, 'student_id': 'S2', 'applied_date': datetime(2024, 1, 5)})
+
+    create_application_unique_index()
+
+    assert sorted((application['student_id'], application['applied_date'].day) for application in database.applications.find()) == [
+        ('S1', 1), ('S2', 5)
+    ]
+    with pytest.raises(DuplicateKeyError):
+        database.applications.insert_one({'company_id': company_id, 'student_id': 'S2'})
+
+
+def test_old_applications_get_the_summary_attached_in_one_query(database):
+    legacy = {'company_id': database.company_id, 'student_id': 'S1'}
+    embedded = {'company_id': database.company_id, 'student_id': 'S2', 'company': {'name': 'Old name'}}
+
+    Application.attach_company_summaries([legacy, embedded])
+
+    assert legacy['company'] == {'name': 'Acme', 'logo': '', 'job_title': 'Intern'}
+    assert embedded['company'] == {'name': 'Old name'}
+
+
+def test_company_changes_reach_every_snapshot_and_backfill_fills_missing_ones(database):
+    Application.submit(database.company_id, 'S1', {})
+    database.companies.update_one({'_id': database.company_id}, {'$set': {'name': 'Acme Labs'}})
+    assert Application.refresh_company_snapshots(database.company_id) == 1
+
+    database.applications.insert_one({'company_id': database.company_id, 'student_id': 'S2'})
+    assert Application.backfill_company_snapshots() == 1
+    assert [application['company']['name'] for application in database.applications.find()] == ['Acme Labs', 'Acme Labs']
+    assert Application.refresh_company_snapshots(ObjectId()) == 0
@@ -0,0 +1,66 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime
+
+import pytest
+
+from app.utils import coapplication
+from app.utils.coapplication import (
+    blend_rankings, build_coapplication_matrix, collaborative_scores, compute_related_companies
+)
+
+
+def test_matrix_counts_shared_applicants_and_normalizes_by_cosine():
+    company_ids, counts, similarity = build_coapplication_matrix([
+        ('s1', 'a'), ('s1', 'b'),
+        ('s2', 'a'), ('s2', 'b'), ('s2', 'b'),  # Duplicate applications count once
+        ('s3', 'a'),
+    ])
+    a, b = company_ids.index('a'), company_ids.index('b')
+
+    assert counts[a, a] == 3 and counts[b, b] == 2 and counts[a, b] == 2
+    # 2 shared applicants / sqrt(3 x 2)
+    assert similarity[a, b] == pytest.approx(2 / 6 ** 0.5)
+
+
+def test_related_companies_need_enough_co_applicants(fake_db):
+    database = fake_db(coapplication)
+    database.related_companies.insert_one({'company_id': 'gone', 'related': [], 'computed_at': datetime(2020, 1, 1)})
+    for student_id, company_id in [
+        ('s1', 'a'), ('s1', 'b'), ('s1', 'c'),
+        ('s2', 'a'), ('s2', 'b'),
+        ('s3', 'c'),
+    ]:
+        database.applications.insert_one({'student_id': student_id, 'company_id': company_id})
+
+    assert compute_related_companies(min_co_applicants=2) == 2
+
+    stored = {entry['company_id']: entry['related'] for entry in database.related_companies.find()}
+    # a and c share only one applicant, and the stale entry is dropped
+    assert set(stored) == {'a', 'b'}
+    assert [(related['company_id'], related['co_applicants']) for related in stored['a']] == [('b', 2)]
+    assert stored['a'][0]['score'] == 1.0
+
+
+def test_collaborative_scores_skip_applied_companies_and_scale_to_best(fake_db):
+    database = fake_db(coapplication)
+    database.related_companies.insert_one({'company_id': 'a', 'related': [
+        {'company_id': 'b', 'score': 0.5}, {'company_id': 'c', 'score': 0.2},
+    ]})
+    database.related_companies.insert_one({'company_id': 'b', 'related': [
+        {'company_id': 'a', 'score': 0.5}, {'company_id': 'c', 'score': 0.3},
+    ]})
+
+    assert collaborative_scores([]) == {}
+    assert collaborative_scores(['a']) == {'b': 1.0, 'c': 0.4}
+    assert collaborative_scores(['a', 'b']) == {'c': 1.0}
+
+
+def test_blend_adds_collaborative_only_companies_and_keeps_ties_in_order():
+    ranked = [('a', 100), ('b', 50), ('c', 50)]
+
+    assert blend_rankings(ranked, {}) is ranked
+    # a: 70, b: 35 + 30, c: 35, d: 15
+    assert blend_rankings(ranked, {'b': 1.0, 'd': 0.5}) == [('a', 70), ('b', 65), ('c', 35), ('d', 15)]
@@ -0,0 +1,69 @@
+import os
+import sys
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils import metrics
+from pymongo.errors import ExecutionTimeout
+
+from app.utils import concurrency
+from app.utils.concurrency import fan_out
+
+
+def test_runs_tasks_concurrently():
+    started = time.monotonic()
+    results, degraded = fan_out({
+        'a': lambda: time.sleep(0.2) or 1,
+        'b': lambda: time.sleep(0.2) or 2
+    })
+
+    assert results == {'a': 1, 'b': 2}
+    assert degraded == []
+    assert time.monotonic() - started < 0.35
+
+
+def test_slow_and_failing_tasks_degrade_to_defaults():
+    metrics.reset()
+
+    def fail():
+        raise RuntimeError('boom')
+
+    results, degraded = fan_out({
+        'fast': lambda: 'ok',
+        'slow': lambda: time.sleep(0.5) or 'late',
+        'broken': fail
+    }, timeouts={'slow': 0.05}, defaults={'slow': []})
+
+    assert results == {'fast': 'ok', 'slow': [], 'broken': None}
+    assert degraded == ['broken', 'slow']
+    assert metrics.get_counter('fanout.timeouts') == 1
+    assert metrics.get_counter('fanout.errors') == 1
+
+
+def test_timeout_starts_when_the_task_runs():
+    concurrency.configure_fan_out(1)
+    try:
+        # The second task waits 0.15s for the only thread, which is not charged to it
+        results, degraded = fan_out({
+            'first': lambda: time.sleep(0.15) or 1,
+            'second': lambda: time.sleep(0.15) or 2
+        }, timeout=0.25)
+    finally:
+        concurrency.configure_fan_out(concurrency.DEFAULT_WORKERS)
+
+    assert results == {'first': 1, 'second': 2}
+    assert degraded == []
+
+
+def test_server_side_timeout_counts_as_timeout():
+    metrics.reset()
+
+    def exceeded():
+        raise ExecutionTimeout('operation exceeded time limit', 50)
+
+    results, degraded = fan_out({'slow': exceeded})
+
+    assert results == {'slow': None}
+    assert degraded == ['slow']
+    assert metrics.get_counter('fanout.timeouts') == 1
+    assert metrics.get_counter('fanout.errors') == 0
@@ -0,0 +1,24 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime, timedelta
+
+from app.utils import catalogue, deadlines
+
+
+def test_deactivate_expired_returns_only_postings_it_deactivated(fake_db):
+    now = datetime(2024, 1, 1, 12, 0)
+    database = fake_db(deadlines, catalogue)
+    database.companies.insert_many([
+        {'_id': 'due', 'active': True, 'deadline': now - timedelta(minutes=1)},
+        {'_id': 'extended', 'active': True, 'deadline': now + timedelta(days=7)},
+        {'_id': 'already_inactive', 'active': False, 'deadline': now - timedelta(days=1)},
+    ])
+
+    deactivated = deadlines.deactivate_expired(['due', 'extended', 'already_inactive'], now)
+
+    assert deactivated == ['due']
+    assert [company['_id'] for company in database.companies.find({'active': True})] == ['extended']
+    assert catalogue.catalogue_version() == 1
+    assert deadlines.expired_postings(['extended', 'already_inactive'], now) == ['already_inactive']
@@ -0,0 +1,107 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime
+
+import pytest
+from flask import Flask, jsonify
+from flask_jwt_extended import create_access_token
+
+from app import app as flask_app
+from app.routes.api.admin import admin_routes
+from app.routes.api.company import company_routes
+from app.utils import catalogue, recommender
+from app.utils.catalogue import catalogue_version
+from app.utils.http_cache import conditional, check_not_modified, make_etag
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+
+    @app.route('/body')
+    @conditional()
+    def body():
+        return jsonify({'value': 1}), 200
+
+    @app.route('/versioned')
+    @conditional()
+    def versioned():
+        not_modified = check_not_modified(make_etag('item', 1), datetime(2024, 1, 1, 12, 0, 0, 5000))
+        if not_modified:
+            return not_modified
+        return jsonify({'value': 1}), 200
+
+    @app.route('/missing')
+    @conditional()
+    def missing():
+        return jsonify({'error': 'Not found'}), 404
+
+    return app.test_client()
+
+
+def test_body_hash_etag_answers_a_matching_if_none_match_with_304(client):
+    response = client.get('/body')
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+
+    revalidated = client.get('/body', headers={'If-None-Match': response.headers['ETag']})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b''
+    assert client.get('/body', headers={'If-None-Match': '"other"'}).status_code == 200
+
+
+def test_versioned_view_tags_without_a_body_and_honours_if_modified_since(client):
+    response = client.get('/versioned')
+    assert response.headers['ETag'] == f'"{make_etag("item", 1)}"'
+    assert response.headers['Last-Modified'] == 'Mon, 01 Jan 2024 12:00:00 GMT'
+
+    assert client.get('/versioned', headers={'If-Modified-Since': 'Mon, 01 Jan 2024 12:00:00 GMT'}).status_code == 304
+    assert client.get('/versioned', headers={'If-Modified-Since': 'Mon, 01 Jan 2024 11:59:59 GMT'}).status_code == 200
+    # If-None-Match takes precedence over If-Modified-Since
+    assert client.get('/versioned', headers={
+        'If-None-Match': '"stale"', 'If-Modified-Since': 'Mon, 01 Jan 2024 12:00:00 GMT'
+    }).status_code == 200
+
+
+def test_errors_are_not_tagged(client):
+    response = client.get('/missing')
+    assert response.status_code == 404
+    assert 'ETag' not in response.headers
+
+
+@pytest.fixture
+def portal(fake_db, monkeypatch):
+    database = fake_db(admin_routes, company_routes, catalogue, recommender)
+    monkeypatch.setattr(admin_routes, 'submit_background', lambda *args, **kwargs: None)
+    database.company_id = database.companies.insert_one({
+        'name': 'Acme', 'job_title': 'Intern', 'requirements': 'Python',
+        'requirement_ids': [], 'requirement_keys': ['python'], 'active': True, 'version': 1
+    }).inserted_id
+    with flask_app.app_context():
+        database.headers = {'Authorization': 'Bearer ' + create_access_token(identity='admin', additional_claims={'is_admin': True})}
+    return database
+
+
+def test_company_etag_changes_only_when_an_update_changes_the_posting(portal, monkeypatch):
+    monkeypatch.setattr(admin_routes, 'resolve_requirements', lambda requirements: ([], ['python']))
+    client = flask_app.test_client()
+    url = f'/api/company/{portal.company_id}'
+    etag = client.get(url, headers=portal.headers).headers['ETag']
+    assert client.get(url, headers={**portal.headers, 'If-None-Match': etag}).status_code == 304
+
+    # Resubmitting the stored values is not a change
+    response = client.put(f'/api/admin/companies/{portal.company_id}', headers=portal.headers,
+                          json={'name': 'Acme', 'requirements': 'Python'})
+    assert response.get_json() == {'message': 'No changes made to company'}
+    assert portal.companies.find_one({'_id': portal.company_id})['version'] == 1
+    assert catalogue_version() == 0
+    assert client.get(url, headers={**portal.headers, 'If-None-Match': etag}).status_code == 304
+
+    response = client.put(f'/api/admin/companies/{portal.company_id}', headers=portal.headers,
+                          json={'name': 'Acme Labs', 'requirements': 'Python'})
+    assert response.get_json() == {'message': 'Company updated successfully'}
+    assert portal.companies.find_one({'_id': portal.company_id})['version'] == 2
+    assert catalogue_version() == 1
+    assert client.get(url, headers={**portal.headers, 'If-None-Match': etag}).status_code == 200
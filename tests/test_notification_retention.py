@@ -0,0 +1,91 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime, timedelta, timezone
+
+from app.utils import notification_retention, student_counters
+
+
+NOW = datetime(2024, 6, 1)
+
+
+def use_db(fake_db, **collections):
+    database = fake_db(notification_retention, student_counters)
+    for name, documents in collections.items():
+        for document in documents:
+            database[name].insert_one(document)
+    # Both students start with their unread notifications counted
+    database.student_counters.insert_one({'_id': 'S1', 'unread_notifications': 5})
+    database.student_counters.insert_one({'_id': 'S2', 'unread_notifications': 5})
+    return database
+
+
+def unread(database, registration_no):
+    return database.student_counters.find_one({'_id': registration_no})['unread_notifications']
+
+
+def notification(number, recipient_id, days_old, read=False):
+    return {
+        '_id': number,
+        'recipient_id': recipient_id,
+        'title': f'Notification {number}',
+        'timestamp': NOW - timedelta(days=days_old),
+        'read': read
+    }
+
+
+def test_archive_moves_old_unread_notifications_and_loads_them_back(fake_db):
+    database = use_db(fake_db, notifications=[
+        notification(1, 'S1', 120),
+        notification(2, 'S1', 100),
+        notification(3, 'S2', 95),
+        notification(4, 'S1', 10),
+        notification(5, 'S2', 200, read=True),
+    ])
+
+    archived = notification_retention.archive_notifications(90, batch_size=2, now=NOW)
+
+    assert archived == 3
+    assert sorted(doc['_id'] for doc in database.notifications.find()) == [4, 5]
+    assert unread(database, 'S1') == 3
+    assert unread(database, 'S2') == 4
+    assert [n['_id'] for n in notification_retention.load_archived_notifications('S1')] == [2, 1]
+    assert [n['_id'] for n in notification_retention.load_archived_notifications('S2')] == [3]
+
+
+def test_archive_keeps_notifications_read_while_archiving(fake_db, monkeypatch):
+    database = use_db(fake_db, notifications=[
+        notification(1, 'S1', 120),
+        notification(2, 'S1', 100),
+    ])
+    insert_many = database.notification_archive.insert_many
+
+    def read_one_while_inserting(documents, **kwargs):
+        result = insert_many(documents, **kwargs)
+        database.notifications.update_one({'_id': 1}, {'$set': {'read': True}})
+        return result
+
+    monkeypatch.setattr(database.notification_archive, 'insert_many', read_one_while_inserting)
+
+    notification_retention.archive_notifications(90, now=NOW)
+
+    assert [doc['_id'] for doc in database.notifications.find()] == [1]
+    assert unread(database, 'S1') == 4
+
+
+def test_normalize_converts_numeric_timestamps_to_dates(fake_db):
+    epoch = NOW.replace(tzinfo=timezone.utc).timestamp()
+    database = use_db(
+        fake_db,
+        notifications=[{'_id': 1, 'timestamp': epoch}, {'_id': 2, 'timestamp': NOW}],
+        broadcast_notifications=[{'_id': 3, 'timestamp': epoch}],
+        notification_watermarks=[{'_id': 'S1', 'read_until': epoch}]
+    )
+
+    converted = notification_retention.normalize_notification_timestamps()
+
+    assert converted == 3
+    assert [doc['timestamp'] for doc in database.notifications.find()] == [NOW, NOW]
+    assert database.broadcast_notifications.find_one({'_id': 3})['timestamp'] == NOW
+    assert database.notification_watermarks.find_one({'_id': 'S1'})['read_until'] == NOW
@@ -0,0 +1,165 @@
+import os
+import queue
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime, timedelta
+
+from bson.objectid import ObjectId
+from flask_jwt_extended import create_access_token
+
+from app import app
+from app.utils import notification_stream
+from app.utils.notification_stream import CollectionPoller, issue_stream_ticket, redeem_stream_ticket
+from app.utils.pubsub import Broker, BROADCAST
+
+
+def test_broker_routes_channel_and_broadcast_messages():
+    broker = Broker()
+    first = broker.subscribe('S1')
+    second = broker.subscribe('S2')
+
+    assert broker.publish('S1', 'direct') == 1
+    assert broker.publish(BROADCAST, 'everyone') == 2
+
+    assert [first.get(timeout=0), first.get(timeout=0)] == ['direct', 'everyone']
+    assert second.get(timeout=0) == 'everyone'
+
+    broker.unsubscribe(first)
+    assert broker.publish('S1', 'gone') == 0
+    assert broker.subscriber_count() == 1
+
+
+def test_full_subscription_overflows_without_blocking_and_drains():
+    broker = Broker()
+    subscription = broker.subscribe('S1', maxsize=2)
+
+    assert [broker.publish('S1', number) for number in range(3)] == [1, 1, 0]
+    assert subscription.overflowed
+
+    subscription.drain()
+    assert not subscription.overflowed
+    assert broker.publish('S1', 'fresh') == 1
+    assert subscription.get(timeout=0) == 'fresh'
+
+
+def open_test_stream(monkeypatch, heartbeat=15, max_seconds=300, maxsize=100):
+    broker = Broker()
+    reads = []
+
+    def current_counts(registration_no):
+        reads.append(registration_no)
+        return {'unread_notifications': len(reads), 'unread_messages': 0}
+
+    monkeypatch.setattr(notification_stream, 'stream_broker', broker)
+    monkeypatch.setattr(notification_stream, 'current_counts', current_counts)
+    subscription = broker.subscribe('S1', maxsize)
+    stream = notification_stream.event_stream('S1', subscription, heartbeat, max_seconds)
+    assert next(stream).startswith('retry:')
+    assert next(stream).startswith('event: counters')
+    return broker, stream, reads
+
+
+def test_idle_stream_sends_heartbeats_and_ends_after_max_seconds(monkeypatch):
+    broker, stream, reads = open_test_stream(monkeypatch, heartbeat=0.02, max_seconds=0.1)
+
+    events = list(stream)
+
+    assert events and all(event == ': heartbeat\n\n' for event in events)
+    assert broker.subscriber_count() == 0
+
+
+def test_queued_counter_signals_cost_one_counts_read(monkeypatch):
+    broker, stream, reads = open_test_stream(monkeypatch)
+    broker.publish('S1', ('counters', None))
+    broker.publish('S1', ('message', {'subject': 'Hello'}))
+    broker.publish('S1', ('counters', None))
+
+    assert next(stream).startswith('event: message')
+    assert next(stream) == 'event: counters\ndata: {"unread_notifications": 2, "unread_messages": 0}\n\n'
+    assert reads == ['S1', 'S1']
+    stream.close()
+
+
+def test_overflowed_stream_resyncs(monkeypatch):
+    broker, stream, reads = open_test_stream(monkeypatch, maxsize=1)
+    broker.publish('S1', ('message', {'subject': 'first'}))
+    broker.publish('S1', ('message', {'subject': 'dropped'}))
+
+    assert next(stream) == 'event: resync\ndata: {}\n\n'
+    assert next(stream).startswith('event: counters')
+    stream.close()
+
+
+def test_broadcast_also_signals_counters(monkeypatch):
+    broker, stream, reads = open_test_stream(monkeypatch)
+
+    notification_stream._publish_broadcast({'_id': 'b1', 'title': 'Drive', 'timestamp': datetime(2024, 1, 1)})
+
+    assert next(stream).startswith('event: notification')
+    assert next(stream).startswith('event: counters')
+    assert len(reads) == 2
+    stream.close()
+
+
+def drain(subscription):
+    messages = []
+    while True:
+        try:
+            messages.append(subscription.get(timeout=0))
+        except queue.Empty:
+            return messages
+
+
+def test_poller_publishes_writes_from_any_worker_once(fake_db, monkeypatch):
+    database = fake_db(notification_stream)
+    broker = Broker()
+    monkeypatch.setattr(notification_stream, 'stream_broker', broker)
+    subscription = broker.subscribe('S1')
+    poller = CollectionPoller()
+
+    database.notifications.insert_one({'recipient_id': 'S1', 'title': 'Shortlisted'})
+    database.messages.insert_one({'recipient_id': 'S1', 'subject': 'Hello'})
+    database.student_counters.insert_one({'_id': 'S1', 'updated_at': datetime.utcnow()})
+    # Written before the poller started, outside its overlap window
+    database.notifications.insert_one({'_id': ObjectId.from_datetime(datetime.utcnow() - timedelta(minutes=5)), 'recipient_id': 'S1'})
+
+    assert poller.poll() == 3
+    assert [kind for kind, _ in drain(subscription)] == ['notification', 'message', 'counters']
+
+    # The overlap re-reads the same writes without publishing them again
+    assert poller.poll() == 0
+    database.student_counters.update_one({'_id': 'S1'}, {'$set': {'updated_at': datetime.utcnow() + timedelta(seconds=1)}})
+    assert poller.poll() == 1
+
+
+def test_poller_skips_reads_without_subscribers(fake_db, monkeypatch):
+    database = fake_db(notification_stream)
+    monkeypatch.setattr(notification_stream, 'stream_broker', Broker())
+    database.notifications.insert_one({'recipient_id': 'S1'})
+
+    assert CollectionPoller().poll() == 0
+
+
+def test_stream_tickets_are_single_use_and_expire(fake_db):
+    database = fake_db(notification_stream)
+    ticket = issue_stream_ticket('S1')
+
+    assert database.stream_tickets.find_one({})['_id'] != ticket
+    assert redeem_stream_ticket(ticket) == 'S1'
+    assert redeem_stream_ticket(ticket) is None
+    assert redeem_stream_ticket(issue_stream_ticket('S1', ttl=-1)) is None
+
+
+def test_stream_rejects_tokens_in_the_query_string(fake_db):
+    fake_db(notification_stream)
+    with app.app_context():
+        token = create_access_token(identity='S1')
+    client = app.test_client()
+
+    assert client.get(f'/api/notifications/stream?jwt={token}').status_code == 401
+    assert client.get('/api/notifications/stream?ticket=unknown').status_code == 401
+
+    response = client.post('/api/notifications/stream/ticket', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 201
+    assert redeem_stream_ticket(response.get_json()['ticket']) == 'S1'
@@ -0,0 +1,86 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime, timedelta
+
+from app.utils import notifications
+from app.utils.pagination import COUNT_NONE
+
+T0 = datetime(2024, 1, 1)
+
+
+def use_db(fake_db, own=(), broadcasts=(), watermark=None):
+    database = fake_db(notifications)
+    for notification in own:
+        database.notifications.insert_one(notification)
+    for notification in broadcasts:
+        database.broadcast_notifications.insert_one(notification)
+    if watermark:
+        database.notification_watermarks.insert_one({'_id': 'S1', 'read_until': watermark})
+    return database
+
+
+def own(number, minutes, read=False):
+    return {'_id': f'n{number}', 'recipient_id': 'S1', 'timestamp': T0 + timedelta(minutes=minutes), 'read': read}
+
+
+def shared(number, minutes):
+    return {'_id': f'b{number}', 'timestamp': T0 + timedelta(minutes=minutes)}
+
+
+def test_own_notifications_and_broadcasts_merge_newest_first(fake_db):
+    use_db(fake_db,
+           own=[own(1, 1), own(2, 4, read=True), {**own(3, 5), 'recipient_id': 'S2'}],
+           broadcasts=[shared(1, 2), shared(2, 6)],
+           watermark=T0 + timedelta(minutes=3))
+
+    page, meta = notifications.list_notifications('S1')
+
+    assert [n['_id'] for n in page] == ['b2', 'n2', 'b1', 'n1']
+    assert [n['read'] for n in page] == [False, True, True, False]
+    assert all(n['recipient_id'] == 'S1' for n in page)
+    assert meta['total'] == 4
+
+
+def test_read_filter_splits_broadcasts_at_the_watermark(fake_db):
+    use_db(fake_db,
+           own=[own(1, 1), own(2, 4, read=True)],
+           broadcasts=[shared(1, 2), shared(2, 6)],
+           watermark=T0 + timedelta(minutes=3))
+
+    unread, unread_meta = notifications.list_notifications('S1', read=False)
+    read, read_meta = notifications.list_notifications('S1', read=True)
+
+    assert [n['_id'] for n in unread] == ['b2', 'n1']
+    assert [n['_id'] for n in read] == ['n2', 'b1']
+    assert unread_meta['total'] == read_meta['total'] == 2
+    assert notifications.count_unread_broadcasts('S1') == 1
+
+
+def test_watermark_only_moves_forward(fake_db):
+    use_db(fake_db)
+
+    assert notifications.get_read_watermark('S1') == notifications.NEVER_READ
+    assert notifications.advance_read_watermark('S1', T0) == (notifications.NEVER_READ, T0)
+
+    later = T0 + timedelta(hours=1)
+    assert notifications.advance_read_watermark('S1', later) == (T0, later)
+    assert notifications.advance_read_watermark('S1', T0) == (later, later)
+    assert notifications.get_read_watermark('S1') == later
+
+
+def test_pagination_totals_count_both_sources(fake_db):
+    use_db(fake_db,
+           own=[own(number, number) for number in range(5)],
+           broadcasts=[shared(number, number * 10 + 5) for number in range(3)])
+
+    first, meta = notifications.list_notifications('S1', page=1, per_page=3)
+    last, last_meta = notifications.list_notifications('S1', page=3, per_page=3)
+    unbounded, none_meta = notifications.list_notifications('S1', page=2, per_page=3, count_mode=COUNT_NONE)
+
+    assert [n['_id'] for n in first] == ['b2', 'b1', 'b0']
+    assert meta['total'] == 8 and meta['pages'] == 3 and meta['has_more']
+    assert [n['_id'] for n in last] == ['n1', 'n0']
+    assert not last_meta['has_more']
+    assert len(unbounded) == 3 and none_meta['has_more'] and 'total' not in none_meta
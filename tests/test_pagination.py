@@ -0,0 +1,64 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils import pagination
+from app.utils.pagination import COUNT_ESTIMATE, COUNT_EXACT, COUNT_NONE, paginate_query
+
+
+def seed(fake_db, count):
+    database = fake_db()
+    for number in range(count):
+        database.companies.insert_one({'_id': number, 'active': number % 2 == 0})
+    return database.companies
+
+
+def test_exact_count_reports_total_and_pages(fake_db):
+    companies = seed(fake_db, 25)
+
+    documents, meta = paginate_query(companies, {'active': True}, 2, 5, COUNT_EXACT, sort=[('_id', 1)])
+
+    assert [document['_id'] for document in documents] == [10, 12, 14, 16, 18]
+    assert meta == {'total': 13, 'page': 2, 'per_page': 5, 'pages': 3, 'count': COUNT_EXACT, 'has_more': True}
+
+
+def test_no_count_reports_has_more_from_one_extra_document(fake_db):
+    companies = seed(fake_db, 10)
+
+    first, first_meta = paginate_query(companies, {}, 1, 5, COUNT_NONE, sort=[('_id', 1)])
+    last, last_meta = paginate_query(companies, {}, 2, 5, COUNT_NONE, sort=[('_id', 1)])
+
+    assert len(first) == 5 and first_meta['has_more']
+    assert [document['_id'] for document in last] == [5, 6, 7, 8, 9]
+    assert not last_meta['has_more']
+    assert 'total' not in first_meta and 'pages' not in first_meta
+
+
+def test_estimate_uses_metadata_for_unfiltered_queries(fake_db):
+    companies = seed(fake_db, 4)
+    companies.count_documents = None
+
+    _, meta = paginate_query(companies, {}, 1, 10, COUNT_ESTIMATE)
+
+    assert meta['total'] == 4 and meta['count'] == COUNT_ESTIMATE
+
+
+def test_estimate_caches_filtered_totals(fake_db, monkeypatch):
+    monkeypatch.setattr(pagination, '_count_cache', pagination.TTLCache(ttl=60, maxsize=16))
+    companies = seed(fake_db, 6)
+
+    assert pagination.count_results(companies, {'active': True}, COUNT_ESTIMATE) == 3
+    companies.insert_one({'_id': 100, 'active': True})
+
+    assert pagination.count_results(companies, {'active': True}, COUNT_ESTIMATE) == 3
+    assert pagination.count_results(companies, {'active': True}, COUNT_EXACT) == 4
+
+
+def test_page_params_are_clamped_and_unknown_count_modes_fall_back():
+    from flask import Flask
+
+    with Flask(__name__).test_request_context('/?page=0&per_page=1000&count=bogus'):
+        assert pagination.get_page_params() == (1, pagination.MAX_PER_PAGE)
+        assert pagination.get_count_mode() == COUNT_EXACT
+    with Flask(__name__).test_request_context('/?count=NONE'):
+        assert pagination.get_count_mode() == COUNT_NONE
@@ -0,0 +1,33 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils import metrics
+from app.utils.recommendation_cache import (
+    profile_fingerprint, get_cached_recommendations, cache_recommendations, invalidate_recommendations
+)
+
+
+def test_cache_hit_requires_same_version_and_profile():
+    metrics.reset()
+    fingerprint = profile_fingerprint(['Python'], ['backend'])
+    cache_recommendations('211300001', 3, fingerprint, ([('a', 100)], 'live'))
+
+    assert get_cached_recommendations('211300001', 3, fingerprint) == ([('a', 100)], 'live')
+    # A newer catalogue or a changed profile misses
+    assert get_cached_recommendations('211300001', 4, fingerprint) is None
+    assert get_cached_recommendations('211300001', 3, profile_fingerprint(['Java'], ['backend'])) is None
+
+    assert metrics.get_counter('recommendations.cache_hits') == 1
+    assert metrics.get_counter('recommendations.cache_misses') == 2
+
+
+def test_fingerprint_ignores_order():
+    assert profile_fingerprint(['a', 'b'], ['x'], [2, 1]) == profile_fingerprint(['b', 'a'], ['x'], [1, 2])
+
+
+def test_invalidate_drops_entry():
+    fingerprint = profile_fingerprint(['Python'], [])
+    cache_recommendations('211300002', 1, fingerprint, ([], 'live'))
+    invalidate_recommendations('211300002')
+    assert get_cached_recommendations('211300002', 1, fingerprint) is None
@@ -0,0 +1,124 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils import catalogue, recommender as recommender_module
+from app.utils.catalogue import bump_catalogue_version
+from app.utils.recommender import CompanyRecommender, company_skill_keys
+
+
+def make_recommender(companies):
+    recommender = CompanyRecommender(refresh_interval=float('inf'))
+    recommender.load_companies(companies)
+    return recommender
+
+
+def test_text_requirements_match_whole_items_and_words():
+    keys = company_skill_keys({'requirements': 'Python, Experience with JavaScript'})
+
+    assert {'python', 'experience with javascript', 'javascript'} <= keys
+    assert 'java' not in keys
+
+
+def test_rank_weights_skills_over_interests_globally():
+    recommender = make_recommender([
+        {'_id': 'newer', 'requirements': 'Python', 'job_title': 'Backend Developer'},
+        {'_id': 'older', 'requirements': 'Python, Docker', 'job_title': 'Data Engineer'},
+        {'_id': 'design', 'requirements': 'Figma', 'job_title': 'Product Designer'},
+        {'_id': 'none', 'requirements': 'Go', 'job_title': 'Systems Engineer'},
+    ])
+
+    ranked = recommender.rank(['Python', 'Docker'], ['product design'])
+
+    # Two skills (2 x 2) and one interest (1): 4 / 5 beats 2 / 5 beats 0
+    assert ranked == [('older', 80), ('newer', 40)]
+
+
+def test_interest_needs_every_word_and_equal_scores_keep_posting_order():
+    recommender = make_recommender([
+        {'_id': 'first', 'job_title': 'Machine Learning Engineer'},
+        {'_id': 'second', 'job_title': 'Learning Platform Engineer', 'job_description': 'machine tooling'},
+        {'_id': 'third', 'job_title': 'Machine Operator'},
+    ])
+
+    assert recommender.rank([], ['machine learning']) == [('first', 100), ('second', 100)]
+
+
+def test_canonical_ids_match_and_inactive_postings_drop_out():
+    recommender = make_recommender([
+        {'_id': 'a', 'requirements': 'Python', 'requirement_ids': [1], 'requirement_keys': [], 'active': True},
+        {'_id': 'b', 'requirements': 'Py', 'requirement_ids': [1], 'requirement_keys': [], 'active': True},
+    ])
+
+    assert [company_id for company_id, _ in recommender.rank(['python3'], [], [1])] == ['a', 'b']
+
+    recommender.upsert_company({'_id': 'a', 'active': False})
+    recommender.remove_companies(['b'])
+    assert recommender.rank(['python3'], [], [1]) == []
+
+
+def test_canonical_postings_still_match_unresolved_requirements_by_text():
+    recommender = make_recommender([
+        {'_id': 'a', 'requirements': 'Python, Rust', 'requirement_ids': [1], 'requirement_keys': ['rust']},
+        {'_id': 'b', 'requirements': 'Rust'},
+    ])
+
+    assert recommender.rank(['Rust'], [], [99]) == [('a', 100), ('b', 100)]
+    # A skill matching by ID is not counted again by its text
+    assert recommender.rank(['Python', 'Rust'], [], [1]) == [('a', 100), ('b', 50)]
+
+
+def test_postings_canonicalised_without_text_keys_resolve_them_on_load(monkeypatch):
+    from app.utils import skills
+
+    class FakeRegistry:
+        def lookup(self, name):
+            return {'python': 1}.get(skills.normalize_skill(name))
+
+    monkeypatch.setattr(skills, 'skill_registry', FakeRegistry())
+
+    assert company_skill_keys({'requirements': 'Python, Rust', 'requirement_ids': [1]}) == {1, 'rust'}
+
+
+def test_index_reloads_when_another_worker_changed_the_catalogue(fake_db):
+    database = fake_db(recommender_module, catalogue)
+    database.companies.insert_one({'_id': 'a', 'requirements': 'Python', 'requirement_keys': ['python'], 'active': True})
+    recommender = CompanyRecommender(refresh_interval=float('inf'))
+
+    assert recommender.rank_at(0, ['Python'], []) == ([('a', 100)], 0)
+
+    # Another worker adds a posting and bumps the version
+    database.companies.insert_one({'_id': 'b', 'requirements': 'Python', 'requirement_keys': ['python'], 'active': True})
+    version = bump_catalogue_version()
+
+    ranked, built_version = recommender.rank_at(version, ['Python'], [])
+    assert built_version == version
+    assert sorted(company_id for company_id, _ in ranked) == ['a', 'b']
+
+
+def test_ranking_is_tagged_with_the_loaded_version_not_the_requested_one(fake_db):
+    fake_db(recommender_module, catalogue)
+    recommender = CompanyRecommender(refresh_interval=float('inf'))
+    # The catalogue moved on again between reading the version and reloading
+    bump_catalogue_version()
+    bump_catalogue_version()
+
+    assert recommender.rank_at(1, ['Python'], []) == ([], 2)
+
+
+def test_local_change_advances_the_version_only_when_nothing_was_missed(fake_db):
+    database = fake_db(recommender_module, catalogue)
+    recommender = CompanyRecommender(refresh_interval=float('inf'))
+    recommender.ensure_loaded(0)
+    company = {'_id': 'a', 'requirements': 'Python', 'requirement_keys': ['python'], 'active': True}
+    database.companies.insert_one(company)
+
+    recommender.upsert_company(company, bump_catalogue_version())
+    assert recommender.rank_at(1, ['Python'], []) == ([('a', 100)], 1)
+
+    # Version 2 came from another worker, so version 3 cannot be applied in place
+    bump_catalogue_version()
+    recommender.upsert_company({**company, 'active': False}, bump_catalogue_version())
+    database.companies.update_one({'_id': 'a'}, {'$set': {'active': False}})
+    ranked, built_version = recommender.rank_at(3, ['Python'], [])
+    assert (ranked, built_version) == ([], 3)
@@ -0,0 +1,46 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import re
+
+from app.utils.search_query import compile_search_query, tokenize_search_query, MAX_TERMS
+
+
+def test_tokenize_drops_short_and_punctuation_terms():
+    terms, truncated = tokenize_search_query('a .* (( python  Python react')
+    assert terms == ['python', 'react']
+    assert truncated is False
+
+
+def test_tokenize_caps_terms_and_length():
+    terms, truncated = tokenize_search_query(' '.join(f'term{i}' for i in range(20)))
+    assert len(terms) == MAX_TERMS
+    assert truncated is True
+
+    terms, truncated = tokenize_search_query('x' * 500)
+    assert len(terms[0]) == 100
+    assert truncated is True
+
+
+def test_compile_escapes_regex_metacharacters():
+    success, compiled = compile_search_query('(a+)+$', fields=['name'])
+    assert success
+    pattern = compiled['filter']['$or'][0]['name']['$regex']
+    assert pattern == re.escape('(a+)+$')
+
+
+def test_compile_anchors_prefix_fields_and_ands_terms():
+    success, compiled = compile_search_query(
+        'john 2113', fields=['name'], prefix_fields=['registration_no'], base_filter={'active': True}
+    )
+    assert success
+    search_filter = compiled['filter']
+    assert search_filter['active'] is True
+    assert len(search_filter['$and']) == 2
+    assert search_filter['$and'][1]['$or'][0] == {'registration_no': {'$regex': '^2113'}}
+
+
+def test_compile_rejects_empty_queries():
+    assert compile_search_query('', fields=['name'])[0] is False
+    assert compile_search_query(' * . ', fields=['name'])[0] is False
@@ -0,0 +1,77 @@
+import os
+import sys
+import threading
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime, timedelta
+
+import pytest
+from pymongo.errors import ServerSelectionTimeoutError
+
+from app.utils import metrics, shared_cache
+from app.utils.shared_cache import SharedCache
+
+
+@pytest.fixture
+def database(fake_db, monkeypatch):
+    monkeypatch.setattr(shared_cache, 'WAIT_INTERVAL', 0.01)
+    metrics.reset()
+    return fake_db(shared_cache)
+
+
+def hold_lease(database, key):
+    database.cache.insert_one({'_id': f'lease:{key}', 'expires_at': datetime.utcnow() + timedelta(seconds=10)})
+
+
+def test_miss_computes_once_and_stores_utc_expiry(database):
+    value = SharedCache('test', ttl=60).get_or_compute('count', lambda: 42)
+
+    assert value == 42
+    assert database.cache.find_one({'_id': 'lease:count'}) is None
+    expires_in = (database.cache.find_one({'_id': 'count'})['expires_at'] - datetime.utcnow()).total_seconds()
+    assert 55 < expires_in <= 60
+
+
+def test_waits_for_the_lease_holder_instead_of_computing(database):
+    hold_lease(database, 'count')
+
+    def other_worker_finishes():
+        time.sleep(0.05)
+        database.cache.insert_one({'_id': 'count', 'value': 7, 'expires_at': datetime.utcnow() + timedelta(seconds=60)})
+
+    threading.Thread(target=other_worker_finishes).start()
+    value = SharedCache('test', ttl=60).get_or_compute('count', lambda: 42)
+
+    assert value == 7
+    assert metrics.get_counter('shared_cache.shared_hits') == 1
+    assert metrics.get_counter('shared_cache.misses') == 0
+
+
+def test_computes_locally_when_the_lease_holder_never_finishes(database):
+    hold_lease(database, 'count')
+
+    value = SharedCache('test', ttl=60, wait=0.05).get_or_compute('count', lambda: 42)
+
+    assert value == 42
+    assert metrics.get_counter('shared_cache.lease_timeouts') == 1
+    assert database.cache.find_one({'_id': 'count'}) is None
+
+
+def test_waiters_give_up_within_the_fan_out_timeout():
+    assert shared_cache.LEASE_WAIT_SECONDS < shared_cache.FAN_OUT_TIMEOUT
+    assert SharedCache('test').wait == shared_cache.LEASE_WAIT_SECONDS
+
+
+def test_computes_locally_when_the_shared_tier_is_unavailable(database, monkeypatch):
+    def unavailable(*args, **kwargs):
+        raise ServerSelectionTimeoutError('no servers')
+    monkeypatch.setattr(database.cache, 'find_one', unavailable)
+    cache = SharedCache('test', ttl=60)
+
+    assert cache.get_or_compute('count', lambda: 42) == 42
+    assert metrics.get_counter('shared_cache.errors') == 1
+
+    # The local copy is served without going back to the shared tier
+    assert cache.get_or_compute('count', lambda: 0) == 42
+    assert metrics.get_counter('shared_cache.local_hits') == 1
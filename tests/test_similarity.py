@@ -0,0 +1,23 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils import similarity
+
+
+def test_changed_posting_enters_lists_it_now_beats(fake_db):
+    companies = [
+        {'_id': 'a', 'job_title': 'Python Backend Developer', 'requirements': 'Python, Django'},
+        {'_id': 'b', 'job_title': 'Python Developer', 'requirements': 'Python, Flask'},
+        {'_id': 'c', 'job_title': 'Graphic Designer', 'requirements': 'Photoshop'},
+        {'_id': 'd', 'job_title': 'Python Data Engineer', 'requirements': 'Python, Spark'},
+    ]
+    matrix = similarity.build_tfidf_matrix(companies)
+    database = fake_db(similarity)
+    # b's list is full of weak neighbours, d's list is full of strong ones
+    database.similar_companies.insert_one({'company_id': 'b', 'neighbours': [{'similarity': 0.01}]})
+    database.similar_companies.insert_one({'company_id': 'd', 'neighbours': [{'similarity': 0.99}]})
+
+    entering = similarity._entering_lists(companies, matrix, 0, k=1)
+
+    assert entering == {'b'}
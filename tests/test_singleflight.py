@@ -0,0 +1,72 @@
+import os
+import sys
+import threading
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime, timedelta
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app import app
+from app.routes.api.student import announcement_routes
+from app.utils import metrics
+from app.utils.singleflight import SingleFlight, query_key
+
+
+def test_concurrent_callers_share_one_execution():
+    metrics.reset()
+    flight = SingleFlight('test_share')
+    executions = []
+
+    def query():
+        executions.append(1)
+        time.sleep(0.2)
+        return ['result']
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(flight.do('key', query)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [['result']] * 5
+    assert len(executions) == 1
+    assert flight.coalescing_ratio() == pytest.approx(0.8)
+
+
+def test_errors_reach_every_caller_and_next_call_runs_again():
+    flight = SingleFlight('test_errors')
+
+    def fail():
+        raise RuntimeError('boom')
+
+    with pytest.raises(RuntimeError):
+        flight.do('key', fail)
+    assert flight.do('key', lambda: 'ok') == 'ok'
+
+
+def test_query_key_ignores_dict_order():
+    assert query_key('announcements', {'a': 1, 'b': 2}, 5) == query_key('announcements', {'b': 2, 'a': 1}, 5)
+    assert query_key('announcements', {'a': 1}, 5) != query_key('announcements', {'a': 1}, 10)
+
+
+def test_recent_announcements_compare_datetimes_and_coalesce(fake_db):
+    database = fake_db(announcement_routes)
+    now = datetime.utcnow()
+    database.announcements.insert_one({'title': 'New', 'date': now - timedelta(days=2)})
+    database.announcements.insert_one({'title': 'Old', 'date': now - timedelta(days=40)})
+    with app.app_context():
+        headers = {'Authorization': 'Bearer ' + create_access_token(identity='S1')}
+    client = app.test_client()
+
+    response = client.get('/api/student/announcements/recent', headers=headers)
+    assert [announcement['title'] for announcement in response.get_json()['announcements']] == ['New']
+
+    response = client.get('/api/student/announcements/recent?days=60', headers=headers)
+    assert [announcement['title'] for announcement in response.get_json()['announcements']] == ['New', 'Old']
@@ -0,0 +1,34 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils import skills
+
+
+class FakeRegistry:
+    known = {'python': 1, 'docker': 2, 'machine learning': 3}
+
+    def lookup(self, name):
+        return self.known.get(skills.normalize_skill(name))
+
+    def intern(self, name):
+        raise AssertionError('requirements must not create skills')
+
+
+def test_requirements_resolve_only_known_skills(monkeypatch):
+    monkeypatch.setattr(skills, 'skill_registry', FakeRegistry())
+
+    skill_ids = skills.requirement_skill_ids(
+        'Python, Team player, Experience with Docker and machine learning'
+    )
+
+    assert skill_ids == [1, 2, 3]
+
+
+def test_unresolved_requirements_keep_their_text_keys(monkeypatch):
+    monkeypatch.setattr(skills, 'skill_registry', FakeRegistry())
+
+    skill_ids, text_keys = skills.resolve_requirements('Python, Rust, Experience with Docker')
+
+    assert skill_ids == [1, 2]
+    assert text_keys == ['experience', 'rust', 'with']
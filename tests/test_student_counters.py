@@ -0,0 +1,29 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils import student_counters
+
+
+def test_increment_before_first_read_does_not_hide_other_counters(fake_db):
+    database = fake_db(student_counters)
+    database.students.insert_one({'registration_no': 'S1', 'companies': {'applied': ['a', 'b', 'c']}})
+    database.messages.insert_many([{'recipient_id': 'S1', 'read': False} for _ in range(2)])
+    database.notifications.insert_many([{'recipient_id': 'S1', 'read': False} for _ in range(4)])
+    database.notifications.insert_one({'recipient_id': 'S1', 'read': True})
+    database.interviews.insert_one({'student_id': 'S1', 'status': 'scheduled'})
+
+    student_counters.increment_counters('S1', applied=1)
+    student_counters.increment_counters_many({'S1': {'unread_notifications': 1}})
+    assert database.student_counters.count_documents({}) == 0
+
+    result = student_counters.get_counters('S1')
+
+    assert result['applied'] == 3
+    assert result['unread_messages'] == 2
+    assert result['unread_notifications'] == 4
+    assert result['upcoming_interviews'] == 1
+
+    student_counters.increment_counters('S1', unread_messages=1)
+    assert student_counters.get_counters('S1')['unread_messages'] == 3
+    assert database.student_counters.find_one({'_id': 'S1'})['unread_messages'] == 3
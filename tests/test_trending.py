@@ -0,0 +1,70 @@
+import math
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime, timedelta
+
+from app.utils import trending
+
+NOW = datetime(2026, 3, 1)
+
+MISSING = object()
+
+
+def evaluate(expression, document):
+    """Evaluate the aggregation expressions used by record_application."""
+    if isinstance(expression, str) and expression.startswith('$'):
+        return document.get(expression[1:], MISSING)
+    if not isinstance(expression, dict):
+        return expression
+    (op, args), = expression.items()
+    if op == '$type':
+        return 'missing' if evaluate(args, document) is MISSING else 'double'
+    if op == '$cond':
+        return evaluate(args[1] if evaluate(args[0], document) else args[2], document)
+    values = [evaluate(arg, document) for arg in (args if isinstance(args, list) else [args])]
+    return {
+        '$eq': lambda: values[0] == values[1],
+        '$max': lambda: max(values),
+        '$min': lambda: min(values),
+        '$add': lambda: sum(values),
+        '$subtract': lambda: values[0] - values[1],
+        '$exp': lambda: math.exp(values[0]),
+        '$ln': lambda: math.log(values[0]),
+        '$ifNull': lambda: values[1] if values[0] is MISSING or values[0] is None else values[0],
+    }[op]()
+
+
+def test_score_halves_every_half_life():
+    log_weight = trending._log_increment(NOW)
+
+    assert math.isclose(trending.current_score(log_weight, NOW), 1.0)
+    later = NOW + timedelta(seconds=trending.HALF_LIFE_SECONDS)
+    assert math.isclose(trending.current_score(log_weight, later), 0.5)
+
+
+def test_log_add_expression_accumulates_decayed_applications():
+    document = {}
+    applied = [NOW - timedelta(days=6), NOW - timedelta(days=3), NOW]
+    for applied_date in applied:
+        document['log_weight'] = evaluate(trending._log_add_expression(trending._log_increment(applied_date)), document)
+
+    assert math.isclose(trending.current_score(document['log_weight'], NOW), 0.25 + 0.5 + 1.0)
+
+
+def test_rebuild_ranks_recent_activity_first_and_drops_stale_entries(fake_db):
+    database = fake_db(trending)
+    trending._leaderboard_cache.clear()
+    database.trending_companies.insert_one({'company_id': 'gone', 'log_weight': 1e9, 'application_count': 1})
+    for days_ago in (30, 30, 30):
+        database.applications.insert_one({'company_id': 'old', 'applied_date': NOW - timedelta(days=days_ago)})
+    database.applications.insert_one({'company_id': 'recent', 'applied_date': NOW})
+    database.applications.insert_one({'company_id': 'undated', 'applied_date': '2026-03-01'})
+
+    assert trending.rebuild_trending_scores() == 2
+
+    top = trending.top_trending(10)
+    assert [entry['company_id'] for entry in top] == ['recent', 'old']
+    assert top[1]['application_count'] == 3
+    assert math.isclose(trending.current_score(top[1]['log_weight'], NOW), 3 * 0.5 ** 10)
@@ -0,0 +1,119 @@
+import os
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils.trigram_index import StudentTrigramIndex, trigrams
+
+
+def make_index(students):
+    # An infinite refresh interval keeps the index purely in memory
+    index = StudentTrigramIndex(refresh_interval=float('inf'))
+    for registration_no, text in students.items():
+        index.add(registration_no, trigrams(text))
+    return index
+
+
+def test_trigrams_pad_and_lowercase_words():
+    assert trigrams('Ab') == {'  a', ' ab', 'ab '}
+    assert trigrams('') == set()
+
+
+def test_search_tolerates_typos():
+    index = make_index({
+        '211300001': 'Jonathan Smith Computer Science',
+        '211300002': 'Priya Sharma Electrical',
+        '211300003': 'John Smyth Mechanical',
+    })
+    results = index.search('jonathon smith')
+    assert results[0][0] == '211300001'
+    assert '211300002' not in [registration_no for registration_no, _ in results]
+
+
+def test_reindexing_replaces_old_trigrams():
+    index = make_index({'211300001': 'Alice Brown'})
+    index.add('211300001', trigrams('Carol White'))
+    assert index.search('alice brown') == []
+    assert index.search('carol white')[0][0] == '211300001'
+
+
+def seed_trigrams(fake_db, students):
+    from datetime import datetime
+    from app.utils import trigram_index
+
+    database = fake_db(trigram_index)
+    for registration_no, text in students.items():
+        database.student_trigrams.insert_one({
+            'registration_no': registration_no,
+            'trigrams': sorted(trigrams(text)),
+            'updated_at': datetime(2026, 1, 1)
+        })
+    return database
+
+
+def test_reload_drops_deleted_students(fake_db):
+    database = seed_trigrams(fake_db, {'211300001': 'Alice Brown', '211300002': 'Carol White'})
+
+    index = StudentTrigramIndex(refresh_interval=0, reload_interval=float('inf'))
+    assert index.refresh() is None
+    assert index.search('carol white')[0][0] == '211300002'
+
+    # Incremental refreshes only see changes, so a deletion needs a full reload
+    database.student_trigrams.delete_one({'registration_no': '211300002'})
+    index.refresh()
+    assert index.search('carol white')[0][0] == '211300002'
+
+    index.reload_interval = 0
+    index.refresh().result(timeout=5)
+    assert index.search('carol white') == []
+    assert index.search('alice brown')[0][0] == '211300001'
+
+
+def test_searches_keep_the_old_lists_while_reloading(fake_db, monkeypatch):
+    import threading
+
+    seed_trigrams(fake_db, {'211300001': 'Alice Brown'})
+    index = StudentTrigramIndex(refresh_interval=0, reload_interval=float('inf'))
+    index.refresh()
+
+    release = threading.Event()
+    reload = index._reload
+
+    def slow_reload():
+        release.wait(5)
+        reload()
+
+    monkeypatch.setattr(index, '_reload', slow_reload)
+    index.reload_interval = 0
+    reloading = index.refresh()
+
+    # Searches are served from the old lists, and no second reload starts meanwhile
+    assert index.search('alice brown')[0][0] == '211300001'
+    assert index.refresh() is None
+    assert not reloading.done()
+    release.set()
+    reloading.result(timeout=5)
+
+
+def test_concurrent_searches_share_one_first_load(fake_db, monkeypatch):
+    import threading
+
+    seed_trigrams(fake_db, {'211300001': 'Alice Brown'})
+    index = StudentTrigramIndex(refresh_interval=0)
+    loads = []
+    reload = index._reload
+
+    def counted_reload():
+        loads.append(1)
+        threading.Event().wait(0.1)
+        reload()
+
+    monkeypatch.setattr(index, '_reload', counted_reload)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(index.search('alice brown'))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert loads == [1]
+    assert all(result[0][0] == '211300001' for result in results)